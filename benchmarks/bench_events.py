@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""Count the simpy events processed by the test models (tests/test_sim*.py),
+and the number of events per request (i.e. per operation).
+
+Usage: python bench_events.py
+"""
+
+import sys
+import os.path
+import io
+import glob
+import inspect
+import logging
+import importlib
+import contextlib
+
+base = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(base, '..', 'src'))
+sys.path.insert(0, os.path.join(base, '..', 'tests'))
+
+import simpy
+from emulica.core import emulation
+
+
+class Counter:
+    """Count the events processed by every simpy Environment, and the
+    requests created"""
+    def __init__(self):
+        self.events = 0
+        self.requests = 0
+        self.step = simpy.Environment.step
+        self.init = emulation.Request.__init__
+
+    def __enter__(self):
+        counter = self
+
+        def step(env):
+            counter.events += 1
+            return counter.step(env)
+
+        def init(request, *args, **kwargs):
+            counter.requests += 1
+            counter.init(request, *args, **kwargs)
+        simpy.Environment.step = step
+        emulation.Request.__init__ = init
+        return self
+
+    def __exit__(self, *exc):
+        simpy.Environment.step = self.step
+        emulation.Request.__init__ = self.init
+
+
+def main():
+    total_events = 0
+    total_requests = 0
+    print("{0:<12} {1:>8} {2:>8} {3:>10}".format('model', 'events', 'requests', 'ev/request'))
+    names = sorted(os.path.basename(f)[:-3] for f in glob.glob(os.path.join(base, '..', 'tests', 'test_sim*.py')))
+    for name in names:
+        with contextlib.redirect_stdout(io.StringIO()):
+            test = importlib.import_module(name)
+        if not (hasattr(test, 'get_model') and hasattr(test, 'EMULATE_UNTIL')):
+            continue
+        if inspect.signature(test.get_model).parameters:
+            continue
+        logging.disable(logging.CRITICAL)
+        model = test.get_model()
+        with Counter() as counter, contextlib.redirect_stdout(io.StringIO()):
+            model.emulate(until=test.EMULATE_UNTIL)
+        total_events += counter.events
+        total_requests += counter.requests
+        print("{0:<12} {1:>8} {2:>8} {3:>10.2f}".format(name,
+                                                       counter.events,
+                                                       counter.requests,
+                                                       counter.events / max(counter.requests, 1)))
+    print("{0:<12} {1:>8} {2:>8} {3:>10.2f}".format('total',
+                                                   total_events,
+                                                   total_requests,
+                                                   total_events / max(total_requests, 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+"""Measure the creation time and the memory footprint of products.
+
+Usage: python bench_product.py [number of products]
+"""
+
+import sys
+import os.path
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from emulica.core import emulation
+
+
+def create(model, n):
+    """Create n products with two physical properties"""
+    for i in range(n):
+        p = emulation.Product(model, product_type='part')
+        p['mass'] = 1.0
+        p['color'] = 'red'
+
+
+def main(n):
+    model = emulation.Model()
+    start = time.perf_counter()
+    create(model, n)
+    elapsed = time.perf_counter() - start
+    print("creation time: {0:.2f} us/product".format(elapsed / n * 1e6))
+    model = emulation.Model()
+    tracemalloc.start()
+    create(model, n)
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("memory: {0:.0f} bytes/product".format(current / n))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,76 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+"""Measure the cost of broadcasting reports to several subscribers.
+
+Usage: python bench_report.py [number of reports]
+"""
+
+import sys
+import os.path
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from emulica.core import emulation
+
+
+class Emitter:
+    def run(self, model, n):
+        module = model.modules['source']
+        for i in range(n):
+            yield model.get_sim().timeout(1)
+            yield from module.publish_report(emulation.Report('source', 'tick', date=i))
+
+
+class Subscriber:
+    def run(self, model, socket, received):
+        while True:
+            yield socket.get()
+            received[0] += 1
+
+
+def run(n, subscribers):
+    """Emulate n reports sent to subscribers clients, and return the
+    elapsed time"""
+    model = emulation.Model()
+    source = emulation.EmptyModule(model, 'source')
+    received = [0]
+
+    def start(model):
+        for i in range(subscribers):
+            socket = source.create_report_socket(multiple_observation=True)
+            model.get_sim().process(Subscriber().run(model, socket, received))
+        yield from Emitter().run(model, n)
+    model.register_control_function(start)
+    start_time = time.perf_counter()
+    model.emulate(until=n + 1)
+    elapsed = time.perf_counter() - start_time
+    assert received[0] == n * subscribers
+    return elapsed
+
+
+def main(n):
+    for subscribers in (1, 10, 100):
+        elapsed = run(n, subscribers)
+        print("{0:>3} subscribers: {1:.2f} us/report, {2:.2f} us/delivery".format(subscribers,
+                                                                                 elapsed / n * 1e6,
+                                                                                 elapsed / (n * subscribers) * 1e6))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
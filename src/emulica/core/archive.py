@@ -0,0 +1,198 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de
+# Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+This module enable to store disposed products out of the emulation model, in
+a SQLite database. When a ProductArchive is set as the archive of a model,
+products are retired from Model.products as soon as they are disposed, so that
+memory usage does not grow with the number of products created during a run.
+
+Classes:
+    ProductArchive -- a SQLite store of disposed products
+    ProductRecord -- an archived product, as returned by ProductArchive
+"""
+
+import sqlite3
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger('emulica.archive')
+
+
+ProductRecord = namedtuple('ProductRecord', ['pid',
+                                             'product_type',
+                                             'quantity',
+                                             'create_time',
+                                             'dispose_time',
+                                             'space_history',
+                                             'shape_history',
+                                             'composition_history'])
+
+
+class ProductArchive(object):
+    """A ProductArchive stores the summary and the histories of disposed
+    products in a SQLite database. Products are written in chunks: they are
+    buffered, and the buffer is flushed every chunk_size products (or
+    when the archive is read). The archive is reset each time the model is
+    cleared, so it only holds the products of the last run. Physical
+    properties are not archived: only the summary of the products (type,
+    quantity, creation and disposal times) and their histories are kept.
+
+    Usage:
+        model.archive = ProductArchive('run.db')
+        model.emulate(until=1000)
+        record = model.archive.get(12)
+
+    Attributes:
+        filename -- the database file name (':memory:' for an in-memory
+                    database)
+        chunk_size -- the number of products written at once
+        max_pid -- the largest archived product ID
+    """
+
+    def __init__(self, filename=':memory:', chunk_size=1000):
+        """Create a new ProductArchive. If the database already contains
+        archived products, they can be read until the archive is reset: a
+        model resets its archive at the beginning of each run (product IDs
+        start again at 1), so each run overwrites the products of the
+        previous one.
+
+        Arguments:
+            filename -- the database file name (default = ':memory:')
+            chunk_size -- the number of products written at once (default = 1000)
+        """
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.__db = sqlite3.connect(filename)
+        self.__db.executescript("""
+            CREATE TABLE IF NOT EXISTS product (pid INTEGER PRIMARY KEY,
+                                                product_type TEXT,
+                                                quantity INTEGER,
+                                                create_time REAL,
+                                                dispose_time REAL);
+            CREATE TABLE IF NOT EXISTS space_history (pid INTEGER,
+                                                      date REAL,
+                                                      space TEXT);
+            CREATE TABLE IF NOT EXISTS shape_history (pid INTEGER,
+                                                      start REAL,
+                                                      end REAL,
+                                                      actuator TEXT,
+                                                      program TEXT);
+            CREATE TABLE IF NOT EXISTS composition_history (pid INTEGER,
+                                                            date REAL,
+                                                            actuator TEXT,
+                                                            component INTEGER);
+            CREATE INDEX IF NOT EXISTS space_pid ON space_history (pid);
+            CREATE INDEX IF NOT EXISTS shape_pid ON shape_history (pid);
+            CREATE INDEX IF NOT EXISTS composition_pid ON composition_history (pid);
+            """)
+        self.max_pid = self.__db.execute("SELECT MAX(pid) FROM product").fetchone()[0] or 0
+        self.__clear_buffer()
+
+    def __clear_buffer(self):
+        """Empty the write buffer"""
+        self.__products = list()
+        self.__space = list()
+        self.__shape = list()
+        self.__composition = list()
+        self.__pending = set()
+
+    def store(self, product):
+        """Add a disposed product in the archive.
+
+        Arguments:
+            product -- the product to archive
+        """
+        pid = product.pid
+        self.__products.append((pid,
+                                product.product_type,
+                                product.quantity,
+                                product.create_time,
+                                product.dispose_time))
+        self.__space.extend([(pid, date, space) for (date, space) in product.space_history])
+        self.__shape.extend([(pid,) + tuple(t) for t in product.shape_history])
+        self.__composition.extend([(pid,) + tuple(c) for c in product.composition_history])
+        self.__pending.add(pid)
+        self.max_pid = max(self.max_pid, pid)
+        if len(self.__products) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write buffered products in the database"""
+        if not self.__products:
+            return
+        with self.__db:
+            self.__db.executemany("INSERT INTO product VALUES (?, ?, ?, ?, ?)", self.__products)
+            self.__db.executemany("INSERT INTO space_history VALUES (?, ?, ?)", self.__space)
+            self.__db.executemany("INSERT INTO shape_history VALUES (?, ?, ?, ?, ?)", self.__shape)
+            self.__db.executemany("INSERT INTO composition_history VALUES (?, ?, ?, ?)", self.__composition)
+        logger.debug("{0} products archived".format(len(self.__products)))
+        self.__clear_buffer()
+
+    def reset(self):
+        """Remove every product from the archive"""
+        self.__clear_buffer()
+        with self.__db:
+            for table in ['product', 'space_history', 'shape_history', 'composition_history']:
+                self.__db.execute("DELETE FROM {0}".format(table))
+        self.max_pid = 0
+
+    def close(self):
+        """Flush the buffer and close the database"""
+        self.flush()
+        self.__db.close()
+
+    def __contains__(self, pid):
+        """Return True if product pid has been archived"""
+        if pid > self.max_pid:
+            return False
+        if pid in self.__pending:
+            return True
+        row = self.__db.execute("SELECT 1 FROM product WHERE pid = ?", (pid,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        """Return the number of archived products"""
+        self.flush()
+        return self.__db.execute("SELECT COUNT(*) FROM product").fetchone()[0]
+
+    def get(self, pid):
+        """Return the ProductRecord of product pid.
+
+        Raises:
+            KeyError -- if the product has not been archived
+        """
+        self.flush()
+        row = self.__db.execute("SELECT * FROM product WHERE pid = ?", (pid,)).fetchone()
+        if row is None:
+            raise KeyError(pid)
+        return self.__record(row)
+
+    def __record(self, row):
+        """Return the ProductRecord that corresponds to a row of the product
+        table"""
+        pid = row[0]
+        space = self.__db.execute("SELECT date, space FROM space_history WHERE pid = ? ORDER BY rowid", (pid,)).fetchall()
+        shape = self.__db.execute("SELECT start, end, actuator, program FROM shape_history WHERE pid = ? ORDER BY rowid", (pid,)).fetchall()
+        composition = self.__db.execute("SELECT date, actuator, component FROM composition_history WHERE pid = ? ORDER BY rowid", (pid,)).fetchall()
+        return ProductRecord(*(row + (space, shape, composition)))
+
+    def __iter__(self):
+        """Iterate over the archived products, in pid order, as ProductRecord"""
+        self.flush()
+        cursor = self.__db.execute("SELECT * FROM product ORDER BY pid")
+        for row in cursor:
+            yield self.__record(row)
@@ -238,11 +238,9 @@ class EmulationServer:
 class ReportSource:
     """This simPy Process is used to get Reports from emulation modules."""
     def run(self, model, send):
-        """PEM : create a Store, and attach it to every module in the model"""
-        r = model.new_report_socket()
-        for module in model.module_list():
-            module.attach_report_socket(r)
-            logging.info(_("attaching reports store to module {0}").format(module.name))
+        """PEM : subscribe to the report bus of the model"""
+        r = model.top_level().report_bus.create_client()
+        logging.info(_("subscribing to the report bus of the model"))
         while True:
             report = yield r.get()
             send(report)
@@ -239,6 +239,9 @@ class EmulationWriter(object):
             elif value.__class__.__name__ == 'ChangeTable':
                 #change-table element
                 self.marshall_change(root, value)
+            elif value.__class__.__name__ == 'Calendar':
+                #calendar element
+                self.marshall_calendar(root, value)
             elif 'fullname' in dir(value):
                 #reference element
                 elt = SubElement(root, 'reference')
@@ -292,6 +295,26 @@ class EmulationWriter(object):
             setup.attrib['delay'] = str(delay)
 
 
+    def marshall_calendar(self, root, calendar):
+        """Append a calendar Element that represents an availability calendar
+        to element root.
+
+        Arguments:
+            root -- the element to which append the created element
+            calendar -- the calendar to marshall
+
+        """
+        calendar_root = SubElement(root, 'calendar')
+        calendar_root.attrib['period'] = str(calendar.period)
+        for (start, end) in calendar.breaks():
+            elt = SubElement(calendar_root, 'break')
+            elt.attrib['start'] = str(start)
+            elt.attrib['end'] = str(end)
+        for (start, end) in calendar.exceptions():
+            elt = SubElement(calendar_root, 'exception')
+            elt.attrib['start'] = str(start)
+            elt.attrib['end'] = str(end)
+
     def marshall_change(self, root, table):
         """Append a change-table Element that represents a change table to element 
         root.
@@ -455,6 +478,8 @@ class EmulationParser(object):
             return self.parse_setup(props, root_prop_name, element)
         elif element.tag == 'change-table':
             return self.parse_change(props, root_prop_name, element)
+        elif element.tag == 'calendar':
+            return self.parse_calendar(props, root_prop_name, element)
         else:
             #error case
             logger.warning("errror: unknow tag {0}".format(element.tag))
@@ -516,6 +541,15 @@ class EmulationParser(object):
             setup.add(init, final, delay)
         return setup
 
+    def parse_calendar(self, props, root_prop_name, element):
+        """Parse an availability calendar and return the resulting object"""
+        calendar = properties.Calendar(props, root_prop_name, eval(element.get("period", "0")))
+        for child in element.findall('break'):
+            calendar.add_break(eval(child.get("start")), eval(child.get("end")))
+        for child in element.findall('exception'):
+            calendar.add_exception(eval(child.get("start")), eval(child.get("end")))
+        return calendar
+
     def parse_change(self, props, root_prop_name, element):
         """Parse a change table and return the resulting object"""
         table = properties.ChangeTable(props, root_prop_name)
@@ -639,7 +673,7 @@ def parse_request(message):
     if elt == None: 
         raise EmuMLError("request message does not specify what to execute")
     what = elt.text
-    rq = emulation.Request(who, what)
+    how = dict()
     elt = root.find("how")
     if not elt == None:
         for e in elt.findall("element"):
@@ -647,20 +681,23 @@ def parse_request(message):
                 value = e.text
             except (SyntaxError, NameError):
                 value = e.text
-            rq.how[e.attrib["name"]] = value
+            how[e.attrib["name"]] = value
+    where = None
     elt = root.find("where")
     if not elt == None:
-        rq.where = elt.text
+        where = elt.text
+    when = None
     elt = root.find("when")
     if not elt == None:
         try:
-            rq.when = float(elt.text)
+            when = float(elt.text)
         except ValueError:
             raise EmuMLError("""'{0}' could not be recognized as a date (float)""".format(elt.text))
+    why = ''
     elt = root.find("why")
     if not elt == None:
-        rq.why = elt.text
-    return rq
+        why = elt.text
+    return emulation.Request(who, what, location=where, date=when, comment=why, params=how)
 
 def parse_report(message):
     """Parse a XML message and return a Report instance
@@ -686,7 +723,7 @@ def parse_report(message):
     if elt == None: 
         raise EmuMLError("request message does not specify what to execute")
     what = elt.text
-    rp = emulation.Report(who, what)
+    how = dict()
     elt = root.find("how")
     if not elt == None:
         for e in elt.findall("element"):
@@ -694,20 +731,23 @@ def parse_report(message):
                 value = eval(e.text)
             except (SyntaxError, NameError):
                 value = e.text
-            rp.how[e.attrib["name"]] = value
+            how[e.attrib["name"]] = value
+    where = None
     elt = root.find("where")
     if not elt == None:
-        rp.where = elt.text
+        where = elt.text
+    when = None
     elt = root.find("when")
     if not elt == None:
         try:
-            rp.when = float(elt.text)
+            when = float(elt.text)
         except ValueError:
             raise EmuMLError("""'{0}' could not be recognized as a date (float)""".format(elt.text))
+    why = ''
     elt = root.find("why")
     if not elt == None:
-        rp.why = elt.text
-    return rp
+        why = elt.text
+    return emulation.Report(who, what, location=where, date=when, comment=why, params=how)
 
 def write_report(report):
     """Return an XML message from a report object"""
@@ -24,7 +24,14 @@ Classes:
     Model -- The main class, that represents an emulation model
     Module -- The root classe for any object that is named in the model
     Product -- Moving entities in the model
-
+    Agenda -- Model-wide timer used to schedule delayed callbacks
+    Genealogy -- Model-wide index of assembled products
+    ProductIndex -- Model-wide index of active products by location and type
+    FailureScheduler -- Model-wide scheduler of the Failure modules
+    RequestCalendar -- Model-wide calendar of future-dated requests
+    ReportBus -- Model-wide broadcast of the reports of every module
+
+    Message -- immutable message (base class of Request and Report)
     Request -- a message sent to a module that trigger operation
     Report -- a message sent by a module that report events
 
@@ -38,6 +45,8 @@ Classes:
     Actuator -- Generic Module that alow transformation on products
 
     CreateAct -- Actuator that creates new products
+    ArrivalGenerator -- Module that triggers a CreateAct at random (or
+        recorded) arrival dates
     DisposeAct -- Actuator that disposes products (i.e. remove them from the
         model)
     ShapeAct -- Actuator that changes the physical attributes of products
@@ -53,14 +62,19 @@ Exceptions:
 
 """
 
+import sys
 import random
 import logging
-import copy
+import heapq
+from types import MappingProxyType
 
+import numpy
 import simpy
 from . import properties
 from . plot import Monitor
 
+_setattr = object.__setattr__
+
 logger = logging.getLogger('emulica.emulation')
 
 
@@ -79,13 +93,10 @@ def wait_idle(report_socket):
 
 def execute(model, name, operation, prog):
     m = model.modules[name]
-    rp = m.create_report_socket(multiple_observation=True)
+    rp = m.create_report_socket(multiple_observation=True, what=['idle'])
     q = Request(name, operation, params = {'program': prog})
     yield m.request_socket.put(q)
-    ev = yield rp.get()
-    #print(ev)
-    while ev.what != "idle":
-        ev = yield rp.get()
+    yield rp.get()
 
 
 class Module(object):
@@ -139,6 +150,9 @@ class Module(object):
                             Module.NAME_CHANGE_SIGNAL: dict()}
         self.accept_observer = True
         self.__multiplier = None
+        self.__observed = False
+        self.__bus = None
+        self.__handlers = None
         self.report_socket = None
         self.request_socket = None
     
@@ -157,10 +171,14 @@ class Module(object):
 
     def initialize(self):
         """Make a module ready to be simulated"""
-        self.report_socket = simpy.Store(env=self.get_sim())
-        self.request_socket = simpy.FilterStore(env=self.get_sim())
+        self.report_socket = ReportSocket(self.get_sim())
+        self.request_socket = RequestSocket(self.get_sim(),
+                                            self.model.top_level().request_calendar)
         self.accept_observer = True
         self.__multiplier = None
+        self.__observed = False
+        self.__bus = self.model.top_level().report_bus
+        self.__handlers = self.__bus.bindings(self.fullname())
 
     def rename(self, new_name: str):
         """Change the module's name.
@@ -175,16 +193,32 @@ class Module(object):
             self.model.modules[self.name] = self
             self.emit('name-changed', self.name, self)
 
-    def create_report_socket(self, multiple_observation=False):
+    def create_report_socket(self, multiple_observation=False, what=None, accept=None,
+                             capacity=float('inf'), overflow=None):
         """Create a new Store object in which reports from the module will be put
         Each client should call this method once, and re-use the created object
         during the simulation. If more than one client observe this module, an
         EventMultiplier is activated.
 
+        The subscription can be filtered: reports that are filtered out are
+        never put in the socket (and thus never wake up the client process).
+        A filtered socket is always served by the EventMultiplier.
+
         Arguments:
             multiple_observation
                 If True, an EventMultiplier is created, which may slow down
                 simulation a bit (default = False)
+            what -- if not None, a report name or a collection of report
+                    names: only reports whose what attribute is in this
+                    collection are put in the socket (default = None)
+            accept -- if not None, a function that takes a report, and
+                      returns True if it must be put in the socket
+                      (default = None)
+            capacity -- the maximum number of reports waiting in the socket
+                        (default = unbounded)
+            overflow -- what to do with a report when the socket is full:
+                        ReportSocket.BLOCK, ReportSocket.DROP_OLDEST or
+                        ReportSocket.DROP_NEWEST (default = BLOCK)
 
         Returns:
             a Store that will contain future Report messages
@@ -195,22 +229,30 @@ class Module(object):
         """
         if not self.accept_observer:
             raise EmulicaError(self, _("""A new request_socket must be created, but there is already one, and the multiple_observation parameter was not set to True"""))
-        if not multiple_observation:
+        self.__observed = True
+        if not multiple_observation and what is None and accept is None:
             self.accept_observer = False
+            if capacity != float('inf') or overflow is not None:
+                self.report_socket = ReportSocket(self.get_sim(), capacity, overflow)
+            if self.__multiplier is not None:
+                #reports are broadcast by the multiplier: the socket must be
+                #one of its clients
+                self.__multiplier.attach_client(self.report_socket)
             return self.report_socket
         else:
-            if self.__multiplier is None:
-                self.__multiplier = EventMultiplier(self.get_sim(), self.report_socket)
-                self.get_sim().process(self.__multiplier.run())
-            return self.__multiplier.create_client()
+            return self.__get_multiplier().create_client(what, accept, capacity, overflow)
 
-    def attach_report_socket(self, socket):
+    def attach_report_socket(self, socket, what=None, accept=None):
         """Attach a Store object, in which report will be put.
 
         Arguments:
-            multiple_observation -- If True, an EventMultiplier is created,
-            which may slow down simulation a bit (default = False)
             socket -- the Store in which Reports will be put
+            what -- if not None, a report name or a collection of report
+                    names: only reports whose what attribute is in this
+                    collection are put in the socket (default = None)
+            accept -- if not None, a function that takes a report, and
+                      returns True if it must be put in the socket
+                      (default = None)
 
         Raises:
             EmulicaError, if this method is called several time without
@@ -218,10 +260,89 @@ class Module(object):
         """
         if not self.accept_observer:
             raise EmulicaError(self, _("""A new request_socket must be created, but there is already one, and the multiple_observation parameter was not set to True"""))
+        self.__observed = True
+        self.__get_multiplier().attach_client(socket, what, accept)
+
+    def is_observed(self):
+        """Return True if a report socket has been created or attached since
+        the module was initialized, if the model report bus has clients, or
+        if control handlers are bound to the module. Reports of a module
+        that is not observed are not built at all (see publish)."""
+        return self.__observed or bool(self.__bus.clients or self.__handlers)
+
+    def publish(self, event, location=None, date=None, comment='', params=None):
+        """Send a new Report to the observers of the module (a generator, to
+        be used with yield from in a process). If the module is not
+        observed, the Report is not built.
+
+        The Report is handed off directly to the observers that are waiting
+        for it (see send_report): the process is only suspended if the
+        Report has to be queued in the report socket.
+
+        Arguments:
+            event -- the report name (the what attribute)
+            location -- the report location (default = None)
+            date -- the report date (default = None)
+            comment -- the report comment (default = '')
+            params -- the report parameters (default = None)
+        """
+        if self.is_observed():
+            put = self.send_report(Report(self.fullname(), event,
+                                          location=location,
+                                          date=date,
+                                          comment=comment,
+                                          params=params))
+            if put is not None:
+                yield put
+
+    def publish_report(self, report):
+        """Send an already built Report (or list of Reports) to the
+        observers of the module, if it is observed (see publish)."""
+        if self.is_observed():
+            put = self.send_report(report)
+            if put is not None:
+                yield put
+
+    def send_report(self, report):
+        """Send a Report to the control handlers bound to the module, to the
+        clients of the model report bus, and to the observers of the module.
+        Handlers are called at once. If the module is observed through an
+        EventMultiplier, the report is broadcast at once. Otherwise, if an
+        observer is waiting on the report socket, the report is handed off
+        to it directly; else, a put event is created. The event to wait for
+        is returned (None if the report has been delivered everywhere): the
+        put events of the full sockets that block (see ReportSocket).
+        """
+        for (handler, what, accept, args) in self.__handlers:
+            if what is not None and report.what not in what:
+                continue
+            if accept is not None and not accept(report):
+                continue
+            handler(report, *args)
+        puts = list()
+        if self.__bus.clients:
+            puts.extend(self.__bus.broadcast(report))
+        if self.__observed:
+            if self.__multiplier is not None:
+                puts.extend(self.__multiplier.broadcast(report))
+            else:
+                socket = self.report_socket
+                if socket.get_queue and len(socket.items) < socket.capacity:
+                    socket.deliver(report)
+                else:
+                    puts.append(socket.put(report))
+        if not puts:
+            return None
+        if len(puts) == 1:
+            return puts[0]
+        return self.get_sim().all_of(puts)
+
+    def __get_multiplier(self):
+        """Return the EventMultiplier of this module (it is created if
+        needed)"""
         if self.__multiplier is None:
-            self.__multiplier = EventMultiplier(self.get_sim(), self.report_socket)
-            self.get_sim().process(self.__multiplier.run())
-        self.__multiplier.attach_client(socket)
+            self.__multiplier = EventMultiplier(self.get_sim())
+        return self.__multiplier
 
     def connect(self, signal, handler, *args):
         """Connect a handler with a signal. This method should be used by (graphical) user
@@ -272,14 +393,44 @@ class Model(Module):
     Attributes:
         modules -- dictionary of modules (including submodels) contained in
                    this model, but excluding the submodel's modules
-        products -- dictonary of existing products
+        products -- dictonary of existing products (if an archive is set,
+                    disposed products are retired from it)
+        active_products -- dictionary of the products that have not been
+                           disposed yet
+        archive -- an archive.ProductArchive where disposed products are
+                   stored (main model only, default = None: disposed
+                   products are kept in products). It is reset at the
+                   beginning of each run.
+        history_level -- the amount of product history that is recorded
+                         (main model only, see set_history_level)
+        history_period -- the sampling period of the 'sampled' history
+                          level (main model only)
+        product_schemas -- dictionary of the properties.Schema of each
+                           product type
         control_classes -- list of registered control classes. contains
                            (control_class, pem, args) tuples.
+        control_handlers -- list of registered control handlers. contains
+                            (module_name, handler, what, accept, args)
+                            tuples (see register_handler).
         control_system -- a list of the instanciated control classes (empty
         before emulation)
         rng -- the model random number generator
         inputs -- the inputs interface of the model a dict of the form
                   input_name => (module_name, property_name)
+        agenda -- the Agenda used to schedule delayed callbacks (main model
+                  only, created when the model is cleared)
+        failure_scheduler -- the FailureScheduler that triggers the Failure
+                             modules (main model only, created when the
+                             model is cleared)
+        request_calendar -- the RequestCalendar that holds future-dated
+                            requests (main model only, created when the
+                            model is cleared)
+        report_bus -- the ReportBus on which every report is published, and
+                      to which control handlers are bound (main model only,
+                      created when the model is cleared)
+        genealogy -- the Genealogy that indexes the composition of products
+        product_index -- the ProductIndex that indexes active products by
+                         location and type
 
     Signals:
         'module_added' -- callback(model, module)
@@ -307,9 +458,13 @@ class Model(Module):
         self.control_classes = list()
         self.control_system = list()
         self.control_func = list()
+        self.control_handlers = list()
         self.inputs = dict()
         if not self.is_main:
             self.products = model.products
+            self.product_schemas = model.product_schemas
+            self.genealogy = model.genealogy
+            self.product_index = model.product_index
             #if not path:
             #    logger.warning(_("a default path will be used"))
             self.path = path or '{0}.emu'.format(name)
@@ -317,6 +472,13 @@ class Model(Module):
         else:
             self.__next_pid = 1
             self.products = dict()
+            self.active_products = dict()
+            self.product_schemas = dict()
+            self.genealogy = Genealogy()
+            self.product_index = ProductIndex()
+            self.archive = None
+            self.history_level = 'full'
+            self.history_period = 0
 
     def module_list(self):
         """Return the list of modules in this model, and in its submodels"""
@@ -421,10 +583,14 @@ class Model(Module):
             self.sim.run(until=until)
         for mod in self.modules.values():
             if 'record_end' in dir(mod):
-                mod.record_end()
-        for p in self.products.values():
+                #close the records in progress of every server
+                for slot in range(mod.server_count()):
+                    mod.record_end(slot=slot)
+        for p in list(self.active_products.values()):
             if p.is_active():
                 p.dispose()
+        if self.archive:
+            self.archive.flush()
 
     def clear(self, rt=False, factor=1):
         """Clear the model."""
@@ -435,9 +601,18 @@ class Model(Module):
         else:
             self.sim = simpy.Environment()
         self.root_event = self.sim.event()
+        self.agenda = Agenda(self.sim)
+        self.failure_scheduler = FailureScheduler(self.agenda)
+        self.request_calendar = RequestCalendar(self.agenda)
+        self.report_bus = ReportBus(self.sim)
         #self.sim.initialize()
         #clean products registry
         self.products = dict()
+        self.active_products = dict()
+        self.genealogy.clear()
+        self.product_index.clear()
+        if self.archive:
+            self.archive.reset()
         self.__next_pid = 1
         self.control_system = list()
         #modules activation
@@ -454,6 +629,39 @@ class Model(Module):
         # stop simulation
         self.root_event.succeed()
 
+    def set_history_level(self, level, period=0):
+        """Set the amount of history recorded in products (space, shape and
+        composition histories). Levels are:
+            'full' -- every event is recorded (default)
+            'sampled' -- an event is recorded only if at least period time
+                         units have elapsed since the last recorded one
+            'summary' -- only the first and the last events are recorded
+            'none' -- nothing is recorded
+        Except with 'none', move and transformation counters are kept
+        up to date.
+
+        Arguments:
+            level -- the history level
+            period -- the sampling period of the 'sampled' level (default = 0)
+
+        Raises:
+            EmulicaError, if level is not one of the levels above
+        """
+        if level not in Product.history_levels:
+            raise EmulicaError(self, _("unknown history level: {0}").format(level))
+        model = self.top_level()
+        model.history_level = level
+        model.history_period = period
+
+    def pid_used(self, pid):
+        """Return True if pid has already been given to a product, either
+        still in products or retired in the archive."""
+        model = self.top_level()
+        if pid in model.products:
+            return True
+        archive = model.archive
+        return archive is not None and pid in archive
+
     def next_pid(self):
         """Return the next available product ID (int)"""
         if self.is_main:
@@ -478,6 +686,26 @@ class Model(Module):
         args = pem_args or (self,)
         self.control_func.append((pem, args))
 
+    def register_handler(self, module_name, handler, what=None, accept=None, args=None):
+        """Register a control rule in the model: handler is called back with
+        each report of a module, as soon as it is emitted, as
+        handler(report, *args). Handlers do not need a process nor a report
+        socket; they must not block, but they may insert requests (see
+        insert_request).
+
+        Arguments:
+            module_name -- the name of the observed module
+            handler -- the callback
+            what -- if not None, a report name or a collection of report
+                    names: the handler is only called for these reports
+                    (default = None)
+            accept -- if not None, a predicate on reports (default = None)
+            args -- an iterable of the extra arguments of the handler
+                    (default = (model,))
+        """
+        args = args or (self,)
+        self.control_handlers.append((module_name, handler, what, accept, args))
+
     def register_emulation_module(self, module):
         """Register a module in the model. If the module is a (sub)model, call
         apply_input on it.
@@ -515,15 +743,36 @@ class Model(Module):
             submodel.unregister_emulation_module(names[1])
 
     def insert_request(self, request):
-        """insert the request in the model"""
-        class Dispatcher:
-            def run(self, request, receiver):
-                """P.E.M. : put the request in the receiver queue and finish"""
-                yield receiver.request_socket.put(request)
+        """insert the request in the model. If the request date is in the
+        future, it is delivered at that date (see RequestCalendar)."""
         logger.info(_("inserting request for module {0}".format(request.who)))
         receiver = self.get_module(request.who)
-        insert_process = Dispatcher()
-        self.sim.process(insert_process.run(request, receiver))
+        receiver.request_socket.put(request)
+
+    def schedule_requests(self, requests):
+        """Insert a (possibly large) collection of requests in the model at
+        once. Requests whose date is in the future are loaded in the request
+        calendar in a single operation, the others are delivered immediately.
+        This method must be called during emulation (e.g. by a control
+        process at t=0).
+
+        Arguments:
+            requests -- an iterable of Request
+        """
+        now = self.get_sim().now
+        sockets = dict()
+        scheduled = list()
+        for request in requests:
+            socket = sockets.get(request.who)
+            if socket is None:
+                socket = self.get_module(request.who).request_socket
+                sockets[request.who] = socket
+            if request.when is not None and request.when > now:
+                scheduled.append((request, socket))
+            else:
+                socket.put(request)
+        logger.info(_("{0} requests scheduled").format(len(scheduled)))
+        self.top_level().request_calendar.load(scheduled)
 
     def initialize(self):
         """Activate the control of the model, and initialize it as a module."""
@@ -541,9 +790,15 @@ class Model(Module):
             logger.info(_("registering control process (function {0})").format(str(pem)))
             self.get_sim().process(pem(*args))
             self.control_system.append(pem)
+        for (module_name, handler, what, accept, args) in self.control_handlers:
+            logger.info(_("registering control handler {0} on module {1}").format(str(handler), module_name))
+            module = self.get_module(module_name)
+            self.top_level().report_bus.bind(module.fullname(), handler, what, accept, args)
+            self.control_system.append(handler)
 
-    def new_report_socket(self):
-        return simpy.Store(self.get_sim())
+    def new_report_socket(self, capacity=float('inf'), overflow=None):
+        """Return a new ReportSocket (see ReportSocket for the arguments)"""
+        return ReportSocket(self.get_sim(), capacity, overflow)
 
     def current_time(self):
         if self.is_main:
@@ -571,44 +826,600 @@ class Model(Module):
             return self.model.top_level()
         
 
+class ReportSocket(simpy.Store):
+    """
+    A Store in which reports are put. In addition to the Store interface, a
+    ReportSocket can be given an item directly (see deliver), without
+    creating a put event.
+
+    A ReportSocket may be bounded. When it is full, a delivered report is
+    either queued (BLOCK: a put event is created), or dropped: DROP_OLDEST
+    discards the oldest waiting report to make room, DROP_NEWEST discards the
+    delivered report. Dropped reports are counted.
+
+    Attributes:
+        overflow -- the overflow policy
+        dropped -- the number of dropped reports
+    """
+
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop-oldest'
+    DROP_NEWEST = 'drop-newest'
+
+    def __init__(self, env, capacity=float('inf'), overflow=None):
+        """Create a new ReportSocket.
+
+        Arguments:
+            env -- the simpy Environment
+            capacity -- the maximum number of waiting reports
+                        (default = unbounded)
+            overflow -- the overflow policy (default = BLOCK)
+
+        Raises:
+            ValueError -- if overflow is not a known policy
+        """
+        simpy.Store.__init__(self, env, capacity)
+        overflow = overflow or ReportSocket.BLOCK
+        if overflow not in (ReportSocket.BLOCK, ReportSocket.DROP_OLDEST, ReportSocket.DROP_NEWEST):
+            raise ValueError(_("unknown overflow policy: {0}").format(overflow))
+        self.overflow = overflow
+        self.dropped = 0
+
+    def __make_room(self):
+        """Apply the drop policies to a full socket. Return False if the new
+        item must be dropped or queued."""
+        if self.overflow == ReportSocket.BLOCK:
+            return False
+        self.dropped += 1
+        if self.overflow == ReportSocket.DROP_NEWEST:
+            return False
+        del self.items[0]
+        return True
+
+    def _do_put(self, event):
+        """Put the item of event in the socket, applying the overflow policy
+        if the socket is full"""
+        if len(self.items) >= self.capacity and not self.__make_room():
+            if self.overflow == ReportSocket.DROP_NEWEST:
+                event.succeed()
+            return None
+        return simpy.Store._do_put(self, event)
+
+    def deliver(self, item):
+        """Hand item off to the first waiting getter, or append it to the
+        socket. If the socket is full, the overflow policy is applied: with
+        BLOCK, a put event is created and returned (else None)."""
+        if self.get_queue:
+            self.get_queue.pop(0).succeed(item)
+            return None
+        if len(self.items) >= self.capacity and not self.__make_room():
+            if self.overflow == ReportSocket.BLOCK:
+                return self.put(item)
+            return None
+        self.items.append(item)
+        return None
+
+
 class EventMultiplier(object):
     """
     An EventMultiplier is used internally to enable several client to get Report
-    from a module.
+    from a module. Each report is broadcast in a single step, as it is sent
+    (see Module.send_report): the same Report object is delivered in every
+    client socket (reports must therefore not be modified by their
+    receivers). A client may filter the reports it gets, by name (what) or
+    with a predicate: filtered reports are not delivered. An EventMultiplier
+    has no process.
     """
-    def __init__(self, sim, source_socket):
+    def __init__(self, sim):
         """Create a new instance of a EventMultiplier.
         Arguments:
-            source_socket -- the source of event that must be multiplied
+            sim -- the simpy Environment
         """
         self.env = sim
-        self.source = source_socket
         self.clients = list()
+        self.__subscriptions = list()
+
+    def broadcast(self, ev):
+        """Deliver a report in the socket of every client that accepts it.
+        Return the list of the pending put events of the full client
+        sockets that block (see ReportSocket.deliver): the sender waits for
+        them, so that a slow blocking client slows the sender down."""
+        puts = list()
+        for (client, what, accept) in self.__subscriptions:
+            if what is not None and ev.what not in what:
+                continue
+            if accept is not None and not accept(ev):
+                continue
+            if isinstance(client, ReportSocket):
+                put = client.deliver(ev)
+            else:
+                put = client.put(ev)
+            if put is not None and not put.triggered:
+                puts.append(put)
+        return puts
 
-    def run(self):
-        """Process Execution Method"""
-        while True:
-            ev = yield self.source.get()
-            for client in self.clients:
-                new_ev = copy.copy(ev)
-                yield client.put(new_ev)
-
-    def create_client(self):
+    def create_client(self, what=None, accept=None, capacity=float('inf'), overflow=None):
         """Add a client to the event multiplier.
+
+        Arguments:
+            what -- if not None, the names of the reports to deliver
+                    (default = None)
+            accept -- if not None, a predicate on reports (default = None)
+            capacity -- the capacity of the client socket (default = unbounded)
+            overflow -- the overflow policy of the client socket
+                        (default = ReportSocket.BLOCK)
+
         Returns:
             a new Store where event will be put
         """
-        client = simpy.Store(self.env)
-        self.clients.append(client)
+        client = ReportSocket(self.env, capacity, overflow)
+        self.attach_client(client, what, accept)
         return client
 
-    def attach_client(self, client):
+    def attach_client(self, client, what=None, accept=None):
         """Add a client to the event multiplier.
 
         Arguments:
             store -- the Store to attach
+            what -- if not None, the names of the reports to deliver
+                    (default = None)
+            accept -- if not None, a predicate on reports (default = None)
         """
+        if isinstance(what, str):
+            what = (what,)
+        if what is not None:
+            what = frozenset(what)
         self.clients.append(client)
+        self.__subscriptions.append((client, what, accept))
+
+
+class ReportBus(EventMultiplier):
+    """
+    A ReportBus broadcasts the reports of every module of a model (including
+    the modules of its submodels) to its clients. There is one ReportBus per
+    model (Model.report_bus), created when the model is cleared: modules
+    publish their reports on it as they are emitted (see
+    Module.send_report), so that the whole model can be observed without
+    attaching a socket, and an EventMultiplier, to every module. Unlike an
+    EventMultiplier, a ReportBus is not attached to a module.
+
+    The ReportBus also holds the control handlers bound to each module (see
+    Model.register_handler).
+
+    Usage:
+        socket = model.report_bus.create_client(what=['busy', 'idle'])
+    """
+    def __init__(self, sim):
+        """Create a new instance of a ReportBus.
+        Arguments:
+            sim -- the simpy Environment
+        """
+        EventMultiplier.__init__(self, sim)
+        self.__bindings = dict()
+
+    def bind(self, name, handler, what=None, accept=None, args=()):
+        """Bind a control handler to the reports of a module.
+
+        Arguments:
+            name -- the module fullname
+            handler -- the callback, called as handler(report, *args)
+            what -- if not None, the names of the reports to handle
+                    (default = None)
+            accept -- if not None, a predicate on reports (default = None)
+            args -- the extra arguments of the handler (default = ())
+        """
+        if isinstance(what, str):
+            what = (what,)
+        if what is not None:
+            what = frozenset(what)
+        self.bindings(name).append((handler, what, accept, tuple(args)))
+
+    def bindings(self, name):
+        """Return the (mutable) list of the handlers bound to module name"""
+        return self.__bindings.setdefault(name, list())
+
+
+class Agenda(object):
+    """
+    An Agenda is a model-wide timer, used internally to call back objects at a
+    given date without spawning one SimPy process per date. Pending entries are
+    kept in a heap ordered by date; only the earliest date has an armed SimPy
+    timeout.
+
+    An entry can be associated with a key (e.g. an observer): there is at most
+    one pending entry per key, a new entry superseding the previous one. Stale
+    entries are discarded lazily when they reach the top of the heap.
+    """
+    def __init__(self, env):
+        """Create a new instance of an Agenda.
+        Arguments:
+            env -- the simpy Environment
+        """
+        self.env = env
+        self.__heap = list()
+        self.__keys = dict()
+        self.__timers = set()
+        self.__seq = 0
+
+    def add(self, date, callback, arg=None, key=None):
+        """Schedule a call to callback(arg) at date.
+
+        Arguments:
+            date -- the date of the call (a date in the past means now)
+            callback -- the function to call
+            arg -- the argument passed to the callback (default = None)
+            key -- if not None, the entry supersedes any pending entry with the
+                   same key (default = None)
+
+        Returns:
+            False if an entry with the same key and date was already pending
+            (the entry is coalesced), True otherwise
+        """
+        if key is not None:
+            pending = self.__keys.get(key)
+            if pending is not None and pending[0] == date:
+                return False
+        self.__seq += 1
+        if key is not None:
+            self.__keys[key] = (date, self.__seq)
+        heapq.heappush(self.__heap, (date, self.__seq, key, callback, arg))
+        self.__arm(date)
+        return True
+
+    def cancel(self, key):
+        """Cancel the pending entry associated with key (if any)."""
+        self.__keys.pop(key, None)
+
+    def is_pending(self, key):
+        """Return True if an entry is pending for key."""
+        return key in self.__keys
+
+    def __len__(self):
+        """Return the number of entries in the heap (including stale ones)"""
+        return len(self.__heap)
+
+    def __arm(self, date):
+        """Arm a timeout at date, unless an earlier one is already armed."""
+        for armed in self.__timers:
+            if armed <= date:
+                return
+        self.__timers.add(date)
+        timer = self.env.timeout(max(0, date - self.env.now), value=date)
+        timer.callbacks.append(self.__fire)
+
+    def __fire(self, event):
+        """Call every entry that is due, and re-arm for the next one."""
+        self.__timers.discard(event.value)
+        limit = max(self.env.now, event.value)
+        heap = self.__heap
+        while heap and heap[0][0] <= limit:
+            (date, seq, key, callback, arg) = heapq.heappop(heap)
+            if key is not None:
+                if self.__keys.get(key, (None, None))[1] != seq:
+                    #superseded or cancelled entry
+                    continue
+                del self.__keys[key]
+            callback(arg)
+        if heap:
+            self.__arm(heap[0][0])
+
+
+class RequestCalendar(object):
+    """
+    The RequestCalendar of a model holds the requests whose date (when) is in
+    the future, and delivers each one in the request socket of its receiver
+    at its date. Requests are kept in a single heap, ordered by date (and by
+    insertion order for the same date), and only the earliest one is
+    scheduled in the model Agenda: no process is spawned per request, and
+    modules are not blocked waiting for the date of a request.
+    """
+    def __init__(self, agenda):
+        """Create a new, empty, RequestCalendar.
+        Arguments:
+            agenda -- the Agenda used to trigger deliveries
+        """
+        self.agenda = agenda
+        self.__heap = list()
+        self.__seq = 0
+
+    def add(self, request, socket):
+        """Deliver request in socket (a RequestSocket) at request.when"""
+        self.__seq += 1
+        heapq.heappush(self.__heap, (request.when, self.__seq, request, socket))
+        self.__arm()
+
+    def load(self, entries):
+        """Add a collection of (request, socket) tuples at once (the heap is
+        built in linear time)."""
+        heap = self.__heap
+        seq = self.__seq
+        for (request, socket) in entries:
+            seq += 1
+            heap.append((request.when, seq, request, socket))
+        self.__seq = seq
+        heapq.heapify(heap)
+        self.__arm()
+
+    def __len__(self):
+        """Return the number of requests waiting for their date"""
+        return len(self.__heap)
+
+    def __arm(self):
+        """Schedule the delivery of the earliest request"""
+        if self.__heap:
+            self.agenda.add(self.__heap[0][0], self.__deliver, key=self)
+
+    def __deliver(self, arg):
+        """Callback: deliver every request that is due"""
+        now = self.agenda.env.now
+        heap = self.__heap
+        while heap and heap[0][0] <= now:
+            (when, seq, request, socket) = heapq.heappop(heap)
+            socket.deliver(request)
+        self.__arm()
+
+
+class RequestSocket(simpy.FilterStore):
+    """
+    The request socket of a module. It is a FilterStore, except that a
+    request whose date is in the future is not put in the store immediately,
+    but in the model RequestCalendar, that delivers it at its date: modules
+    only get requests that are due.
+    """
+    def __init__(self, env, calendar):
+        """Create a new RequestSocket.
+        Arguments:
+            env -- the simpy Environment
+            calendar -- the RequestCalendar that holds future-dated requests
+        """
+        simpy.FilterStore.__init__(self, env)
+        self.calendar = calendar
+
+    def put(self, item):
+        """Put item in the socket, or in the calendar if item is a request
+        whose date is in the future. Return the (triggered) put event."""
+        when = getattr(item, 'when', None)
+        if when is not None and when > self._env.now:
+            self.calendar.add(item, self)
+            event = self._env.event()
+            event.succeed()
+            return event
+        return simpy.FilterStore.put(self, item)
+
+    def deliver(self, item):
+        """Put item in the socket, regardless of its date"""
+        return simpy.FilterStore.put(self, item)
+
+
+class Genealogy(object):
+    """The Genealogy of a model indexes the composition of assembled
+    products. It keeps a parent pointer for each component, and for each
+    composite product the flat list of all its (direct and indirect)
+    components, in assembly order. These lists are updated incrementally when
+    products are assembled and disassembled, so that the components of a
+    product, or the product that contains a component, are obtained without
+    walking the component trees. Products are identified by their pid, so that
+    the index remains valid once products have been archived.
+    """
+
+    def __init__(self):
+        """Create a new empty Genealogy."""
+        self.__parent = dict()
+        self.__components = dict()
+
+    def clear(self):
+        """Remove every product from the index."""
+        self.__parent.clear()
+        self.__components.clear()
+
+    def assemble(self, parent, component):
+        """Record that component (a pid) has been assembled in parent (a
+        pid). The components of component are also added to the lists of
+        parent and of its ancestors."""
+        self.__parent[component] = parent
+        added = [component]
+        added.extend(self.__components.get(component, ()))
+        while parent is not None:
+            self.__components.setdefault(parent, []).extend(added)
+            parent = self.__parent.get(parent)
+
+    def disassemble(self, parent, component):
+        """Record that component (a pid) has been taken out of parent (a
+        pid)."""
+        del self.__parent[component]
+        removed = set(self.__components.get(component, ()))
+        removed.add(component)
+        while parent is not None:
+            remaining = [c for c in self.__components[parent] if c not in removed]
+            if remaining:
+                self.__components[parent] = remaining
+            else:
+                del self.__components[parent]
+            parent = self.__parent.get(parent)
+
+    def forget(self, pid):
+        """Remove pid and all its components from the index (e.g. once they
+        have been archived). pid must not be a component."""
+        for component in self.__components.pop(pid, ()):
+            del self.__parent[component]
+            self.__components.pop(component, None)
+
+    def parent(self, pid):
+        """Return the pid of the product that directly contains pid, or None."""
+        return self.__parent.get(pid)
+
+    def root(self, pid):
+        """Return the pid of the outermost product that contains pid (pid
+        itself if it is not a component)."""
+        parent = self.__parent.get(pid)
+        while parent is not None:
+            pid = parent
+            parent = self.__parent.get(pid)
+        return pid
+
+    def components(self, pid):
+        """Return the list of the pids of all the components of pid
+        (including components of components)."""
+        return list(self.__components.get(pid, ()))
+
+
+class ProductIndex(object):
+    """The ProductIndex of a model keeps track of active products: their
+    current location (the holder or the space actuator that contains them),
+    the number of active products of each type, and the number of located
+    products (work in process) in each model and submodel. It is updated by
+    holders, space actuators and products themselves, independently of the
+    history level of the model.
+
+    Locations and models are identified by their fullname.
+    """
+
+    def __init__(self):
+        """Create a new empty ProductIndex."""
+        self.__location = dict()
+        self.__content = dict()
+        self.__type_count = dict()
+        self.__wip = dict()
+        self.__names = dict()
+
+    def clear(self):
+        """Remove every product from the index."""
+        self.__location.clear()
+        self.__content.clear()
+        self.__type_count.clear()
+        self.__wip.clear()
+        self.__names.clear()
+
+    def __names_of(self, module):
+        """Return the fullname of module and the fullnames of the models
+        that (directly or indirectly) contain it."""
+        names = self.__names.get(module)
+        if names is None:
+            models = list()
+            model = module.model
+            while True:
+                models.append(model.fullname())
+                if model.is_main:
+                    break
+                model = model.model
+            names = self.__names[module] = (module.fullname(), models)
+        return names
+
+    def add(self, product):
+        """Add a newly created product in the index."""
+        product_type = product.product_type
+        self.__type_count[product_type] = self.__type_count.get(product_type, 0) + 1
+
+    def remove(self, product):
+        """Remove a disposed product from the index."""
+        self.move(product, None)
+        self.__type_count[product.product_type] -= 1
+
+    def move(self, product, location):
+        """Set the location of product.
+
+        Arguments:
+            product -- the product that moves
+            location -- the module (holder or actuator) where the product now
+                        is, or None if the product is not located anymore
+                        (e.g. it has been assembled in another product)
+        """
+        pid = product.pid
+        old = self.__location.pop(pid, None)
+        if old is not None:
+            (name, models) = self.__names_of(old)
+            del self.__content[name][pid]
+            for model in models:
+                self.__wip[model] -= 1
+        if location is not None:
+            self.__location[pid] = location
+            (name, models) = self.__names_of(location)
+            self.__content.setdefault(name, dict())[pid] = product
+            for model in models:
+                self.__wip[model] = self.__wip.get(model, 0) + 1
+
+    def location(self, pid):
+        """Return the fullname of the location of product pid, or None."""
+        location = self.__location.get(pid)
+        if location is None:
+            return None
+        return self.__names_of(location)[0]
+
+    def products_at(self, location):
+        """Return the list of active products in location (a fullname)."""
+        return list(self.__content.get(location, {}).values())
+
+    def count(self, product_type):
+        """Return the number of active products of type product_type."""
+        return self.__type_count.get(product_type, 0)
+
+    def wip(self, model='main'):
+        """Return the number of located products in model (a fullname,
+        default = 'main') and in its submodels."""
+        return self.__wip.get(model, 0)
+
+
+class FailureScheduler(object):
+    """The FailureScheduler of a model triggers the beginnings and ends of
+    all the Failure modules, using the model Agenda (i.e. a single heap and
+    timer for all the failures, instead of one process per Failure). Times to
+    failure and times to repair are drawn in blocks for each failure (see
+    properties.Registry.evaluate_block). mtbf and mttr are arbitrary
+    expressions of the model random number generator (rng), that numpy
+    cannot vectorize: a block is still drawn value by value, only the
+    compilation of the expression and its context are shared.
+
+    Attributes:
+        block -- the number of times drawn at once for each failure
+    """
+
+    def __init__(self, agenda, block=64):
+        """Create a new FailureScheduler.
+
+        Arguments:
+            agenda -- the Agenda used to schedule the failures
+            block -- the number of times drawn at once (default = 64)
+        """
+        self.agenda = agenda
+        self.block = block
+        self.__streams = dict()
+
+    def __draw(self, failure, name):
+        """Return the next value of property name ('mtbf' or 'mttr') of
+        failure"""
+        stream = self.__streams[failure][name]
+        if not stream:
+            stream.extend(reversed(failure.properties.evaluate_block(name, self.block)))
+        return stream.pop()
+
+    def add(self, failure):
+        """Schedule the first occurrence of failure. The first time to
+        failure is drawn when the emulation starts (i.e. after the random
+        number generator has been seeded)."""
+        if failure.properties.get('mtbf') is None or failure.properties.get('mttr') is None:
+            logger.warning(_("failure {0} has no mtbf or mttr: it is ignored").format(failure.name))
+            return
+        self.__streams[failure] = {'mtbf': list(), 'mttr': list()}
+        self.agenda.add(self.agenda.env.now, self.__schedule, failure)
+
+    def __schedule(self, failure):
+        """Schedule the next beginning of failure."""
+        date = self.agenda.env.now + self.__draw(failure, 'mtbf')
+        self.agenda.add(date, self.__begin, failure)
+
+    def __begin(self, failure):
+        """Callback: begin failure, and schedule its end."""
+        mttr = self.__draw(failure, 'mttr')
+        failure.begin(mttr)
+        self.agenda.add(self.agenda.env.now + mttr, self.__end, (failure, mttr))
+
+    def __end(self, arg):
+        """Callback: end failure, and schedule its next beginning if it
+        repeats."""
+        (failure, mttr) = arg
+        failure.end(mttr)
+        if failure.properties['repeat']:
+            self.__schedule(failure)
 
 
 class Product(object):
@@ -620,11 +1431,25 @@ class Product(object):
     Attribute:
         create_time -- time when the product was create
         dispose_time -- time when this product was disposed
-        properties -- a dictionary of physical properties
+        quantity -- the number of identical units represented by this
+                    product (a lot), 1 by default
+        properties -- the physical properties (a properties.ProductProperties,
+                      whose names are shared by all products of the same type)
         components -- a dictionary of other products that compose this one
         space_history -- history of space transformations
         shape_history -- history of shape transformations
         composition_history -- history of assembling
+        move_count -- the number of space transformations of this product
+        transformation_count -- the number of shape transformations of this
+                                product
+
+    How much history is kept depends on the history level of the model (see
+    Model.set_history_level). Counters are kept up to date at every level but
+    'none'.
+
+    To keep products small, attributes are stored in slots, and the
+    components dictionary and the history lists are only allocated when they
+    are first used.
 
 
     Product composition:
@@ -632,9 +1457,21 @@ class Product(object):
     by a 'key'. the default key is the empty string. If an assembly is requested
     with a key already associated with a product, the assembly is done on the 
     component.
+
+    Lots:
+    A product can represent a lot of identical units (quantity > 1). A lot
+    moves, is transformed and disposed as a single object; programs that have
+    a 'per_unit' transform set to True charge their time once per unit. Lots
+    can be split and merged.
     """
+    __slots__ = ('pid', 'model', 'create_time', 'dispose_time', 'product_type',
+                 'quantity', 'properties', '_components', '_space_history',
+                 '_shape_history', '_composition_history', 'move_count',
+                 'transformation_count', '__active', '__weakref__')
 
-    def __init__(self, model, pid=0, product_type='defaultType'):
+    history_levels = ('none', 'summary', 'sampled', 'full')
+
+    def __init__(self, model, pid=0, product_type='defaultType', quantity=1):
         """Create a new product with its product identifier given from parameter
         'pid', and its type from parameter 'product_type'
         If 'pid' as already been given to another product or is defaulted,
@@ -645,33 +1482,80 @@ class Product(object):
             model -- the emulation model
             pid -- the identifier of the new product instance (default = )
             product_type -- the type of the new product (default = 'defaultType')
+            quantity -- the number of units in the lot (default = 1)
 
         Raises:
             EmulicaError, if the pid has already been given to another product
         """
-        if not pid == 0 and pid in model.products:
+        # Get the top level model (i.e. 'main')
+        self.model = model.top_level()
+        if not pid == 0 and self.model.pid_used(pid):
             raise EmulicaError(model, _("product ID {0} has already been used").format(pid))
-        while pid == 0 or pid in model.products:
+        while pid == 0 or self.model.pid_used(pid):
             pid = model.next_pid()
         self.pid = pid
-        # Get the top level model (i.e. 'main')
-        self.model = model.top_level()
         self.model.products[pid] = self
+        self.model.active_products[pid] = self
         if self.model.get_sim():
             self.create_time = model.current_time()
         else:
             self.create_time = 0
         self.dispose_time = 0
         self.product_type = product_type
-        self.properties = properties.Registry(self, model.rng)
-        #self.attributes = dict()
-        self.components = dict()
-        self.space_history = list()
-        self.shape_history = list()
-        self.composition_history = list()
+        self.quantity = quantity
+        self.model.product_index.add(self)
+        schema = self.model.product_schemas.get(product_type)
+        if schema is None:
+            schema = self.model.product_schemas[product_type] = properties.Schema()
+        self.properties = properties.ProductProperties(self, schema)
+        self._components = None
+        self._space_history = None
+        self._shape_history = None
+        self._composition_history = None
+        self.move_count = 0
+        self.transformation_count = 0
         self.__active = True
-        logger.info(_("product {pid} created at {time}").format(pid=self.pid,
-                                                                time=self.create_time))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(_("product {pid} created at {time}").format(pid=self.pid,
+                                                                    time=self.create_time))
+
+    @property
+    def components(self):
+        if self._components is None:
+            self._components = dict()
+        return self._components
+
+    @property
+    def space_history(self):
+        if self._space_history is None:
+            self._space_history = list()
+        return self._space_history
+
+    @property
+    def shape_history(self):
+        if self._shape_history is None:
+            self._shape_history = list()
+        return self._shape_history
+
+    @property
+    def composition_history(self):
+        if self._composition_history is None:
+            self._composition_history = list()
+        return self._composition_history
+
+    def __record(self, history, entry):
+        """Add entry (whose first element is a date) in history, according
+        to the history level of the model."""
+        level = self.model.history_level
+        if level == 'full' or not history:
+            history.append(entry)
+        elif level == 'summary':
+            if len(history) < 2:
+                history.append(entry)
+            else:
+                history[-1] = entry
+        elif entry[0] - history[-1][0] >= self.model.history_period:
+            history.append(entry)
 
     def record_position(self, space):
         """
@@ -682,10 +1566,13 @@ class Product(object):
         Arguments:
             space -- the new space of the product
         """
-        now = self.model.current_time()
-        self.space_history.append((now, space))
-        for child in self.components.values():
-            child.record_position(space)
+        if self.model.history_level == 'none':
+            return
+        self.move_count += 1
+        self.__record(self.space_history, (self.model.current_time(), space))
+        if self._components:
+            for child in self._components.values():
+                child.record_position(space)
 
     def record_transformation(self, start, end, actuator, program):
         """
@@ -698,21 +1585,36 @@ class Product(object):
             actuator -- name of the module executing the transformation
             program -- the program being executed
         """
-        self.shape_history.append((start, end, actuator, program))
-        for child in self.components.values():
-            child.record_transformation(start, end, actuator, program)
+        if self.model.history_level == 'none':
+            return
+        self.transformation_count += 1
+        self.__record(self.shape_history, (start, end, actuator, program))
+        if self._components:
+            for child in self._components.values():
+                child.record_transformation(start, end, actuator, program)
 
     def dispose(self):
         """
-        Dispose this product: dispose time is set to current time.
+        Dispose this product: dispose time is set to current time. If the
+        model has an archive, the product is moved into it, and removed from
+        model.products.
         """
         if self.__active:
             self.dispose_time = self.model.current_time()
             logger.info(_("product {pid} disposed at {time}").format(pid=self.pid,
                                                                      time=self.dispose_time))
             self.__active = False
-            for child in self.components.values():
-                child.dispose()
+            self.model.active_products.pop(self.pid, None)
+            self.model.product_index.remove(self)
+            if self._components:
+                for child in self._components.values():
+                    child.dispose()
+            archive = self.model.archive
+            if archive is not None:
+                archive.store(self)
+                self.model.products.pop(self.pid, None)
+                if self.model.genealogy.parent(self.pid) is None:
+                    self.model.genealogy.forget(self.pid)
         else:
             logger.warning(_("""warning, not disposing product {pid} at {time}: not active""").format(pid=self.pid, time=self.model.current_time()))
 
@@ -723,7 +1625,8 @@ class Product(object):
         a disassembing process). By default, the key is the number of the added
         component (first is 0).
         """
-        self.composition_history.append((self.model.current_time(), actuator, component.pid))
+        if not self.model.history_level == 'none':
+            self.__record(self.composition_history, (self.model.current_time(), actuator, component.pid))
         if '.' in key:
             (head, remain) = key.split('.', 1)
         else:
@@ -731,6 +1634,8 @@ class Product(object):
             remain = ''
         if head not in self.components:
             self.components[head] = component
+            self.model.genealogy.assemble(self.pid, component.pid)
+            self.model.product_index.move(component, None)
         else:
             self.components[head].assemble(component, actuator, remain)
 
@@ -755,8 +1660,100 @@ class Product(object):
         else:
             # TODO: add something in history
             del self.components[head]
+            self.model.genealogy.disassemble(self.pid, component.pid)
             return component
 
+    def __check_split(self, quantity):
+        """Raise an EmulicaError if quantity units of this lot (and the
+        matching share of each of its components) cannot be split."""
+        if not 0 < quantity < self.quantity:
+            raise EmulicaError(self.model, _("cannot split {0} units from lot {1} of {2} units").format(quantity, self.pid, self.quantity))
+        if self._components:
+            for component in self._components.values():
+                (units, remainder) = divmod(component.quantity * quantity, self.quantity)
+                if remainder:
+                    raise EmulicaError(self.model, _("cannot split {0} units from lot {1}: component {2} of {3} units cannot be shared").format(quantity, self.pid, component.pid, component.quantity))
+                component.__check_split(units)
+
+    def split(self, quantity):
+        """Take quantity units out of this lot, and return them as a new lot
+        of the same type, with the same physical properties and history. The
+        new lot is not located: it is up to the caller to put it in a holder
+        (see Holder.put_product), or to assemble it in a product. The
+        components of this lot are partitioned in proportion: each component
+        gives the new lot a lot of component.quantity * quantity /
+        self.quantity units, under the same key.
+
+        Arguments:
+            quantity -- the number of units of the new lot
+
+        Raises:
+            EmulicaError, if quantity is not between 1 and self.quantity - 1,
+            or if a component cannot be partitioned in proportion
+        """
+        self.__check_split(quantity)
+        return self.__split(quantity)
+
+    def __split(self, quantity):
+        """Split quantity units of this lot (see split), once checked."""
+        lot = Product(self.model, product_type=self.product_type, quantity=quantity)
+        for (prop, value) in self.properties.items():
+            lot.properties[prop] = value
+        lot.space_history.extend(self.space_history)
+        lot.shape_history.extend(self.shape_history)
+        if self._components:
+            for (key, component) in self._components.items():
+                part = component.__split(component.quantity * quantity // self.quantity)
+                lot.components[key] = part
+                self.model.genealogy.assemble(lot.pid, part.pid)
+        self.quantity -= quantity
+        return lot
+
+    def __check_merge(self, lot):
+        """Raise an EmulicaError if lot (and its components) cannot be merged
+        into this lot."""
+        if lot.product_type != self.product_type:
+            raise EmulicaError(self.model, _("cannot merge lot {0} of type {1} into lot {2} of type {3}").format(lot.pid, lot.product_type, self.pid, self.product_type))
+        if lot is self or not lot.is_active():
+            raise EmulicaError(self.model, _("cannot merge lot {0} into lot {1}").format(lot.pid, self.pid))
+        if set(lot._components or ()) != set(self._components or ()):
+            raise EmulicaError(self.model, _("cannot merge lot {0} into lot {1}: their components differ").format(lot.pid, self.pid))
+        if lot._components:
+            for (key, component) in lot._components.items():
+                self._components[key].__check_merge(component)
+
+    def merge(self, lot):
+        """Add the units of another lot of the same type to this one. The
+        components of lot are merged into the components of this lot that
+        have the same key. The merged lot is disposed: it must have been
+        taken out of its holder (or actuator) first.
+
+        Arguments:
+            lot -- the product to merge into this one
+
+        Raises:
+            EmulicaError, if the lot type is not the same as this one, if
+            their components do not have the same keys, or if lot is still
+            located in a holder (or an actuator) or assembled in a product
+        """
+        location = self.model.product_index.location(lot.pid)
+        if location is None:
+            location = self.model.genealogy.parent(lot.pid)
+        if not location is None:
+            raise EmulicaError(self.model, _("cannot merge lot {0}: it must be taken out of {1} first").format(lot.pid, location))
+        self.__check_merge(lot)
+        self.__merge(lot)
+
+    def __merge(self, lot):
+        """Merge lot into this lot (see merge), once checked."""
+        self.quantity += lot.quantity
+        if lot._components:
+            for key in list(lot._components):
+                component = lot._components.pop(key)
+                self.model.genealogy.disassemble(lot.pid, component.pid)
+                self._components[key].__merge(component)
+        lot.dispose()
+
     def __getitem__(self, name):
         """Provide convenient access to the properties of the module."""
         return self.properties[name]
@@ -769,29 +1766,116 @@ class Product(object):
         return self.__active
     
     def all_components(self):
-        """Return a list of all products that have the current product as ancestor.
+        """Return a list of all products that have the current product as
+        ancestor, in assembly order (see Genealogy). Components that have
+        been disposed and archived on their own are left out. Archived
+        products are not indexed anymore: their components are listed depth
+        first.
         """
-        result = []
-        for c in self.components.values():
-            result.append(c)
-            result.extend(c.all_components())
+        if not self._components:
+            return []
+        if self.__active or self.model.archive is None:
+            products = self.model.products
+            return [products[pid] for pid in self.model.genealogy.components(self.pid)
+                    if pid in products]
+        result = list()
+        for component in self._components.values():
+            result.append(component)
+            result.extend(component.all_components())
         return result
 
+    def root(self):
+        """Return the pid of the outermost product that contains this one
+        (its own pid if it is not a component)."""
+        return self.model.genealogy.root(self.pid)
+
 
-class Request(object):
+class Message(object):
+    """
+    The base class of Request and Report: an immutable message, with six
+    attributes (who, where, why, how, when, what). Messages have no
+    per-instance dictionary, their who and what strings are interned, and
+    messages without parameters share the same (read-only) empty how
+    mapping. To get a modified message, use replace.
+    """
+    __slots__ = ('who', 'what', 'how', 'when', 'where', 'why')
+
+    no_params = MappingProxyType(dict())
+    """The how attribute of messages without parameters"""
+
+    def __init__(self, who, what, where=None, when=None, why='', how=None):
+        """Create a new message (see Request and Report)"""
+        if type(who) is str:
+            who = sys.intern(who)
+        if type(what) is str:
+            what = sys.intern(what)
+        _setattr(self, 'who', who)
+        _setattr(self, 'what', what)
+        _setattr(self, 'where', where or who)
+        _setattr(self, 'when', when)
+        _setattr(self, 'why', why)
+        #how is copied, so that the caller cannot modify the message later
+        _setattr(self, 'how', MappingProxyType(dict(how)) if how else Message.no_params)
+
+    def __eq__(self, other):
+        """Test whether two reports or request are equals.
+        They are considered equals if all their field are.
+        """
+        if not isinstance(other, Message):
+            return NotImplemented
+        return (self.who == other.who and self.what == other.what and
+                self.when == other.when and self.where == other.where and
+                self.how == other.how and self.why == other.why)
+
+    __hash__ = None
+
+    def __setattr__(self, name, value):
+        raise AttributeError(_("messages are immutable: use replace"))
+
+    def __delattr__(self, name):
+        raise AttributeError(_("messages are immutable"))
+
+    def replace(self, **changes):
+        """Return a copy of this message, where the attributes given as
+        keyword arguments (who, what, where, when, why, how) are replaced."""
+        fields = {'who': self.who,
+                  'what': self.what,
+                  'where': self.where,
+                  'when': self.when,
+                  'why': self.why,
+                  'how': self.how}
+        fields.update(changes)
+        return self.__class__(fields['who'], fields['what'],
+                              location=fields['where'],
+                              date=fields['when'],
+                              comment=fields['why'],
+                              params=dict(fields['how']))
+
+    def __reduce__(self):
+        """Support pickling and copying"""
+        return (self.__class__, (self.who, self.what, self.where, self.when, self.why, dict(self.how)))
+
+    def __copy__(self):
+        """Messages are immutable: a copy is the message itself"""
+        return self
+
+
+class Request(Message):
     """
     A request triggers a change in the meulation model
     It has six attributes: (who, where, why, how, when, what)
+    Requests are immutable (see Message).
 
     Attributes:
         who -- the entity in the model that must execute the action
         what - the name of the action to be executed
-        how - a dictionary of parameters to configure the action
+        how - a (read-only) mapping of parameters to configure the action
         when -- the date at which the action must be executed
         where -- the location where the action must be executed
                  (i.e. the same as who in most cases)
         why -- a human-readable comment string
     """
+    __slots__ = ()
 
     def __init__(self, actor, action, location=None, date=None, comment='', params=None):
         """
@@ -801,19 +1885,14 @@ class Request(object):
             actor -- the name of the module who must execute the request (who)
             action -- what to execute
             params -- a dictionnary containing instruction on how to perform
-                      the request (default = empty dict)
+                      the request (default = no parameters)
             location -- where the request should take place (usually not
                         usefull) (default = same value as actor)
             date -- the date at when the action must begin (default = now)
             comment -- a human-readable description of the request (why)
                        (default = empty str)
         """
-        self.who = actor
-        self.where = location or actor
-        self.how = params or dict()
-        self.why = comment
-        self.what = action
-        self.when = date
+        Message.__init__(self, actor, action, location, date, comment, params)
 
     def __repr__(self):
         """Return a human-readable string representation of a Request"""
@@ -822,7 +1901,7 @@ class Request(object):
                                                             when=self.when)
         opt_param = list()
         if self.how:
-            opt_param.append(_("parameters={0}").format(str(self.how)))
+            opt_param.append(_("parameters={0}").format(str(dict(self.how))))
         if self.where:
             opt_param.append(_("location={0}").format(self.where))
         if self.why:
@@ -831,28 +1910,23 @@ class Request(object):
             return "{0} ({1})".format(s, ", ".join(opt_param))
         return s
 
-    def __eq__(self, other):
-        """Test whether two reports or request are equals.
-        They are considered equals if all their field are.
-        """
-        for i in ['who', 'what', 'when', 'where', 'how', 'why']:
-            if not getattr(self, i) == getattr(other, i):
-                return False
-        return True
-
 
-class Report(object):
+class Report(Message):
     """A report give information about an event that has occured in the emulation model
     It has six attributes: (who, where, why, how, when, what)
+    Reports are immutable (see Message): once sent, a report may be shared
+    by several receivers.
 
     Attributes:
         who -- the entity in the model that relates to the event
         what -- the name of the event that has occured
-        how -- a dictionary of parameters that give additionnal information about the event
+        how -- a (read-only) mapping of parameters that give additionnal information about the event
         when -- the date at which the event took place
         where -- the location where the event has been observed (i.e. the same as who in most cases)
         why -- a human-readable comment string
     """
+    __slots__ = ()
+
     def __init__(self, source, event, location=None, date=None, comment='', params=None):
         """Create a new instance of a Request
         Arguments:
@@ -863,21 +1937,7 @@ class Report(object):
             params -- any additionnal information describing the event (how)
             comment -- an interpretation/explanation of the event (why)
         """
-        self.who = source
-        self.what = event
-        self.when = date
-        self.where = location or source
-        self.how = params or dict()
-        self.why = comment
-
-    def __eq__(self, other):
-        """Test whether two reports or request are equals.
-        They are considered equals if all their field are.
-        """
-        for i in ['who', 'what', 'when', 'where', 'how', 'why']:
-            if not getattr(self, i) == getattr(other, i):
-                return False
-        return True
+        Message.__init__(self, source, event, location, date, comment, params)
 
     def __repr__(self):
         """Return a human-readable string representation of a Report"""
@@ -886,7 +1946,7 @@ class Report(object):
                                                              when=self.when)
         opt_param = list()
         if self.how:
-            opt_param.append(_("parameters={0}").format(str(self.how)))
+            opt_param.append(_("parameters={0}").format(str(dict(self.how))))
         if self.where:
             opt_param.append(_("location={0}").format(self.where))
         if self.why != None and self.why:
@@ -923,64 +1983,153 @@ class Actuator(Module):
     Abstract class that is used by every module that act on products.
 
     Attributes:
-        resource -- the SimPy Resource associated with this actuator
+        resource -- the SimPy Resource associated with this actuator (its
+                    capacity is the number of servers)
+        repaired -- while the actuator is completely failed, an event that
+                    is triggered when it is repaired (None otherwise)
         trace -- execution trace. A list of tupple of the form '(begin, end, state)'
+        slot_traces -- the execution trace of each server (slot)
         performance_ratio -- a positive float that represent the performance ratio
+        processes -- the ModuleProcess of each server (slot). Each process
+                     has a slot attribute (its index), and a must_interrupt
+                     attribute, that is True while it can be interrupted by
+                     a failure.
+
+    Actuators that have a 'servers' property (space and shape actuators) run
+    as many ModuleProcess as servers, that concurrently serve requests from
+    the same request socket, using the same program table.
     """
     def __init__(self, model, name):
         """Create an Actuator."""
         Module.__init__(self, model, name)
         self.trace = list()
+        self.slot_traces = [list()]
         self.__rec = list()
         self.performance_ratio = 1.
-        self.must_interrupt = False
+        self.repaired = None
 
-    def record_begin(self, state):
+    def server_count(self):
+        """Return the number of servers of this actuator (the value of the
+        'servers' property, or 1 if the actuator has no such property)"""
+        if 'servers' in self.properties.keys():
+            return max(1, self.properties['servers'])
+        return 1
+
+    def record_begin(self, state, slot=0):
         """Record resource operation as a list of tupples (start, end, program).
         Program is tre name of the program being executed, or 'setup' or 'failed'
+
+        Arguments:
+            state -- the state that begins
+            slot -- the server that executes the operation (default = 0)
         """
-        self.__rec.append((self.model.current_time(), state))
+        self.__rec.append((self.model.current_time(), state, slot))
         self.emit(Module.STATE_CHANGE_SIGNAL, state)
 
-    def record_end(self, state=None):
+    def record_end(self, state=None, slot=0):
         """Record the end of a state. If the optional parameter state is specified,
         the first record of this state is ended. If not specified, the first
-        record of the stack is ended"""
-        if not len(self.__rec) == 0:
-            if state:
-                i = len(self.__rec) - 1
-                while self.__rec[i][1] != state and i >= 0:
-                    i -= 1
-                rec = self.__rec[i]
-                self.__rec.remove(rec)
-            else:
-                rec = self.__rec.pop()
-            self.trace.append((rec[0], self.model.current_time(), rec[1]))
+        record of the stack is ended. Only the records of the given server
+        (slot) are considered."""
+        i = len(self.__rec) - 1
+        while i >= 0 and (self.__rec[i][2] != slot or (state and self.__rec[i][1] != state)):
+            i -= 1
+        if i >= 0:
+            (begin, rec_state, slot) = self.__rec.pop(i)
+            record = (begin, self.model.current_time(), rec_state)
+            self.trace.append(record)
+            self.slot_traces[slot].append(record)
         self.emit(Module.STATE_CHANGE_SIGNAL, 'idle')
         #else : throw exception
 
     def initialize(self):
         """Make a module ready to be simulated"""
         Module.initialize(self)
+        servers = self.server_count()
         #reset traces
         self.trace = list()
+        self.slot_traces = [list() for slot in range(servers)]
         self.__rec = list()
         #reset perf ratio
         self.performance_ratio = 1.
+        self.repaired = None
         ##this resource is used to apply faillures on an actuation process
-        self.resource = simpy.Resource(env=self.get_sim())
-        #ModuleProcess is defined in sub-classes
-        self.process = self.ModuleProcess(sim=self.get_sim())
-        self.action = self.get_sim().process(self.process.run(self))
+        self.resource = simpy.Resource(env=self.get_sim(), capacity=servers)
+        #ModuleProcess is defined in sub-classes, one is started for each server
+        self.processes = list()
+        self.actions = list()
+        for slot in range(servers):
+            process = self.ModuleProcess(sim=self.get_sim())
+            process.slot = slot
+            process.must_interrupt = False
+            self.processes.append(process)
+            self.actions.append(self.get_sim().process(process.run(self)))
+        self.process = self.processes[0]
+        self.action = self.actions[0]
         self.emit(Module.STATE_CHANGE_SIGNAL, 'idle')
 
     def degrade(self, ratio, caller):
         """Degrade or restore performance of an actuator, by multipling its
         performance ratio by ratio. This method will check if the actuator is
-        currently running, and if so, cancel it."""
+        currently running, and if so, cancel it. Processes that wait for the
+        actuator to be repaired are woken up when the performance ratio
+        becomes positive again."""
         self.performance_ratio = max(0.0, self.performance_ratio - ratio)
-        if self.must_interrupt:
-            self.action.interrupt()
+        for (process, action) in zip(self.processes, self.actions):
+            if process.must_interrupt:
+                action.interrupt()
+                #several failures may begin at the same date: interrupt once
+                process.must_interrupt = False
+        if self.performance_ratio > 0 and self.repaired is not None:
+            self.repaired.succeed()
+            self.repaired = None
+
+    def hold(self, process, work):
+        """Generate the SimPy events to hold process (a ModuleProcess of
+        this actuator) during the time needed to execute an amount of work
+        expressed in nominal time (i.e. at performance ratio 1). The hold is
+        preemptible: when the performance ratio changes (see degrade), the
+        remaining work is computed again. While the actuator is completely
+        failed, the process waits for the repaired event. If the actuator has
+        an availability calendar, its breaks are added to the hold time.
+
+        Usage:
+            yield from module.hold(self, time)
+        """
+        env = self.get_sim()
+        calendar = None
+        if 'calendar' in self.properties.keys() and not self.properties['calendar'].is_empty():
+            calendar = self.properties['calendar']
+        left = work
+        while left > 0:
+            ratio = self.performance_ratio
+            if ratio > 0:
+                start = env.now
+                if calendar is None:
+                    delay = left / ratio
+                else:
+                    #breaks are skipped by interval arithmetic: one timeout
+                    delay = calendar.finish(start, left / ratio) - start
+                process.must_interrupt = True
+                try:
+                    yield env.timeout(delay)
+                    left = 0
+                except simpy.Interrupt:
+                    #performance ratio has changed
+                    if calendar is None:
+                        left -= ratio * (env.now - start)
+                    else:
+                        left -= ratio * calendar.available_time(start, env.now)
+                process.must_interrupt = False
+            else:
+                #actuator is failed: wait until it is (at least partially) repaired
+                if self.repaired is None:
+                    self.repaired = env.event()
+                try:
+                    yield self.repaired
+                except simpy.Interrupt:
+                    #performance ratio has changed again: check it
+                    pass
 
     def add_program(self, name, delay, prog_transform=None, prog_resources=[]):
         """Add a program to the actuator's program_table.
@@ -1031,6 +2180,11 @@ class Failure(Module):
 
     Attributes:
 
+    Failures do not have their own process: the model FailureScheduler
+    triggers their beginning and end. The beginning and end of a failure are
+    applied to all the actuators of the process list at once, and reported
+    once (reports are 'failure-begin' and 'failure-end').
+
     Properties:
         process_list -- a list of Actuators on which to apply the failure
         mtbf -- mean time before failure
@@ -1079,54 +2233,39 @@ class Failure(Module):
         return value
 
     def add_actuator(self, actuator):
-        self.process_list.append(actuators)
+        self.properties['process_list'].append(actuator)
 
     def initialize(self):
-        """Make a module ready to be simulated"""
+        """Make a module ready to be simulated: the failure is scheduled
+        by the model FailureScheduler."""
         Module.initialize(self)
-        self.process = self.ModuleProcess(sim=self.get_sim())
-        self.action = self.get_sim().process(self.process.run(self))
-
-    class ModuleProcess:
-
-        def __init__(self, sim):
-            self.env = sim
-
-        def run(self, module):
-            """Process Excecution Method"""
-            loop = True
-            while loop:
-                #wait some time before failure
-                yield self.env.timeout(module.get_mtbf())
-                #preempt resource, record failure
-                degradation = module.properties['degradation']
-                mttr = module.get_mttr()
-                for act in module.properties['process_list']:
-                    if degradation > 0.:
-                        act.degrade(degradation, module)
-                    else:
-                        act.degrade(1, module)
-                    #report failure
-                    report = Report(module.fullname(),
+        self.model.top_level().failure_scheduler.add(self)
+
+    def begin(self, mttr):
+        """Degrade all the actuators of the process list, and report the
+        beginning of the failure."""
+        degradation = self.properties['degradation'] or 1.
+        for act in self.properties['process_list']:
+            act.degrade(degradation, self)
+            act.record_begin('failure')
+        if self.is_observed():
+            self.send_report(Report(self.fullname(),
                                     'failure-begin',
-                                    params={'mttr': mttr, 'degradation': degradation})
-                    yield module.report_socket.put(report)
-                    act.record_begin('failure')
-                #repair delay
-                yield self.env.timeout(mttr)
-                #release resource, record end
-                for act in module.properties['process_list']:
-                    if degradation > 0:
-                        act.degrade(-degradation, module)
-                    else:
-                        act.degrade(-1, module)
-                    #report failure end
-                    report = Report(module.fullname(),
+                                    params={'mttr': mttr, 'degradation': self.properties['degradation']},
+                                    date=self.model.current_time()))
+
+    def end(self, mttr):
+        """Restore all the actuators of the process list, and report the
+        end of the failure."""
+        degradation = self.properties['degradation'] or 1.
+        for act in self.properties['process_list']:
+            act.degrade(-degradation, self)
+            act.record_end('failure')
+        if self.is_observed():
+            self.send_report(Report(self.fullname(),
                                     'failure-end',
-                                    params={'mttr': mttr, 'degradation': degradation})
-                    yield module.report_socket.put(report)
-                    act.record_end('failure')
-                loop = module.properties['repeat']
+                                    params={'mttr': mttr, 'degradation': self.properties['degradation']},
+                                    date=self.model.current_time()))
 
 
 class CreateAct(Actuator):
@@ -1135,7 +2274,8 @@ class CreateAct(Actuator):
     if this attribute is a dictionary containing a key 'productID', this ID
     will be used to create the product. If it contains a key 'productType'
     the product created will have this type (a string); If there is a key
-    productClass, a product of this class will be instanciated.
+    productClass, a product of this class will be instanciated. If it
+    contains a key 'quantity', a lot of this number of units is created.
 
     Properties:
         destination -- destination holder
@@ -1143,14 +2283,14 @@ class CreateAct(Actuator):
                         will have
 
     Attributes:
-        quantity_created -- the number of product created
+        quantity_created -- the number of product units created
 
     Raise:
         EmulicaError -- if destination is None when the module is activated
     """
 
     produce_keyword = 'create'
-    request_params = ['productType', 'productID']
+    request_params = ['productType', 'productID', 'quantity']
 
     def __init__(self, model, name, destination=None):
         Actuator.__init__(self, model, name)
@@ -1170,6 +2310,42 @@ class CreateAct(Actuator):
         self.quantity_created = 0
         Actuator.initialize(self)
 
+    def make_product(self, pid=0, prod_type='defaulType', quantity=1, phys=None):
+        """Instanciate a new product, with the physical properties of the
+        module (product_prop), superseded by phys.
+
+        Arguments:
+            pid -- the product ID (default = 0: a new ID is used)
+            prod_type -- the product type (default = 'defaulType')
+            quantity -- the number of units of the product (default = 1)
+            phys -- a dictionary of physical properties (default = None)
+
+        Returns:
+            the new product
+        """
+        self.quantity_created += quantity
+        self.emit(Module.STATE_CHANGE_SIGNAL, prod_type)
+        prod = Product(self.model, pid, prod_type, quantity)
+        #Set physical properties of the product
+        for (prop, value) in self.properties['product_prop'].items():
+            prod[prop] = value
+        if phys:
+            for (prop, value) in phys.items():
+                if prop in self.properties['product_prop'].keys():
+                    logger.warning(_("""physical property {0} from create request supersedes property from module""").format(prop))
+                prod[prop] = value
+        return prod
+
+    def release(self, prod):
+        """Generate the SimPy events to put a new product in the destination
+        holder, and to report its creation.
+
+        Usage:
+            yield from module.release(prod)
+        """
+        yield from self.properties['destination'].put_product(prod)
+        yield from self.publish('create-done', date=self.get_sim().now)
+
     class ModuleProcess:
         def __init__(self, sim):
             self.env = sim
@@ -1183,9 +2359,6 @@ class CreateAct(Actuator):
                 ##wait for a request to arrive
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = self.env.now
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 if 'productID' in request_cmd.how.keys():
                     pid = request_cmd.how['productID']
                 else:
@@ -1194,22 +2367,151 @@ class CreateAct(Actuator):
                     prod_type = request_cmd.how['productType']
                 else:
                     prod_type = 'defaulType'
-                module.quantity_created += 1
-                module.emit(Module.STATE_CHANGE_SIGNAL, prod_type)
-                prod = Product(module.model, pid, prod_type)
-                #Set physical properties of the product
-                for (prop, value) in module.properties['product_prop'].items():
-                    prod[prop] = value
-                if 'physical-properties' in request_cmd.how.keys():
-                    for (prop, value) in request_cmd.how['physical-properties'].items():
-                        if prop in module.properties['product_prop'].keys():
-                            logger.warning(_("""physical property {0} from create request supersedes property from module""").format(prop))
-                        prod[prop] = value
+                quantity = int(request_cmd.how.get('quantity', 1))
+                prod = module.make_product(pid, prod_type, quantity,
+                                           request_cmd.how.get('physical-properties'))
                 if request_cmd.what == CreateAct.produce_keyword:
-                    for ev in module.properties['destination'].put_product(prod):
-                        yield ev
-                    report = Report(module.fullname(), 'create-done', date=self.env.now)
-                    yield module.report_socket.put(report)
+                    yield from module.release(prod)
+
+
+class ArrivalGenerator(Module):
+    """An ArrivalGenerator creates products using a CreateAct, at arrival
+    dates that are either random or recorded. Products are created directly
+    (there is no Request sent to the CreateAct). Three kinds of arrivals are
+    supported:
+     - trace-driven, if the trace property is not empty: products arrive at
+       the recorded dates;
+     - non-stationary (piecewise constant rate, by thinning a Poisson
+       process), if the rates property is not empty;
+     - stationary (Poisson process of rate 'rate') otherwise.
+
+    Interarrival times and product types are drawn in blocks, using numpy
+    (the numpy generator is seeded from the model random number generator).
+
+    Properties:
+        create -- the CreateAct used to create products
+        rate -- the mean number of arrivals per time unit (stationary)
+        rates -- a list of (start, rate) tuples: the arrival rate is rate
+                 from date start to the next start (non-stationary)
+        period -- if not 0, the rate profile repeats with this period
+        trace -- a list of arrival dates, or of (date, product type)
+                 tuples (trace-driven)
+        mix -- a dictionary that associates product types with their
+               proportion of the arrivals (if empty, products have the
+               default type)
+        block -- the number of interarrival times drawn at once
+
+    Attributes:
+        arrival_count -- the number of arrivals since the beginning of the run
+    """
+
+    def __init__(self, model, name, create=None, rate=1.):
+        """Create a new ArrivalGenerator.
+
+        Arguments:
+            model -- the model
+            name -- the module name
+            create -- the CreateAct used to create products (default = None)
+            rate -- the mean number of arrivals per time unit (default = 1.)
+        """
+        Module.__init__(self, model, name)
+        self.properties.add_with_display('create',
+                                         properties.Display.REFERENCE,
+                                         create,
+                                         _("Create actuator"))
+        self.properties.add_with_display('rate', properties.Display.FLOAT, rate, _("Arrival rate"))
+        self.properties.add_with_display('rates', properties.Display.VALUE, list(), _("Arrival rates"))
+        self.properties.add_with_display('period', properties.Display.FLOAT, 0., _("Period"))
+        self.properties.add_with_display('trace', properties.Display.VALUE, list(), _("Arrival dates"))
+        self.properties.add_with_display('mix', properties.Display.VALUE, dict(), _("Product mix"))
+        self.properties.add_with_display('block', properties.Display.INT, 1024, _("Block size"))
+        self.arrival_count = 0
+        self.model.register_emulation_module(self)
+
+    def initialize(self):
+        """Make the module ready to be simulated"""
+        Module.initialize(self)
+        self.arrival_count = 0
+        if self.properties['create'] is None:
+            raise EmulicaError(self, _("""This module has not be properly initialized: create actuator has not been set"""))
+        self.process = self.ModuleProcess(sim=self.get_sim())
+        self.action = self.get_sim().process(self.process.run(self))
+
+    def __types(self, gen, size):
+        """Draw size product types from the mix (or return a list of None)"""
+        mix = self.properties['mix']
+        if not mix:
+            return [None] * size
+        names = list(mix.keys())
+        weights = numpy.array([mix[name] for name in names], dtype=float)
+        choice = gen.choice(len(names), size=size, p=weights / weights.sum())
+        return [names[i] for i in choice]
+
+    def __rate_profile(self):
+        """Return the sorted starts and rates of the rate profile, as numpy
+        arrays"""
+        profile = sorted(self.properties['rates'])
+        starts = numpy.array([start for (start, rate) in profile], dtype=float)
+        rates = numpy.array([rate for (start, rate) in profile], dtype=float)
+        return (starts, rates)
+
+    def arrivals(self, gen, start=0.):
+        """Iterate over the arrivals, as (date, product type) tuples. The
+        product type is None if no mix is defined.
+
+        Arguments:
+            gen -- the numpy random Generator
+            start -- the date of the beginning of arrivals (default = 0.)
+        """
+        block = max(1, self.properties['block'])
+        trace = self.properties['trace']
+        if trace:
+            for i in range(0, len(trace), block):
+                chunk = trace[i:i + block]
+                types = self.__types(gen, len(chunk))
+                for (entry, prod_type) in zip(chunk, types):
+                    if isinstance(entry, (tuple, list)):
+                        yield (entry[0], entry[1])
+                    else:
+                        yield (entry, prod_type)
+            return
+        if self.properties['rates']:
+            (starts, rates) = self.__rate_profile()
+            period = self.properties['period']
+            rate_max = rates.max()
+        else:
+            rate_max = self.properties['rate']
+        if rate_max <= 0:
+            return
+        t = start
+        while True:
+            dates = t + numpy.cumsum(gen.exponential(1. / rate_max, block))
+            t = dates[-1]
+            if self.properties['rates']:
+                #thinning: accept each candidate with probability rate(t)/rate_max
+                offsets = dates % period if period > 0 else dates
+                index = numpy.searchsorted(starts, offsets, side='right') - 1
+                rate = numpy.where(index >= 0, rates[numpy.maximum(index, 0)], 0.)
+                dates = dates[gen.random(block) * rate_max < rate]
+            types = self.__types(gen, len(dates))
+            for (date, prod_type) in zip(dates.tolist(), types):
+                yield (date, prod_type)
+
+    class ModuleProcess:
+        def __init__(self, sim):
+            self.env = sim
+
+        def run(self, module):
+            "Process Execution Method"
+            create = module.properties['create']
+            #the numpy generator is seeded once the model generator is seeded
+            gen = numpy.random.default_rng(module.model.rng.getrandbits(64))
+            for (date, prod_type) in module.arrivals(gen, self.env.now):
+                if date > self.env.now:
+                    yield self.env.timeout(date - self.env.now)
+                module.arrival_count += 1
+                prod = create.make_product(prod_type=prod_type or 'defaulType')
+                yield from create.release(prod)
 
 
 class DisposeAct(Actuator):
@@ -1246,17 +2548,13 @@ class DisposeAct(Actuator):
                 ##wait for a resquest to arrive
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = self.env.now
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 if request_cmd.what == DisposeAct.produce_keyword:
                     lock_rq = module.properties['source'].lock.request()
                     yield lock_rq
                     prod = module.properties['source'].fetch_product()
                     prod.dispose()
                     module.properties['source'].lock.release(lock_rq)
-                    report = Report(module.fullname(), 'dispose-done', date=self.env.now)
-                    yield module.report_socket.put(report)
+                    yield from module.publish('dispose-done', date=self.env.now)
                     module.emit(Module.STATE_CHANGE_SIGNAL, None)
 
 
@@ -1269,7 +2567,10 @@ class SpaceAct(Actuator):
     Attributes:
         program_table -- a dictionary of programs, identified by their names
         setup -- Setup Matrix
-        program -- programm currently set up
+        program -- programm currently set up (by the last server that did
+                   a setup)
+        servers -- number of servers, i.e. of products that can be moved
+                   concurrently (each server has its own setup state)
     """
 
     produce_keyword = 'move'
@@ -1293,6 +2594,14 @@ class SpaceAct(Actuator):
                                          properties.Display.SETUP,
                                          properties.SetupMatrix(self.properties, 0, 'setup'),
                                          _("Setup matrix"))
+        self.properties.add_with_display('calendar',
+                                         properties.Display.CALENDAR,
+                                         properties.Calendar(self.properties, 'calendar'),
+                                         _("Availability calendar"))
+        self.properties.add_with_display('servers',
+                                         properties.Display.INT,
+                                         1,
+                                         _("Servers"))
         self.program = None
         self.model.register_emulation_module(self)
 
@@ -1302,81 +2611,56 @@ class SpaceAct(Actuator):
 
         def run(self, module):
             """Process Execution Method"""
+            self.program = module.program
             while True:
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = self.env.now
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 ##if requested action is 'setup', perform setup
                 new_program = request_cmd.how['program']
                 if not new_program in module.properties['program_table'].keys():
                     raise EmulicaError(module,
                                        _("program {0} is not in the program table".format(new_program)))
-                if request_cmd.what == 'setup' or (request_cmd.what == SpaceAct.produce_keyword and module.program != new_program):
+                if request_cmd.what == 'setup' or (request_cmd.what == SpaceAct.produce_keyword and self.program != new_program):
                     logger.info(_("module {name} doing setup at {t}").format(name=module.name,
                                                                              t=self.env.now))
-                    implicit = (module.program != new_program)
-                    for yield_elt in self.__setup(new_program, module, implicit):
-                        yield yield_elt
+                    implicit = (self.program != new_program)
+                    yield from self.__setup(new_program, module, implicit)
                 #if requested action is 'produce', perform setup if needed,
                 #and transform the product
                 if request_cmd.what == SpaceAct.produce_keyword:
                     #retrieve one product from source holder (according to prog)
-                    source = module.properties['program_table'][module.program].transform['source']
+                    source = module.properties['program_table'][self.program].transform['source']
                     #request own resource (to model failure)
                     resource_rq = module.resource.request()
                     yield resource_rq
                     prog_res_rq = {}
                     # Request program's resource
-                    for res in module.properties['program_table'][module.program].resources:
+                    for res in module.properties['program_table'][self.program].resources:
                         rq = res.request()
                         prog_res_rq[res] = rq
                         yield rq
-                    module.record_begin(module.program)
+                    module.record_begin(self.program, self.slot)
                     #lock source holder
                     src_lock_rq = source.lock.request()
                     yield src_lock_rq
                     #fetch product from source
                     product = source.fetch_product()
                     #record product position (space name is the name of this actuator)
+                    module.model.top_level().product_index.move(product, module)
                     product.record_position(module.fullname())
                     #unlock source
                     source.lock.release(src_lock_rq)
                     #report state change
-                    report = Report(module.fullname(),
-                                    'busy',
-                                    params={'program':module.program},
-                                    date=self.env.now)
-                    yield module.report_socket.put(report)
+                    yield from module.publish('busy',
+                                              params={'program':self.program},
+                                              date=self.env.now)
                     # transportation delay
-                    # multiplied by the degradation ratio
-                    time = module.properties['program_table'][module.program].time(product)
-                    time /= module.performance_ratio
+                    time = module.properties['program_table'][self.program].time(product)
                     #hold (with interruption)
-                    self.must_interrupt = True
-                    old_ratio = module.performance_ratio
-                    left = time
-                    while left > 0:
-                        try:
-                            if module.performance_ratio > 0:
-                                #performance is degraded
-                                start = self.env.now
-                                yield self.env.timeout(left / module.performance_ratio)
-                                left = left - module.performance_ratio * left
-                            else:
-                                #resource is failed : loop on wait indefinitely (until interruption)
-                                yield self.env.timeout(1)
-                            #The hold statement returns : the production time has completely elapsed
-                        except simpy.Interrupt:
-                            # process has been interrupted by a failure :
-                            # modification of performance ratio
-                            left = left - old_ratio * (self.env.now - start)
-                            old_ratio = module.performance_ratio
-                    self.must_interrupt = False
+                    yield from module.hold(self, time)
                     #release resources and record end
                     ##put product in destination holder (according to prog)
-                    dest = module.properties['program_table'][module.program].transform['destination']
+                    dest = module.properties['program_table'][self.program].transform['destination']
                     #no need to lock destination (done in put_product)
                     #put product in destination holder
                     for ev in dest.put_product(product):
@@ -1386,13 +2670,11 @@ class SpaceAct(Actuator):
                         res.release(rq)
                     #release own resouce
                     module.resource.release(resource_rq)
-                    module.record_end(module.program)
+                    module.record_end(self.program, self.slot)
                     #report state change
-                    report = Report(module.fullname(),
-                                    'idle',
-                                    params={'program': module.program},
-                                    date=self.env.now)
-                    yield module.report_socket.put(report)
+                    yield from module.publish('idle',
+                                              params={'program': self.program},
+                                              date=self.env.now)
 
         def __setup(self, new_program, module, implicit):
             """Generate SimPy signals to execute a setup.
@@ -1401,21 +2683,18 @@ class SpaceAct(Actuator):
             if not new_program in module.properties['program_table'].keys():
                 raise EmulicaError(module, "No program named {0}".format(new_program))
             #setup time : the actuator resource is requested, and released after setup time
-            setup = module.properties['setup'].get(module.program, new_program)
+            setup = module.properties['setup'].get(self.program, new_program)
             resource_rq = module.resource.request()
             yield resource_rq
-            module.record_begin('setup')
-            delay = setup
-            yield self.env.timeout(delay)
+            module.record_begin('setup', self.slot)
+            yield from module.hold(self, setup)
             module.resource.release(resource_rq)
-            module.record_end('setup')
-            module.program = new_program
+            module.record_end('setup', self.slot)
+            self.program = module.program = new_program
             if not implicit:
-                report = Report(module.fullname(),
-                                'setup-done',
-                                params={'program':module.program},
-                                date=self.env.now)
-                yield module.report_socket.put(report)
+                yield from module.publish('setup-done',
+                                          params={'program':self.program},
+                                          date=self.env.now)
 
 
 class ShapeAct(Actuator):
@@ -1426,7 +2705,19 @@ class ShapeAct(Actuator):
         program_table --
         setup --
         holder --
-        program --
+        program -- programm currently set up (by the last server that did
+                   a setup)
+        servers -- number of servers, i.e. of products that can be
+                   transformed concurrently. With one server, the holder is
+                   locked during the whole transformation, and every product
+                   in it is transformed. With several servers, each server
+                   takes the first product of the holder that is not
+                   already being transformed, and has its own setup state.
+        batch -- maximum number of products transformed by one request
+                 (default 1). In batch mode, the program change table is
+                 applied to the first products of the holder, and they are
+                 all transformed during the same period (the program time
+                 of the first product).
 
     Raises:
         EmulicaError -- if holder has not been set at activation time
@@ -1450,10 +2741,22 @@ class ShapeAct(Actuator):
                                          properties.Display.SETUP,
                                          properties.SetupMatrix(self.properties, 0, 'setup'),
                                          _("Setup matrix"))
+        self.properties.add_with_display('calendar',
+                                         properties.Display.CALENDAR,
+                                         properties.Calendar(self.properties, 'calendar'),
+                                         _("Availability calendar"))
         self.properties.add_with_display('holder',
                                          properties.Display.REFERENCE,
                                          holder,
                                          _("Holder"))
+        self.properties.add_with_display('servers',
+                                         properties.Display.INT,
+                                         1,
+                                         _("Servers"))
+        self.properties.add_with_display('batch',
+                                         properties.Display.INT,
+                                         1,
+                                         _("Batch size"))
         self.program = None
         self.model.register_emulation_module(self)
 
@@ -1465,61 +2768,39 @@ class ShapeAct(Actuator):
             """Process Execution Method"""
             if module.properties['holder'] is None:
                 raise EmulicaError(self, _("""This module has not be properly initialized: holder has not been set"""))
+            self.program = module.program
+            exclusive = (module.server_count() == 1)
             while True:
                 #wait for a request to arrive
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = self.env.now
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 ##if requested action is 'setup', perform setup
                 if 'program' in request_cmd.how:
                     new_program = request_cmd.how['program']
                 else:
-                    new_program = module.program
-                if request_cmd.what == 'setup' or (request_cmd.what == ShapeAct.produce_keyword and module.program != new_program):
+                    new_program = self.program
+                if request_cmd.what == 'setup' or (request_cmd.what == ShapeAct.produce_keyword and self.program != new_program):
                     logger.info(_("module {name} doing setup at {t}").format(name=module.name,
                                                                              t=self.env.now))
-                    implicit = (module.program != new_program)
-                    setup = module.properties['setup'].get(module.program, new_program)
+                    implicit = (self.program != new_program)
+                    setup = module.properties['setup'].get(self.program, new_program)
                     #request own resource, and record beginning of operation
                     resource_rq = module.resource.request()
                     yield resource_rq
-                    module.record_begin('setup')
+                    module.record_begin('setup', self.slot)
                     #setup delay
                     delay = setup
                     #hold (with interruption)
-                    module.must_interrupt = True
-                    old_ratio = module.performance_ratio
-                    left = delay
-                    while left > 0:
-                        try:
-                            if module.performance_ratio > 0:
-                                #performance is degraded
-                                timeout_start = self.env.now
-                                yield self.env.timeout(left / module.performance_ratio)
-                                left = left - module.performance_ratio * left
-                            else:
-                                #resource is failed : loop on wait indefinitely (until interruption)
-                                yield self.env.timeout(1)
-                            #The hold statement returns : the production time has completely elapsed
-                        except simpy.Interrupt:
-                            # process has been interrupted by a failure :
-                            # modification of performance ratio
-                            left = left - old_ratio * (self.env.now - timeout_start)
-                            old_ratio = module.performance_ratio
-                    module.must_interrupt = False
-                    module.program = new_program
+                    yield from module.hold(self, delay)
+                    self.program = module.program = new_program
                     #release own resource, record end
                     module.resource.release(resource_rq)
-                    module.record_end('setup')
+                    module.record_end('setup', self.slot)
                     #report if not implicit
                     if not implicit:
-                        report = Report(module.fullname(),
-                                        'setup-done',
-                                        params={'program':module.program},
-                                        date=self.env.now)
-                        yield module.report_socket.put(report)
+                        yield from module.publish('setup-done',
+                                                  params={'program':self.program},
+                                                  date=self.env.now)
                 #now do the actual production
                 if request_cmd.what == ShapeAct.produce_keyword:
                     #request own resource, record beginning
@@ -1528,81 +2809,78 @@ class ShapeAct(Actuator):
                     #request program's resources
                     #TODO: request a resource allocation lock before, to avoid interlocking
                     prog_res_rq = {}
-                    for res in module.properties['program_table'][module.program].resources:
+                    for res in module.properties['program_table'][self.program].resources:
                         rq = res.request()
                         prog_res_rq[res] = rq
                         yield rq
-                    module.record_begin(module.program)
+                    module.record_begin(self.program, self.slot)
                     #lock the workplace holder
                     holder_rq = module.properties['holder'].lock.request()
                     yield holder_rq
-                    products = module.properties['holder'].get_products()
+                    holder = module.properties['holder']
+                    batch = max(1, module.properties['batch'])
+                    if exclusive:
+                        #treated products are the ones that are changed
+                        treated = products = holder.get_first_products(batch)
+                        if len(holder.internal) > batch:
+                            logger.warning(_("cannot treat more than {0} product(s) at once").format(batch))
+                            if batch == 1:
+                                #the transformation is recorded on every product
+                                products = holder.get_products()
+                    else:
+                        #claim the first products that no server treats or
+                        #has treated, and let the other servers access the holder
+                        treated = products = holder.get_first_products(batch, holder.claimed | holder.finished)
+                        if not products:
+                            raise EmulicaError(module, _("no product available in holder {0}").format(module.properties['holder'].name))
+                        holder.claimed.update([p.pid for p in treated])
+                        module.properties['holder'].lock.release(holder_rq)
+                    product = treated[0]
                     #report busy
-                    report = Report(module.fullname(),
-                                    'busy',
-                                    params={'program':module.program},
-                                    date=self.env.now)
-                    yield module.report_socket.put(report)
-                    product = products[0]
-                    if len(products) > 1:
-                        logger.warning(_("cannot treat more than one product at once"))
-                    time = module.properties['program_table'][module.program].time(product)
-                    time /= module.performance_ratio
-                    if 'change' in module.properties['program_table'][module.program].transform:
+                    yield from module.publish('busy',
+                                              params={'program':self.program},
+                                              date=self.env.now)
+                    time = module.properties['program_table'][self.program].time(product)
+                    if 'change' in module.properties['program_table'][self.program].transform:
                         #TODO: verify when setting changeset that it is not None !
-                        changeset = (module.properties['program_table'][module.program].transform['change'] or {})
-                        for (prop, value) in changeset.items():
-                            if prop in product.properties.keys():
-                                if type(value) == str:
-                                    product.properties.eval_and_set(prop, value)
+                        changeset = (module.properties['program_table'][self.program].transform['change'] or {})
+                        for p in treated:
+                            for (prop, value) in changeset.items():
+                                if prop in p.properties.keys():
+                                    if type(value) == str:
+                                        p.properties.eval_and_set(prop, value)
+                                    else:
+                                        p.properties[prop] = value
                                 else:
-                                    product.properties[prop] = value
-                            else:
-                                logger.warning(_("could not find physical property {0}").format(prop))
+                                    logger.warning(_("could not find physical property {0}").format(prop))
                     #record start
                     start = self.env.now
                     #hold (with interruption)
-                    module.must_interrupt = True
-                    old_ratio = module.performance_ratio
-                    left = time
-                    while left > 0:
-                        try:
-                            if module.performance_ratio > 0:
-                                #performance is degraded
-                                timeout_start = self.env.now
-                                yield self.env.timeout(left / module.performance_ratio)
-                                left = left - module.performance_ratio * left
-                            else:
-                                #resource is failed : loop on wait indefinitely (until interruption)
-                                yield self.env.timeout(1)
-                            #The hold statement returns : the production time has completely elapsed
-                        except simpy.Interrupt:
-                            # process has been interrupted by a failure :
-                            # modification of performance ratio
-                            left = left - old_ratio * (self.env.now - timeout_start)
-                            old_ratio = module.performance_ratio
-                    module.must_interrupt = False
+                    yield from module.hold(self, time)
                     #release resources and record end
                     for p in products:
                         p.record_transformation(start,
                                                 self.env.now,
                                                 module.fullname(),
-                                                module.program)
+                                                self.program)
                         #transformation is recorded at the *end* of the transformation period,
                         # and specify both its start and end date
                     #unlock holder
-                    module.properties['holder'].lock.release(holder_rq)
+                    if exclusive:
+                        module.properties['holder'].lock.release(holder_rq)
+                    else:
+                        #treated products wait in the holder to be fetched
+                        holder.claimed.difference_update([p.pid for p in treated])
+                        holder.finished.update([p.pid for p in treated])
                     #release program's resources
                     for res, rq in prog_res_rq.items():
                         res.release(rq)
                     #release own resource, record end
                     module.resource.release(resource_rq)
-                    module.record_end(module.program)
-                    report = Report(module.fullname(),
-                                    'idle',
-                                    params={'program':module.program},
-                                    date=self.env.now)
-                    yield module.report_socket.put(report)
+                    module.record_end(self.program, self.slot)
+                    yield from module.publish('idle',
+                                              params={'program':self.program},
+                                              date=self.env.now)
 
 
 class AssembleAct(Actuator):
@@ -1649,6 +2927,10 @@ class AssembleAct(Actuator):
                                                                 0,
                                                                 'setup'),
                                          _("Setup matrix"))
+        self.properties.add_with_display('calendar',
+                                         properties.Display.CALENDAR,
+                                         properties.Calendar(self.properties, 'calendar'),
+                                         _("Availability calendar"))
         self.model.register_emulation_module(self)
 
     class ModuleProcess:
@@ -1663,10 +2945,6 @@ class AssembleAct(Actuator):
             while True:
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = module.model.current_time()
-                if request_cmd.when and request_cmd.when > now:
-                    logger.debug(_("""module {name} waiting {time}...""").format(name=module.name, delay=request_cmd.when - now()))
-                    yield self.env.timeout(request_cmd.when - now)
                 ##if requested action is 'setup', perform setup
                 if 'program' in request_cmd.how:
                     new_program = request_cmd.how['program']
@@ -1679,12 +2957,10 @@ class AssembleAct(Actuator):
                     implicit = (module.program != new_program)
                     logger.info(_("module {name} doing setup at {t}").format(name=module.name,
                                                                              t=now))
-                    for yield_elt in self.__setup(new_program, module, implicit):
-                        yield yield_elt
+                    yield from self.__setup(new_program, module, implicit)
                 if request_cmd.what == AssembleAct.produce_keyword:
                     logger.info(_("""module {name} doing assembly at{t}""").format(name=module.name, t=module.model.current_time()))
-                    for yield_elt in self.__produce(module):
-                        yield yield_elt
+                    yield from self.__produce(module)
                 logger.info(_("module {name} ready at {t}").format(name=module.name,
                                                                    t=module.model.current_time()))
 
@@ -1699,9 +2975,7 @@ class AssembleAct(Actuator):
             yield resource_rq
             module.record_begin('setup')
             #setup delay
-            delay = setup / module.performance_ratio
-            for elt in self.__hold(delay, module):
-                yield elt
+            yield from module.hold(self, setup)
             module.program = new_program
             #release own resource, record end
             module.resource.release(resource_rq)
@@ -1709,11 +2983,9 @@ class AssembleAct(Actuator):
             #report
             logger.debug(_("finished setup on module {0}").format(module. name))
             if not implicit:
-                report = Report(module.fullname(),
-                                'setup-done',
-                                params={'program':module.program},
-                                date=self.env.now)
-                yield module.report_socket.put(report)
+                yield from module.publish('setup-done',
+                                          params={'program':module.program},
+                                          date=self.env.now)
 
         def __produce(self, module):
             #request own resource, record begining
@@ -1725,7 +2997,7 @@ class AssembleAct(Actuator):
             logger.debug(_("locking holder on module {0}").format(module. name))
             holder_rq = module.properties['holder'].lock.request()
             yield holder_rq
-            masters = module.properties['holder'].get_products()
+            masters = module.properties['holder'].get_first_products(2)
             #then fetch product to assemble from holder
             logger.debug(_("fetching products to assemble in module {0}").format(module. name))
             program = module.properties['program_table'][module.program]
@@ -1737,16 +3009,14 @@ class AssembleAct(Actuator):
             source.lock.release(source_rq)
             #send a busy report
             start = self.env.now
-            yield module.report_socket.put(Report(module.fullname(),
-                                                   'busy',
-                                                   params={'program':module.program},
-                                                   date=self.env.now))
-            time = program.time()
-            time /= module.performance_ratio
+            yield from module.publish('busy',
+                                      params={'program':module.program},
+                                      date=self.env.now)
+            #the time is charged on the master product (if any)
+            time = program.time(masters[0] if masters else assemblee)
             #TODO: manage physical attribute
             #hold (with interruption)
-            for elt in self.__hold(time, module):
-                yield elt
+            yield from module.hold(self, time)
             #release resources and record end
             if len(masters) > 1: logger.warning(_("""ignoring product in holder {0} other than the first one""").format(module.properties['holder'].name))
             if len(masters) >= 1:
@@ -1767,23 +3037,9 @@ class AssembleAct(Actuator):
             module.resource.release(resource_rq)
             module.record_end(module.program)
             #send a report
-            yield module.report_socket.put(Report(module.fullname(),
-                                                   'idle',
-                                                   params={'program':module.program},
-                                                   date=self.env.now))
-
-        def __hold(self, time, module):
-            old_ratio = module.performance_ratio
-            while time != 0:
-                yield self.env.timeout(time)
-                #The hold statement returns : either the production time has
-                #completely elapsed, or it has been interrupted by a failure (cancel called)
-                #TODO
-                #if (self.interrupted()):
-                #    time = self.interruptLeft * old_ratio / module.performance_ratio
-                #    old_ratio = module.performance_ratio
-                #else:
-                time = 0
+            yield from module.publish('idle',
+                                      params={'program':module.program},
+                                      date=self.env.now)
 
 
 class DisassembleAct(Actuator):
@@ -1815,6 +3071,10 @@ class DisassembleAct(Actuator):
                                          properties.Display.SETUP,
                                          properties.SetupMatrix(self.properties, 0, 'setup'),
                                          _("Setup matrix"))
+        self.properties.add_with_display('calendar',
+                                         properties.Display.CALENDAR,
+                                         properties.Calendar(self.properties, 'calendar'),
+                                         _("Availability calendar"))
         self.properties.add_with_display('program_table',
                                          properties.Display.PROGRAM_TABLE,
                                          properties.ProgramTable(self.properties,
@@ -1836,9 +3096,6 @@ class DisassembleAct(Actuator):
                 logger.debug(_("'disassembleAct {0} waiting for requests").format(module.name))
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = module.current_time()
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 ##if requested action is 'setup', perform setup
                 if 'program' in request_cmd.how:
                     new_program = request_cmd.how['program']
@@ -1853,24 +3110,19 @@ class DisassembleAct(Actuator):
                     yield resource_rq
                     module.record_begin('setup')
                     #setup delay
-                    delay = setup / module.performance_ratio
-                    for elt in self.__hold(delay, module):
-                        yield elt
+                    yield from module.hold(self, setup)
                     module.program = new_program
                     #release own resource, record end
                     module.resource.release(resource_rq)
                     module.record_end('setup')
                     #report
                     if not implicit:
-                        report = Report(module.fullname(),
-                                        'setup-done',
-                                        params={'program':module.program},
-                                        date=self.env.now)
-                        yield module.report_socket.put(report)
+                        yield from module.publish('setup-done',
+                                                  params={'program':module.program},
+                                                  date=self.env.now)
                     
                 if request_cmd.what == DisassembleAct.produce_keyword:
-                    for yield_elt in self.__produce(module):
-                        yield yield_elt
+                    yield from self.__produce(module)
 
 
         def __produce(self, module):
@@ -1882,18 +3134,15 @@ class DisassembleAct(Actuator):
             #first lock 'master' product
             holder_rq = module.properties['holder'].lock.request()
             yield holder_rq
-            masters = module.properties['holder'].get_products()
+            masters = module.properties['holder'].get_first_products(2)
             #send a busy report
-            yield module.report_socket.put(Report(module.fullname(),
-                                                  'busy',
-                                                  params={'program':module.program}))
+            yield from module.publish('busy',
+                                      params={'program':module.program})
             #TODO: manage physical attribute
             program = module.properties['program_table'][module.program]
             #hold (with interruption)
-            time = program.time()
-            time /= module.performance_ratio
-            for elt in self.__hold(time, module):
-                yield elt
+            time = program.time(masters[0] if masters else None)
+            yield from module.hold(self, time)
             #release resources and record end
             #get component
             
@@ -1926,17 +3175,9 @@ class DisassembleAct(Actuator):
             logger.debug(_("releasing resource"))
             module.record_end(module.program)
             #send a report
-            yield module.report_socket.put(Report(module.fullname(),
-                                                  'idle',
-                                                  params={'program':module.program},
-                                                  date=self.env.now))
-
-        def __hold(self, time, module):
-            old_ratio = module.performance_ratio
-            while time != 0:
-                #TODO: manage failures
-                yield self.env.timeout(time)
-                time = 0
+            yield from module.publish('idle',
+                                      params={'program':module.program},
+                                      date=self.env.now)
 
 
 class Holder(Module):
@@ -1946,13 +3187,24 @@ class Holder(Module):
     Attributes:
         observers -- a list of observers that monitor this holder
         lock -- a resource that must be requested before accessing the products
+        claimed -- the pids of the products that are being transformed by
+            a multi-server actuator (which does not keep the lock while
+            transforming): they cannot be fetched
+        finished -- the pids of the products that have been transformed by
+            a multi-server actuator, and wait to be fetched: the servers do
+            not claim them again
         monitor -- a Monitor that record the number of products in the holder
         internal -- a HolderState that represent current spacial setting of the products inside
         the holder capacity -- Holder capacity (0 means infinite capacity)
         speed -- Holder speed (0 means inifinite speed)
+        discipline -- the queue discipline, i.e. the order in which products
+            are released: 'fifo' (default), 'lifo', 'priority' (highest
+            'priority' physical property first), 'due_date' (earliest
+            'due_date' first) or 'spt' (shortest 'processing_time' first).
+            Disciplines other than 'fifo' ignore the holder speed.
     """
 
-    def __init__(self, model, name, speed=0, capacity=0):
+    def __init__(self, model, name, speed=0, capacity=0, discipline='fifo'):
         Module.__init__(self, model, name)
         self.observers = list()
         self.properties.add_with_display('capacity',
@@ -1963,15 +3215,41 @@ class Holder(Module):
                                          properties.Display.FLOAT,
                                          speed,
                                          _("Speed"))
+        self.properties.add_with_display('discipline',
+                                         properties.Display.VALUE,
+                                         discipline,
+                                         _("Queue discipline"))
         self.model.register_emulation_module(self)
-        self.internal = HolderState(self)
+        self.internal = self.__new_state()
+
+    def __new_state(self):
+        """Return an empty HolderState that implements the queue discipline"""
+        discipline = self.properties['discipline'] or 'fifo'
+        if discipline == HolderState.discipline:
+            return HolderState(self)
+        if discipline not in IndexedHolderState.disciplines:
+            raise EmulicaError(self, _("unknown queue discipline {0}").format(discipline))
+        return IndexedHolderState(self, discipline)
 
     def initialize(self):
         """Make a module ready to be simulated"""
         Module.initialize(self)
         self.monitor = Monitor(env=self.get_sim())
         self.lock = simpy.Resource(env=self.get_sim(), capacity=1)
+        self.claimed = set()
+        self.finished = set()
         #self.internal = HolderState(self)
+        if (self.properties['discipline'] or 'fifo') != self.internal.discipline:
+            content = list(self.internal.product_list())
+            self.internal = self.__new_state()
+            self.internal.set_content(content)
+        #products set as initial content are indexed again
+        index = self.model.top_level().product_index
+        for p in self.internal.product_list():
+            index.add(p)
+            index.move(p, self)
+        if self.internal.discipline != HolderState.discipline and self.properties['speed'] != 0:
+            logger.warning(_("""speed of holder {0} is ignored by the {1} discipline""").format(self.name, self.internal.discipline))
         self.emit(Module.PROPERTIES_CHANGE_SIGNAL, 'holder')
         self.emit(Module.STATE_CHANGE_SIGNAL, len(self.internal))
     
@@ -1982,6 +3260,9 @@ class Holder(Module):
             products -- the list of products (instance of Products) to use in initialisation
         """
         self.internal.set_content(products)
+        index = self.model.top_level().product_index
+        for p in products:
+            index.move(p, self)
     
     def put_product(self, product):
         """Insert a product at the tail of the queue.
@@ -2004,6 +3285,7 @@ class Holder(Module):
         lock_rq = self.lock.request()
         yield lock_rq
         self.internal.append(product)
+        self.model.top_level().product_index.move(product, self)
         product.record_position(self.fullname())
         self.emit(Module.STATE_CHANGE_SIGNAL, len(self.internal))
         self.__notif_observers(delay=self.internal.observation_delay())
@@ -2011,20 +3293,44 @@ class Holder(Module):
 
     def fetch_product(self):
         """Remove and return the product currently at the head of the queue.
+        Products that are being transformed by a multi-server actuator (see
+        claimed) are skipped: the first product that is not claimed is
+        returned.
 
         Returns:
             the product
 
         Raise:
-            EmulicaError -- if the holder is empty
+            EmulicaError -- if the holder is empty, or if all its products
+                            are being transformed
         """
         if not self.internal.is_first_ready():
             raise EmulicaError(self, _("no product ready in this holder"))
-        prod = self.internal.pop()
+        if self.claimed and self.internal.get_first().pid in self.claimed:
+            products = self.internal.first_products(1, self.claimed)
+            if not products:
+                raise EmulicaError(self, _("all the products of this holder are being transformed"))
+            prod = self.internal.remove(products[0])
+        else:
+            prod = self.internal.pop()
+        self.finished.discard(prod.pid)
+        self.model.top_level().product_index.move(prod, None)
         self.emit(Module.STATE_CHANGE_SIGNAL, len(self.internal))
         self.__notif_observers(delay=self.internal.observation_delay())
         return prod
 
+    def get_first_products(self, n, skip=()):
+        """Return the n first products in the holder, in release order
+        (without removing them). Unlike get_products, the cost does not
+        depend on the number of products in the holder.
+
+        Arguments:
+            n -- the number of products
+            skip -- a collection of pids of products to leave out
+                    (default = ())
+        """
+        return self.internal.first_products(n, skip)
+
     def get_products(self):
         """Return the list of products in the holder (without removing them).
 
@@ -2050,8 +3356,11 @@ class HolderState(object):
 
     Attributes:
     positions -- a dictionary that associate positions (as keys) to products
+    discipline -- the queue discipline implemented (always 'fifo')
 
     """
+    discipline = 'fifo'
+
     def __init__(self, parent):
         #__last_time is the time when position in __products have been computed
         self.__last_time = 0
@@ -2131,6 +3440,15 @@ class HolderState(object):
         self.update_positions()
         return product
 
+    def remove(self, product):
+        """Remove and return product, that may not be the first one"""
+        self.update_positions()
+        i = self.__prod.index(product)
+        del self.__prod[i]
+        del self.__phy_pos[i]
+        self.update_positions()
+        return product
+
     def __len__(self):
         """Return the current number of product in the holder"""
         return len(self.__prod)
@@ -2144,10 +3462,148 @@ class HolderState(object):
     def get_first(self):
         return self.__prod[0]
 
+    def first_products(self, n, skip=()):
+        """Return the n first products (whose pid is not in skip)"""
+        result = list()
+        for p in self.__prod:
+            if len(result) == n:
+                break
+            if p.pid not in skip:
+                result.append(p)
+        return result
+
     def __repr__(self):
         return repr(self.__last_time)+ repr(self.__phy_pos)+ repr(self.__prod)+ repr(self.__parent)
 
 
+class _Descending(object):
+    """A sort key that orders values in reverse order (unlike negation, it
+    works with any comparable value)."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class IndexedHolderState(object):
+    """An IndexedHolderState represent the state of a holder that releases
+    products according to a queue discipline other than FIFO. Products are
+    kept in a heap keyed on one of their physical properties (ties are broken
+    in arrival order), so that the head is found in O(1) and released in
+    O(log n). Products have no physical position: they are all ready.
+
+    Attributes:
+    disciplines -- a dictionary that associate the name of each discipline
+        with a (property name, default value, descending) tuple; LIFO has no
+        property
+    discipline -- the queue discipline implemented
+    """
+    disciplines = {'lifo': (None, None, False),
+                   'priority': ('priority', 0, True),
+                   'due_date': ('due_date', float('inf'), False),
+                   'spt': ('processing_time', float('inf'), False)}
+
+    def __init__(self, parent, discipline):
+        self.discipline = discipline
+        (self.__prop, self.__default, self.__descending) = self.disciplines[discipline]
+        #__heap contains (key, seq, product) tuples
+        self.__heap = list()
+        self.__seq = 0
+        #__sorted caches the ordered product list, until next modification
+        self.__sorted = None
+        self.__parent = parent
+
+    def __key(self, product):
+        """Return the sort key of product"""
+        self.__seq += 1
+        if self.__prop is None:
+            return (-self.__seq, self.__seq)
+        if self.__prop in product.properties:
+            value = product[self.__prop]
+        else:
+            value = self.__default
+        if self.__descending:
+            value = _Descending(value)
+        return (value, self.__seq)
+
+    def last(self):
+        """Return the physical position of the last product in holder"""
+        return 0
+
+    def positions(self):
+        """Return a list of (postion, product) tuples"""
+        return [(0, p) for p in self.product_list()]
+
+    def update_positions(self):
+        """Products have no physical position: nothing to update"""
+
+    def observation_delay(self):
+        return 0
+
+    def append(self, product):
+        (key, seq) = self.__key(product)
+        heapq.heappush(self.__heap, (key, seq, product))
+        self.__sorted = None
+
+    def set_content(self, products):
+        for p in products:
+            self.append(p)
+
+    def pop(self):
+        self.__sorted = None
+        return heapq.heappop(self.__heap)[2]
+
+    def remove(self, product):
+        """Remove and return product, that may not be the first one"""
+        self.__heap = [entry for entry in self.__heap if entry[2] is not product]
+        heapq.heapify(self.__heap)
+        self.__sorted = None
+        return product
+
+    def __len__(self):
+        """Return the current number of product in the holder"""
+        return len(self.__heap)
+
+    def product_list(self):
+        """Return the list of products, in release order"""
+        if self.__sorted is None:
+            self.__sorted = [entry[2] for entry in sorted(self.__heap)]
+        return self.__sorted
+
+    def is_first_ready(self):
+        return len(self.__heap) > 0
+
+    def get_first(self):
+        return self.__heap[0][2]
+
+    def first_products(self, n, skip=()):
+        """Return the n first products (whose pid is not in skip). The heap
+        is walked from its root, in release order, so that only the visited
+        entries are sorted."""
+        result = list()
+        heap = self.__heap
+        if not heap:
+            return result
+        frontier = [(heap[0], 0)]
+        while frontier and len(result) < n:
+            (entry, i) = heapq.heappop(frontier)
+            if entry[2].pid not in skip:
+                result.append(entry[2])
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+        return result
+
+    def __repr__(self):
+        return self.discipline + repr(self.product_list()) + repr(self.__parent)
+
+
 class PushObserver(Module):
     """
     An observer gives information about products.
@@ -2199,17 +3655,18 @@ class PushObserver(Module):
         
         def response(self, product_list):
             """Return a list of reports to send"""
-            report = Report(self.observer.fullname(),
-                            self.observer.properties['event_name'],
-                            location=self.observer.properties['holder'].fullname(),
-                            date=self.observer.get_sim().now)
+            params = dict()
             if self.observer.properties['observe_type']:
-                report.how['productType'] = self.__prod.product_type
+                params['productType'] = self.__prod.product_type
             if self.observer['identify']:
-                report.how['productID'] = self.__prod.pid
+                params['productID'] = self.__prod.pid
             if self.observer['observe_absence']:
-                report.how['present'] = True
-            return report
+                params['present'] = True
+            return Report(self.observer.fullname(),
+                          self.observer.properties['event_name'],
+                          location=self.observer.properties['holder'].fullname(),
+                          date=self.observer.get_sim().now,
+                          params=params)
 
     def __init__(self, model, name, event_name=None, observe_type=True, identify=False, holder=None, observe_absence=False):
         """Create a new instance of an Observer
@@ -2263,26 +3720,19 @@ class PushObserver(Module):
     def initialize(self):
         """Make a module ready to be simulated"""
         Module.initialize(self)
-        self.process = self.ModuleProcess(sim=self.get_sim())
+        self.process = self.ModuleProcess(sim=self.get_sim(),
+                                          agenda=self.model.top_level().agenda)
         self.get_sim().process(self.process.run(self))
 
     class ModuleProcess:
 
-        def __init__(self, sim):
+        def __init__(self, sim, agenda):
             self.env = sim
+            self.agenda = agenda
             self.__reactivate = self.env.event()
-            self.reactivate_dates = []
             self.last_report = None
 
-        def __wait_and_reactivate(self, delay):
-            delayed = self.env.now + delay
-            logger.info(_("t={now}: will reactivate observer at {delayed}").format(now=self.env.now,
-                                                                                   delayed=delayed))
-            yield self.env.timeout(delay)
-            self.reactivate_dates.remove(delayed)
-            self.__reactivate_now()
-
-        def __reactivate_now(self):
+        def __reactivate_now(self, arg=None):
             logger.info(_("t={now}: reactivating obs (ev is {ev})").format(now=self.env.now,
                                                                            ev=self.__reactivate))
             self.__reactivate.succeed()
@@ -2290,15 +3740,21 @@ class PushObserver(Module):
             logger.info(_("""t={t}: observator reactivated; new reactivate event is {ev} """).format(t=self.env.now, ev=self.__reactivate))
 
         def reactivate(self, delay):
+            """Reactivate the observer after delay. The holder calls this
+            method each time its content changes, with the delay after which
+            its first product is ready: the new date therefore supersedes any
+            previously scheduled reactivation.
+            """
             if delay == 0:
+                self.agenda.cancel(self)
                 self.__reactivate_now()
             else:
                 delayed = self.env.now + delay
-                if not delayed in self.reactivate_dates:
-                    self.reactivate_dates.append(delayed)
-                    self.env.process(self.__wait_and_reactivate(delay))
+                if self.agenda.add(delayed, self.__reactivate_now, key=self):
+                    logger.info(_("t={now}: will reactivate observer at {delayed}").format(now=self.env.now,
+                                                                                           delayed=delayed))
                 else:
-                    logger.info("not adding reactivation: already running.")
+                    logger.info("not adding reactivation: already scheduled.")
 
         def run(self, module):
             """Process Execution Method"""
@@ -2307,9 +3763,10 @@ class PushObserver(Module):
                     logger.info(_("t={t}: product not ready").format(t=self.env.now))
                     if self.last_report is not None and module.logic.is_gone(module.product_list):
                         #send message about product no longer present
+                        #(reports are shared by observers: build a new one)
                         rp = self.last_report
-                        rp.how['present'] = False
-                        yield module.report_socket.put(rp)
+                        absence = rp.replace(how=dict(rp.how, present=False))
+                        yield from module.publish_report(absence)
                         self.last_report = None
                     if len(module.product_list):
                         #schedule event when product is ready ?
@@ -2324,7 +3781,7 @@ class PushObserver(Module):
                     if module.properties['observe_absence']:
                         self.last_report = reports
                     logger.info(_("t={0}: observation done!").format(self.env.now))
-                    yield module.report_socket.put(reports)
+                    yield from module.publish_report(reports)
                 logger.info(_("""t={t}: observator passivated; waiting for event {ev} """).format(t=self.env.now, ev=self.reactivate))
                 #yield passivate, self
                 yield self.__reactivate
@@ -2335,7 +3792,7 @@ class PushObserver(Module):
         if self.logic.trigger(self.product_list):
             self.emit(Module.STATE_CHANGE_SIGNAL, True)
             reports = self.logic.response(self.product_list)
-            yield self.report_socket.put(reports)
+            yield from self.publish_report(reports)
 
     def update(self, product_list):
         """Update the internal product list.
@@ -2380,7 +3837,10 @@ class MeasurementObserver(Actuator):
         """Make a module ready to be simulated"""
         Module.initialize(self)
         self.process = self.ModuleProcess(sim=self.get_sim())
-        self.get_sim().process(self.process.run(self))
+        self.process.slot = 0
+        self.process.must_interrupt = False
+        self.processes = [self.process]
+        self.actions = [self.get_sim().process(self.process.run(self))]
 
     class ModuleProcess:
         def __init__(self, sim):
@@ -2396,9 +3856,6 @@ class MeasurementObserver(Actuator):
                 logger.debug(_(f"MeasureObserver {module.name} waiting for requests"))
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = module.current_time()
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 if request_cmd.what != MeasurementObserver.produce_keyword:
                     logger.warning(f"Measurement observer {module.name} received invalid request to do {request_cmd.what}")
                     continue
@@ -2423,10 +3880,6 @@ class MeasurementObserver(Actuator):
                     module.record_begin(program_name)
                     yield self.env.timeout(program.time(product=product))
                     
-                    r = Report(module.fullname(),
-                       module['event_name'],
-                       location=module['holder'].fullname(),
-                       date=module.current_time())
                     # if property doesn't exist: use None
                     if attr_name in product.properties:
                         value = product[attr_name]
@@ -2439,18 +3892,21 @@ class MeasurementObserver(Actuator):
                         d[product.pid] = value
                         for comp in product.all_components():
                             if attr_name in comp.properties:
-                                value = product[attr_name]
+                                value = comp[attr_name]
                             else:
                                 value = None
                             d[comp.pid] = value
-                        r.how[attr_name] = d
-                    else:
-                        r.how[attr_name] = value
-                    logger.info(_("t={0}: observation done!").format(now))
+                        value = d
+                    r = Report(module.fullname(),
+                               module['event_name'],
+                               location=module['holder'].fullname(),
+                               date=module.current_time(),
+                               params={attr_name: value})
+                    logger.info(_("t={0}: observation done!").format(self.env.now))
                     module.record_end()
-                    yield module.report_socket.put(r)
+                    yield from module.publish_report(r)
                 else:
-                    logger.warning(f"at t={now}, no product was ready to be observed")
+                    logger.warning(f"at t={self.env.now}, no product was ready to be observed")
 
 
 
@@ -2483,18 +3939,17 @@ class PullObserver(Module):
         def response(self, product_list):
             """Return one report that give for each product its ID, type and
              position"""
-            r = Report(self.observer.fullname(),
-                       self.observer['event_name'],
-                       location=self.observer['holder'].fullname(),
-                       date=self.observer.current_time())
             id_by_position = dict()
             type_by_position = dict()
             for position, product in product_list.positions():
                 id_by_position[position] = product.pid
                 type_by_position[position] = product.product_type
-            r.how['ID_by_position'] = id_by_position
-            r.how['Type_by_position'] = type_by_position
-            return r
+            return Report(self.observer.fullname(),
+                          self.observer['event_name'],
+                          location=self.observer['holder'].fullname(),
+                          date=self.observer.current_time(),
+                          params={'ID_by_position': id_by_position,
+                                  'Type_by_position': type_by_position})
 
     def __init__(self, model, name, event_name=None, holder=None):
         """Create e new intance of a PullObserver"""
@@ -2529,14 +3984,11 @@ class PullObserver(Module):
             while True:
                 request_cmd = yield module.request_socket.get()
                 logger.info(request_cmd)
-                now = module.current_time()
-                if request_cmd.when and request_cmd.when > now:
-                    yield self.env.timeout(request_cmd.when - now)
                 product_list.update_positions()
                 module.emit(Module.STATE_CHANGE_SIGNAL, True)
                 reports = module.logic.response(product_list)
-                logger.info(_("t={0}: observation done!").format(now))
-                yield module.report_socket.put(reports)
+                logger.info(_("t={0}: observation done!").format(self.env.now))
+                yield from module.publish_report(reports)
 
 
 class EmulicaError(Exception):
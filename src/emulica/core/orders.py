@@ -0,0 +1,191 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de
+# Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+This module feeds create actuators from an order book (a production plan):
+each order (a release time, a product type, an optional product ID, and
+physical properties) becomes a create request, delivered at its release time.
+
+Orders are read lazily, one chunk at a time: a chunk is loaded in the model
+request calendar, and the next chunk is only read when the emulation reaches
+the release time of the last order of the current chunk. The memory used
+does not depend on the size of the order book, which may contain millions
+of orders.
+
+Classes:
+    OrderFeed -- streams an order book into create requests
+
+Functions:
+    column_rows -- iterate over the rows of a columnar order book
+"""
+
+import csv
+import logging
+from itertools import islice
+
+from emulica.core.emulation import Request, CreateAct
+
+logger = logging.getLogger('emulica.orders')
+
+
+def convert(value):
+    """Convert a string read from a CSV file to an int or a float if
+    possible. Non-string values (e.g. from a columnar source) are returned
+    unchanged."""
+    if not isinstance(value, str):
+        return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def column_rows(table):
+    """Iterate over the rows of a columnar order book, given as a mapping
+    from column names to sequences of the same length (e.g. numpy arrays,
+    or the columns of a record batch). Rows are yielded as dictionaries."""
+    names = list(table.keys())
+    for values in zip(*[table[name] for name in names]):
+        yield dict(zip(names, values))
+
+
+class OrderFeed(object):
+    """An OrderFeed reads an order book and puts the corresponding create
+    requests in the model, in time order. The order book is either a CSV
+    file (with a header line), or any iterable of mappings (e.g. rows built
+    from a columnar file), sorted by release time.
+
+    Each row must have a release time column; the product type, product ID,
+    quantity and actuator columns are optional. Every other (non-empty)
+    column is a physical property of the created product.
+
+    Usage:
+        feed = OrderFeed('orders.csv', 'create1')
+        feed.register(model)
+        model.emulate(until=525600)
+
+    Attributes:
+        source -- the file name, file object or iterable of rows
+        actor -- the name of the create actuator (used if the rows have no
+                 actuator column)
+        chunk_size -- the number of orders read at once
+        columns -- dictionary that associates each field of a request
+                   ('time', 'productType', 'productID', 'quantity', 'actor')
+                   with a column name
+        count -- the number of orders read so far
+    """
+
+    default_columns = {'time': 'time',
+                       'productType': 'productType',
+                       'productID': 'productID',
+                       'quantity': 'quantity',
+                       'actor': 'actor'}
+
+    def __init__(self, source, actor=None, chunk_size=1000, columns=None, delimiter=','):
+        """Create a new OrderFeed.
+
+        Arguments:
+            source -- a CSV file name, a CSV file object, or an iterable of
+                      mappings
+            actor -- the name of the create actuator (default = None: each
+                     row must give the actuator name)
+            chunk_size -- the number of orders read at once (default = 1000)
+            columns -- dictionary that overrides the default column names
+                       (default = None)
+            delimiter -- the CSV delimiter (default = ',')
+        """
+        self.source = source
+        self.actor = actor
+        self.chunk_size = chunk_size
+        self.columns = dict(OrderFeed.default_columns)
+        if columns:
+            self.columns.update(columns)
+        self.delimiter = delimiter
+        self.count = 0
+
+    def register(self, model):
+        """Register the feed in model, as a control function."""
+        model.register_control_function(self.run, pem_args=(model,))
+
+    def rows(self):
+        """Iterate over the rows of the order book"""
+        if isinstance(self.source, str):
+            with open(self.source, newline='') as f:
+                for row in csv.DictReader(f, delimiter=self.delimiter):
+                    yield row
+        elif hasattr(self.source, 'read'):
+            for row in csv.DictReader(self.source, delimiter=self.delimiter):
+                yield row
+        else:
+            for row in self.source:
+                yield row
+
+    def orders(self):
+        """Iterate over the create requests of the order book"""
+        columns = self.columns
+        reserved = set(columns.values())
+        for row in self.rows():
+            params = dict()
+            prod_type = row.get(columns['productType'])
+            if prod_type:
+                params['productType'] = prod_type
+            pid = row.get(columns['productID'])
+            if pid not in (None, ''):
+                params['productID'] = int(pid)
+            quantity = row.get(columns['quantity'])
+            if quantity not in (None, ''):
+                params['quantity'] = int(quantity)
+            phys = dict([(name, convert(value)) for (name, value) in row.items()
+                         if name not in reserved and value not in (None, '')])
+            if phys:
+                params['physical-properties'] = phys
+            actor = row.get(columns['actor']) or self.actor
+            yield Request(actor,
+                          CreateAct.produce_keyword,
+                          date=float(row[columns['time']]),
+                          params=params)
+
+    def run(self, model):
+        """Process Execution Method: load the orders in the model request
+        calendar, chunk by chunk."""
+        env = model.get_sim()
+        calendar = model.top_level().request_calendar
+        sockets = dict()
+        orders = self.orders()
+        last = None
+        while True:
+            chunk = list(islice(orders, self.chunk_size))
+            if not chunk:
+                break
+            entries = list()
+            for request in chunk:
+                if last is not None and request.when < last:
+                    logger.warning(_("order book is not sorted: order for {0} at t={1} is late").format(request.who, request.when))
+                last = request.when
+                socket = sockets.get(request.who)
+                if socket is None:
+                    socket = model.get_module(request.who).request_socket
+                    sockets[request.who] = socket
+                entries.append((request, socket))
+            #orders due now also go through the calendar, so that orders
+            #with the same release time are delivered in file order
+            calendar.load(entries)
+            self.count += len(chunk)
+            logger.debug(_("{0} orders read").format(self.count))
+            #read ahead: wait until the last order of the chunk is released
+            yield env.timeout(max(0, last - env.now))
@@ -21,6 +21,7 @@ properties in emulica.
 
 import random
 import logging
+from bisect import bisect_right, insort
 
 from emulica.core import emulation
 
@@ -57,7 +58,10 @@ class Registry(dict):
 
     Classes:
         Registry -- a dict of properties, with dsiplay information
+        Schema -- the property names shared by a type of products
+        ProductProperties -- the compact property registry of products
         SetupMatrix -- Models setup (transtion between programs), and associated time
+        Calendar -- Models the availability of actuators (breaks, shifts...)
         Program -- Models actions done by actuators
         Display -- display information for properties
     """
@@ -175,21 +179,162 @@ class Registry(dict):
         """
         self[name] = self.eval_expression(value, product)
 
+    def eval_expression(self, expr, product=None):
+        """Evaluate expression expr"""
+        if type(expr) == str:
+            result = eval(expr, globals(), self.__context(product))
+        else:
+            result = expr
+        return result
+
+    def __context(self, product=None):
+        """Return the context in which expressions are evaluated"""
+        context = dict()
+        context['rng'] = self.rng
+        if self.owner and 'model' in dir(self.owner):
+            context['model'] = self.owner.model
+        for (name, value) in self.items():
+            context[name] = value
+        if not product is None:
+            context['product'] = product
+        return context
+
+    def evaluate_block(self, name, size):
+        """Evaluate property name size times, and return the list of the
+        results. The expression is compiled once, and evaluated in the same
+        context, which is much faster than calling evaluate repeatedly to
+        draw random values (e.g. times between failures).
+        """
+        expr = self.get(name)
+        if type(expr) != str:
+            return [expr] * size
+        code = compile(expr, name, 'eval')
+        context = self.__context()
+        return [eval(code, globals(), context) for i in range(size)]
+
+
+class Schema(object):
+    """A Schema is the ordered list of the physical property names of a
+    product type. It is shared by all the products of that type, that only
+    store an array of values (see ProductProperties). Names are appended to
+    the schema the first time they are set on a product of that type.
+
+    Attributes:
+        keys -- the list of property names
+        index -- a dictionary that associate each name with its position
+    """
+    __slots__ = ('keys', 'index')
+
+    def __init__(self):
+        """Create an empty schema"""
+        self.keys = list()
+        self.index = dict()
+
+    def add(self, name):
+        """Add name to the schema (if needed), and return its position"""
+        i = self.index.get(name)
+        if i is None:
+            i = len(self.keys)
+            self.keys.append(name)
+            self.index[name] = i
+        return i
+
+
+class ProductProperties(object):
+    """Physical properties of a product. This is a lightweight alternative to
+    Registry: names are kept in a Schema shared by every products of the same
+    type, and each product only stores the list of its values. Properties
+    have no display, and cannot be automatically evaluated.
+
+    It can be used like a dictionary (properties[name], name in properties,
+    keys(), items()...), and provides the evaluation methods of Registry.
+    """
+    __slots__ = ('schema', '_values', 'owner')
+
+    #marks a property that is in the schema, but not set for this product
+    _UNSET = object()
+
+    def __init__(self, owner, schema):
+        """Create a new, empty, set of properties.
+
+        Arguments:
+            owner -- the product that own these properties
+            schema -- the Schema of the product type
+        """
+        self.owner = owner
+        self.schema = schema
+        self._values = list()
+
+    def __getitem__(self, name):
+        i = self.schema.index.get(name)
+        if i is None or i >= len(self._values) or self._values[i] is self._UNSET:
+            raise KeyError(name)
+        return self._values[i]
+
+    def __setitem__(self, name, value):
+        i = self.schema.add(name)
+        values = self._values
+        if i >= len(values):
+            values.extend([self._UNSET] * (i + 1 - len(values)))
+        values[i] = value
+
+    def __delitem__(self, name):
+        self[name]
+        self._values[self.schema.index[name]] = self._UNSET
+
+    def __contains__(self, name):
+        i = self.schema.index.get(name)
+        return i is not None and i < len(self._values) and self._values[i] is not self._UNSET
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def keys(self):
+        """Return the list of the names of the properties set"""
+        return [name for (name, value) in zip(self.schema.keys, self._values) if value is not self._UNSET]
+
+    def items(self):
+        """Return the list of (name, value) tuples of the properties set"""
+        return [(name, value) for (name, value) in zip(self.schema.keys, self._values) if value is not self._UNSET]
+
+    def get(self, name, default=None):
+        """Return the value of the property, or default if it is not set"""
+        if name in self:
+            return self[name]
+        return default
+
+    @property
+    def rng(self):
+        """The random number generator of the model"""
+        return self.owner.model.rng
+
+    def evaluate(self, name, product=None):
+        """Resolve reference to other properties, and return the value."""
+        return self.eval_expression(self[name], product)
+
+    def eval_and_set(self, name, value, product=None):
+        """Evaluate value in the context of product, and set the result as prop
+        name.
+        """
+        self[name] = self.eval_expression(value, product)
+
     def eval_expression(self, expr, product=None):
         """Evaluate expression expr"""
         if type(expr) == str:
             context = dict()
             context['rng'] = self.rng
-            if self.owner and 'model' in dir(self.owner):
-                context['model'] = self.owner.model
-            for (name, value) in self.items():
-                context[name] = value
+            context['model'] = self.owner.model
+            context.update(self.items())
             if not product is None:
                 context['product'] = product
-            result = eval(expr, globals(), context)
-        else:
-            result = expr
-        return result
+            return eval(expr, globals(), context)
+        return expr
 
 
 class SetupMatrix(object):
@@ -301,6 +446,177 @@ class SetupMatrix(object):
         return result
 
 
+class Calendar(object):
+    """An availability Calendar records when an actuator cannot work: breaks
+    that recur every period (e.g. the breaks of a shift, or of a week), and
+    exceptions, i.e. intervals of absolute dates (e.g. planned maintenance).
+    The time needed to do some work is computed by interval arithmetic (see
+    finish), so that an operation that spans several breaks is held only
+    once.
+
+    Attributes:
+        period -- the period of the recurring breaks (0 means no recurring
+                  breaks)
+    """
+    def __init__(self, prop_registry, parent_prop_name='calendar', period=0):
+        """Create a new, empty, Calendar (i.e. always available).
+
+        Arguments:
+            prop_registry -- the parent property Registry
+            parent_prop_name -- the name of the parent property (used to
+                                notify of value changes)
+            period -- the period of the recurring breaks (default = 0)
+        """
+        self.registry = prop_registry
+        self.parent_prop_name = parent_prop_name
+        self.period = period
+        self.__breaks = list()
+        self.__exceptions = list()
+
+    def add_break(self, start, end):
+        """Add a recurring break, from start to end (offsets in the
+        period, 0 <= start < end <= period)."""
+        if not 0 <= start < end <= self.period:
+            raise ValueError(_("break ({0}, {1}) is not in the calendar period").format(start, end))
+        insort(self.__breaks, (start, end))
+        self.__merge(self.__breaks)
+        self.registry.notify_owner(self.parent_prop_name)
+
+    def add_exception(self, start, end):
+        """Add an unavailability interval, from date start to date end."""
+        if not start < end:
+            raise ValueError(_("exception ({0}, {1}) is empty").format(start, end))
+        insort(self.__exceptions, (start, end))
+        self.__merge(self.__exceptions)
+        self.registry.notify_owner(self.parent_prop_name)
+
+    def __merge(self, intervals):
+        """Merge overlapping intervals of a sorted list, in place"""
+        merged = list()
+        for (start, end) in intervals:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            else:
+                merged.append((start, end))
+        intervals[:] = merged
+
+    def breaks(self):
+        """Return the list of the recurring breaks, as (start, end) tuples"""
+        return list(self.__breaks)
+
+    def exceptions(self):
+        """Return the list of the exceptions, as (start, end) tuples"""
+        return list(self.__exceptions)
+
+    def is_empty(self):
+        """Return True if the calendar has neither breaks nor exceptions"""
+        return not (self.__breaks or self.__exceptions)
+
+    def __available(self):
+        """Return the available time in a period"""
+        return self.period - sum([end - start for (start, end) in self.__breaks])
+
+    def __next_interval(self, t):
+        """Return the first (recurring or exceptional) unavailability
+        interval that ends after t, or None"""
+        candidates = list()
+        if self.__breaks:
+            k = t // self.period
+            ends = [end for (start, end) in self.__breaks]
+            i = bisect_right(ends, t - k * self.period)
+            if i == len(self.__breaks):
+                k += 1
+                i = 0
+            (start, end) = self.__breaks[i]
+            candidates.append((k * self.period + start, k * self.period + end))
+        if self.__exceptions:
+            i = bisect_right([end for (start, end) in self.__exceptions], t)
+            if i < len(self.__exceptions):
+                candidates.append(self.__exceptions[i])
+        if candidates:
+            return min(candidates)
+        return None
+
+    def next_down(self, t):
+        """Return the first unavailability interval (start, end) that ends
+        after t (start may be before t, if the actuator is unavailable at t),
+        or None if the actuator is always available after t."""
+        interval = self.__next_interval(t)
+        if interval is None:
+            return None
+        (start, end) = interval
+        following = self.__next_interval(end)
+        while following is not None and following[0] <= end:
+            end = following[1]
+            following = self.__next_interval(end)
+        return (start, end)
+
+    def __periods_before_exception(self, t):
+        """Return the number of whole periods that can be skipped from t,
+        without reaching an exception"""
+        i = bisect_right([end for (start, end) in self.__exceptions], t)
+        if i < len(self.__exceptions):
+            return int((self.__exceptions[i][0] - t) // self.period) - 1
+        return None
+
+    def is_available(self, t):
+        """Return True if the actuator is available at date t"""
+        down = self.next_down(t)
+        return down is None or down[0] > t
+
+    def available_time(self, start, end):
+        """Return the available time between dates start and end"""
+        total = 0
+        t = start
+        available = self.__available() if self.__breaks else 0
+        while t < end:
+            if self.__breaks and end - t > 2 * self.period:
+                n = int((end - t) // self.period) - 1
+                limit = self.__periods_before_exception(t)
+                if limit is not None:
+                    n = min(n, limit)
+                if n > 0:
+                    t += n * self.period
+                    total += n * available
+            down = self.next_down(t)
+            if down is None or down[0] >= end:
+                total += end - t
+                break
+            if down[0] > t:
+                total += down[0] - t
+            t = down[1]
+        return total
+
+    def finish(self, start, work):
+        """Return the date when an amount of work (in available time) that
+        begins at date start is finished."""
+        if work <= 0:
+            return start
+        if self.__breaks and self.__available() <= 0:
+            return float('inf')
+        t = start
+        left = work
+        available = self.__available() if self.__breaks else 0
+        while True:
+            if self.__breaks and left > 2 * available:
+                n = int(left // available) - 1
+                limit = self.__periods_before_exception(t)
+                if limit is not None:
+                    n = min(n, limit)
+                if n > 0:
+                    t += n * self.period
+                    left -= n * available
+            down = self.next_down(t)
+            if down is None:
+                return t + left
+            (down_start, down_end) = down
+            if down_start > t:
+                if down_start - t >= left:
+                    return t + left
+                left -= down_start - t
+            t = down_end
+
+
 class XTable(dict):
     """A dictionary of Physical Changes, where the name is the attribute to
     change and value is the new attribute value. This class is the base for
@@ -370,7 +686,9 @@ class Program(object):
     A program is a particular form of property registry
 
     Attributes:
-        transform -- a dictionary of program parameters
+        transform -- a dictionary of program parameters. If it contains a
+                     'per_unit' key set to True, the delay is charged for
+                     each unit of the product (see Product.quantity)
         time_law -- a python expression used to evaluate the delay (may be
                     a float, int, or an expression calling random or rng)
     """
@@ -389,9 +707,13 @@ class Program(object):
 
     def time(self, product=None):
         """Return the delay corresponding to this program. If time is a string
-        expression, it is evaluated to a number.
+        expression, it is evaluated to a number. If the program is charged per
+        unit, the delay is multiplied by the product quantity.
         """
-        return self.registry.eval_expression(self.time_law, product)
+        delay = self.registry.eval_expression(self.time_law, product)
+        if product is not None and self.transform.get('per_unit'):
+            delay *= product.quantity
+        return delay
 
     def is_evaluable(self):
         """Return True if time_law is evaluable"""
@@ -438,6 +760,8 @@ class Display(object):
     """A string that can be evaluated (using python's 'eval' function) to a numeric"""
     PHYSICAL_PROPERTIES_LIST = 10
     """a set of physical properties, and the associated value"""
+    CALENDAR = 11
+    """A emulica.properties.Calendar"""
 
     type_names = {REFERENCE: _("Module"),
                   VALUE: _("String"),
@@ -448,7 +772,8 @@ class Display(object):
                   PROGRAM_TABLE: _("Program table"),
                   SETUP: _("Setup table"),
                   EVALUABLE: _("Evaluable string"),
-                  PHYSICAL_PROPERTIES_LIST: _("List of physical properties")}
+                  PHYSICAL_PROPERTIES_LIST: _("List of physical properties"),
+                  CALENDAR: _("Availability calendar")}
 
     default_value = {REFERENCE: lambda reg, name, schema: None,
                      VALUE: lambda reg, name, schema: str(),
@@ -459,7 +784,8 @@ class Display(object):
                      PROGRAM_TABLE: lambda reg, name, schema: ProgramTable(reg, name, schema),
                      SETUP: lambda reg, name, schema: SetupMatrix(reg, 0, name),
                      EVALUABLE: lambda reg, name, schema: str(),
-                     PHYSICAL_PROPERTIES_LIST: lambda reg, name, schema: ChangeTable(reg, name)}
+                     PHYSICAL_PROPERTIES_LIST: lambda reg, name, schema: ChangeTable(reg, name),
+                     CALENDAR: lambda reg, name, schema: Calendar(reg, name)}
 
     def __init__(self, prop_type, display_name=None, lower_bound=0, upper_bound=2000000):
         """Create an new instance of a ModuleProperty
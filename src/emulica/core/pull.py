@@ -0,0 +1,325 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de
+# Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+This module implements pull production control policies: the release of
+orders (create requests) is driven by the state of the system, rather than
+by a production plan.
+
+Policies are bound to the modules of a model: they react to the reports of
+create and dispose actuators (see Model.register_handler), and to the state
+changes of holders (see Module.connect). Their counters are updated
+incrementally, as these reports and signals are emitted: no observer is
+polled, and no control process is used, apart from the one that releases
+the initial orders.
+
+Classes:
+    PullControl -- base class of the pull control policies
+    KanbanLoop -- a fixed number of cards circulates between a create
+        actuator and a stock (holder)
+    Conwip -- the number of products between a create actuator and a
+        dispose actuator is limited
+    BaseStock -- the inventory position of a stock (holder) is kept at a
+        given level
+"""
+
+import logging
+
+from emulica.core.emulation import Module, Request, CreateAct
+
+logger = logging.getLogger('emulica.pull')
+
+
+class PullControl(object):
+    """Base class of the pull control policies. A PullControl releases
+    orders by sending create requests to a create actuator. Subclasses bind
+    the policy to the modules of the model (see bind), and release orders
+    when needed (see replenish).
+
+    Usage:
+        policy = Conwip('create', 'dispose', cards=5)
+        policy.register(model)
+        model.emulate(until=1000)
+
+    Attributes:
+        create -- the name of the create actuator
+        product_type -- the type of the products that are ordered (None to
+                        use the default type of the create actuator)
+        released -- the number of orders released during the current run
+    """
+
+    def __init__(self, create, product_type=None):
+        """Create a new PullControl.
+
+        Arguments:
+            create -- the name of the create actuator
+            product_type -- the type of the ordered products (default = None)
+        """
+        self.create = create
+        self.product_type = product_type
+        self.released = 0
+        self.model = None
+        self.__env = None
+        self.__socket = None
+        self.__params = None
+
+    def register(self, model):
+        """Register the policy in model. The policy is active during every
+        subsequent run of the model."""
+        self.model = model
+        model.register_control_function(self.start, pem_args=(model,))
+        self.bind(model)
+
+    def bind(self, model):
+        """Bind the policy to the reports and signals of the modules of
+        model. Overridden by subclasses."""
+        pass
+
+    def reset(self, model):
+        """Reset the counters of the policy at the beginning of a run.
+        Overridden by subclasses (which must call this implementation)."""
+        self.released = 0
+        self.__socket = model.get_module(self.create).request_socket
+        if self.product_type is None:
+            self.__params = None
+        else:
+            self.__params = {'productType': self.product_type}
+
+    def replenish(self):
+        """Release orders if the policy requires it. Overridden by
+        subclasses."""
+        pass
+
+    def is_running(self):
+        """Return True if the policy has been started in the current run of
+        the model. Reports and signals received before are ignored."""
+        return self.__env is not None and self.__env is self.model.get_sim()
+
+    def release(self, params=None):
+        """Release an order: send a create request to the create actuator.
+
+        Arguments:
+            params -- additional parameters of the create request (default =
+                      None)
+        """
+        self.released += 1
+        if params is None:
+            params = self.__params
+        elif self.__params is not None:
+            params = dict(self.__params, **params)
+        self.__socket.put(Request(self.create,
+                                  CreateAct.produce_keyword,
+                                  params=params))
+
+    def start(self, model):
+        """Process Execution Method: reset the counters, and release the
+        initial orders."""
+        self.reset(model)
+        self.__env = model.get_sim()
+        self.replenish()
+        logger.info(_("{0}: {1} initial orders released").format(type(self).__name__, self.released))
+        yield model.get_sim().timeout(0)
+
+
+class KanbanLoop(PullControl):
+    """In a Kanban loop, a fixed number of cards circulates between a create
+    actuator and a stock (a holder): a card is attached to each order, and
+    released when its product is withdrawn from the stock. An order is
+    released each time a card is free. The products that are in the stock
+    at the beginning of the run, or that enter it outside of the loop, do
+    not hold cards: each order is given its product ID, so that the products
+    that hold a card are known.
+
+    Attributes:
+        holder -- the name of the stock
+        cards -- the number of cards
+        withdrawn -- the number of products holding a card withdrawn from the
+                     stock during the current run
+    """
+
+    def __init__(self, create, holder, cards, product_type=None):
+        """Create a new KanbanLoop.
+
+        Arguments:
+            create -- the name of the create actuator
+            holder -- the name of the stock
+            cards -- the number of cards
+            product_type -- the type of the ordered products (default = None)
+        """
+        PullControl.__init__(self, create, product_type)
+        self.holder = holder
+        self.cards = cards
+        self.withdrawn = 0
+        #__carded: the pids of the ordered products that hold a card
+        self.__carded = set()
+        #__stocked: the pids of the products of __carded that are in the stock
+        self.__stocked = set()
+
+    def bind(self, model):
+        model.get_module(self.holder).connect(Module.STATE_CHANGE_SIGNAL, self.stock_changed)
+
+    def reset(self, model):
+        PullControl.reset(self, model)
+        self.withdrawn = 0
+        self.__carded = set()
+        self.__stocked = set()
+
+    def free_cards(self):
+        """Return the number of free cards"""
+        return self.cards - (self.released - self.withdrawn)
+
+    def replenish(self):
+        for i in range(self.free_cards()):
+            self.release()
+
+    def release(self):
+        """Release an order, whose product holds a card"""
+        pid = self.model.next_pid()
+        self.__carded.add(pid)
+        PullControl.release(self, {'productID': pid})
+
+    def stock_changed(self, level):
+        """Callback of the stock state changes"""
+        if not self.is_running():
+            return
+        stocked = set(p.pid for p in self.model.get_module(self.holder).get_products()
+                      if p.pid in self.__carded)
+        gone = self.__stocked - stocked
+        self.__stocked = stocked
+        if gone:
+            self.__carded -= gone
+            self.withdrawn += len(gone)
+            self.replenish()
+
+
+class Conwip(PullControl):
+    """In a CONWIP (constant work in process) line, the number of products
+    between a create actuator (the entry of the line) and a dispose
+    actuator (its exit) is limited to a number of cards: an order is
+    released each time a product leaves the line.
+
+    Attributes:
+        dispose -- the name of the dispose actuator
+        cards -- the number of cards
+        created -- the number of products created during the current run
+        completed -- the number of products disposed during the current run
+    """
+
+    def __init__(self, create, dispose, cards, product_type=None):
+        """Create a new Conwip.
+
+        Arguments:
+            create -- the name of the create actuator
+            dispose -- the name of the dispose actuator
+            cards -- the number of cards
+            product_type -- the type of the ordered products (default = None)
+        """
+        PullControl.__init__(self, create, product_type)
+        self.dispose = dispose
+        self.cards = cards
+        self.created = 0
+        self.completed = 0
+
+    def bind(self, model):
+        model.register_handler(self.create, self.product_created, what='create-done')
+        model.register_handler(self.dispose, self.product_completed, what='dispose-done')
+
+    def reset(self, model):
+        PullControl.reset(self, model)
+        self.created = 0
+        self.completed = 0
+
+    def wip(self):
+        """Return the number of products in the line"""
+        return self.created - self.completed
+
+    def replenish(self):
+        for i in range(self.cards - (self.released - self.completed)):
+            self.release()
+
+    def product_created(self, report, model):
+        """Handler of the create actuator reports"""
+        if self.is_running():
+            self.created += 1
+
+    def product_completed(self, report, model):
+        """Handler of the dispose actuator reports"""
+        if self.is_running():
+            self.completed += 1
+            self.replenish()
+
+
+class BaseStock(PullControl):
+    """A base-stock policy keeps the inventory position of a stock (a
+    holder) at a given level: the inventory position is the number of
+    products in the stock, plus the number of orders that have not reached
+    it yet. An order is released each time the inventory position falls
+    below the base-stock level (e.g. when a product is withdrawn). Unlike in
+    a Kanban loop, every product in the stock is taken into account: a
+    product that enters the stock is counted as the delivery of an order,
+    whatever its origin.
+
+    Attributes:
+        holder -- the name of the stock
+        level -- the base-stock level
+        received -- the number of products that entered the stock during
+                    the current run
+        on_hand -- the number of products in the stock
+    """
+
+    def __init__(self, create, holder, level, product_type=None):
+        """Create a new BaseStock.
+
+        Arguments:
+            create -- the name of the create actuator
+            holder -- the name of the stock
+            level -- the base-stock level
+            product_type -- the type of the ordered products (default = None)
+        """
+        PullControl.__init__(self, create, product_type)
+        self.holder = holder
+        self.level = level
+        self.received = 0
+        self.on_hand = 0
+
+    def bind(self, model):
+        model.get_module(self.holder).connect(Module.STATE_CHANGE_SIGNAL, self.stock_changed)
+
+    def reset(self, model):
+        PullControl.reset(self, model)
+        self.received = 0
+        self.on_hand = len(model.get_module(self.holder).internal)
+
+    def on_order(self):
+        """Return the number of orders that have not reached the stock"""
+        return max(0, self.released - self.received)
+
+    def position(self):
+        """Return the inventory position"""
+        return self.on_hand + self.on_order()
+
+    def replenish(self):
+        for i in range(self.level - self.position()):
+            self.release()
+
+    def stock_changed(self, level):
+        """Callback of the stock state changes"""
+        if not self.is_running():
+            return
+        if level > self.on_hand:
+            self.received += level - self.on_hand
+        self.on_hand = level
+        self.replenish()
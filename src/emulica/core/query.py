@@ -0,0 +1,270 @@
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de
+# Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+This module answers point-in-time and range questions on the results of an
+emulation run: where was a product at time t, what did a holder contain at
+time t, how much was an actuator used between t1 and t2...
+
+Queries are answered from the product space histories (including archived
+products), the actuator traces and the holder monitors. The sorted
+structures needed to answer each kind of query are built on first use, so
+that each subsequent query only costs a binary search (plus a short replay
+for holder contents).
+
+Classes:
+    HistoryQuery -- time-indexed queries on the results of a model
+"""
+
+import logging
+from bisect import bisect_right
+
+logger = logging.getLogger('emulica.query')
+
+
+class HistoryQuery(object):
+    """Time-indexed queries on the results of an emulation run. A
+    HistoryQuery should be created once the run is finished, and is not
+    updated if the model is run again.
+
+    Usage:
+        model.emulate(until=1000)
+        query = HistoryQuery(model)
+        query.contents('buffer', 250.)
+        query.utilization('machine', 0, 500)
+
+    Attributes:
+        model -- the emulation model
+        checkpoint -- the number of events between two stored snapshots of
+                      the content of a location
+        failure_state -- the trace state of failures, that is not counted
+                         as busy by default
+    """
+    failure_state = 'failure'
+
+    def __init__(self, model, checkpoint=64):
+        """Create a new HistoryQuery.
+
+        Arguments:
+            model -- the emulation model (after emulation)
+            checkpoint -- the number of events between two snapshots of the
+                          content of a location (default = 64)
+        """
+        self.model = model.top_level()
+        self.checkpoint = checkpoint
+        self.__positions = None
+        self.__locations = None
+        self.__busy = dict()
+
+    def __products(self):
+        """Iterate over every product of the run (active, disposed and
+        archived), as (pid, space_history, end) tuples, where end is the
+        dispose time of the product, or None if it is still active."""
+        for (pid, p) in self.model.products.items():
+            end = None if p.is_active() else p.dispose_time
+            yield (pid, p.space_history, end)
+        if self.model.archive is not None:
+            for r in self.model.archive:
+                yield (r.pid, r.space_history, r.dispose_time)
+
+    def __build_positions(self):
+        """Build the sorted dates and locations of each product, and the
+        events of each location"""
+        self.__positions = dict()
+        events = dict()
+        for (pid, history, end) in self.__products():
+            dates = [date for (date, space) in history]
+            spaces = [space for (date, space) in history]
+            self.__positions[pid] = (dates, spaces, end)
+            for i in range(len(history)):
+                start = dates[i]
+                if i + 1 < len(history):
+                    stop = dates[i + 1]
+                else:
+                    stop = end
+                if stop is not None and stop <= start:
+                    continue
+                loc_events = events.setdefault(spaces[i], list())
+                loc_events.append((start, 1, pid))
+                if stop is not None:
+                    #at the same date, removals are applied before additions
+                    loc_events.append((stop, 0, pid))
+        self.__locations = dict()
+        for (location, loc_events) in events.items():
+            loc_events.sort()
+            snapshots = list()
+            content = dict()
+            for (i, (date, add, pid)) in enumerate(loc_events):
+                if i % self.checkpoint == 0:
+                    snapshots.append(dict(content))
+                self.__apply(content, add, pid)
+            times = [date for (date, add, pid) in loc_events]
+            self.__locations[location] = (times, loc_events, snapshots)
+
+    def __apply(self, content, add, pid):
+        """Apply an event on the content of a location. content is a
+        dictionary pid => number of times pid is in the location"""
+        if add:
+            content[pid] = content.get(pid, 0) + 1
+        elif content[pid] == 1:
+            del content[pid]
+        else:
+            content[pid] -= 1
+
+    def position(self, pid, t):
+        """Return the location (a module fullname) of product pid at time t,
+        or None if the product did not exist at time t.
+
+        Raises:
+            KeyError -- if pid is not a product of the run
+        """
+        if self.__positions is None:
+            self.__build_positions()
+        (dates, spaces, end) = self.__positions[pid]
+        if end is not None and t >= end:
+            return None
+        i = bisect_right(dates, t)
+        if i == 0:
+            return None
+        return spaces[i - 1]
+
+    def contents(self, location, t):
+        """Return the sorted list of the pids of the products that were in
+        location (a module fullname) at time t."""
+        if self.__locations is None:
+            self.__build_positions()
+        if location not in self.__locations:
+            return []
+        (times, loc_events, snapshots) = self.__locations[location]
+        n = bisect_right(times, t)
+        k = n // self.checkpoint
+        if k == len(snapshots):
+            #n is the number of events, and a multiple of the checkpoint
+            k -= 1
+        content = dict(snapshots[k])
+        for (date, add, pid) in loc_events[k * self.checkpoint:n]:
+            self.__apply(content, add, pid)
+        return sorted(content.keys())
+
+    def count(self, holder, t):
+        """Return the number of products in holder (a module fullname) at
+        time t, as recorded by the holder monitor."""
+        monitor = self.model.get_module(holder).monitor
+        i = bisect_right(monitor.event_times, t)
+        if i == 0:
+            return 0
+        return monitor.event_values[i - 1]
+
+    def __merge(self, intervals):
+        """Return the sorted and merged list of the (begin, end) intervals"""
+        merged = list()
+        for (begin, end) in sorted(intervals):
+            if merged and begin <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((begin, end))
+        return merged
+
+    def __subtract(self, intervals, removed):
+        """Return the merged intervals, from which the merged intervals
+        removed have been taken out"""
+        result = list()
+        i = 0
+        for (begin, end) in intervals:
+            while i < len(removed) and removed[i][1] <= begin:
+                i += 1
+            j = i
+            while j < len(removed) and removed[j][0] < end:
+                if removed[j][0] > begin:
+                    result.append((begin, removed[j][0]))
+                begin = max(begin, removed[j][1])
+                j += 1
+            if begin < end:
+                result.append((begin, end))
+        return result
+
+    def __busy_intervals(self, actuator, states):
+        """Return the busy intervals of each server of actuator (a module
+        fullname), as a list of (starts, ends, cumulated) tuples, where
+        cumulated[i] is the busy time of the server before starts[i]."""
+        key = (actuator, states)
+        if key not in self.__busy:
+            module = self.model.get_module(actuator)
+            if states is None:
+                #failures are recorded once for the whole actuator, and
+                #overlap the operations they interrupt
+                failures = self.__merge((begin, end) for (begin, end, state) in module.trace
+                                        if end > begin and state == self.failure_state)
+            busy = list()
+            for trace in module.slot_traces:
+                if states is None:
+                    intervals = self.__merge((begin, end) for (begin, end, state) in trace
+                                             if end > begin and state != self.failure_state)
+                    intervals = self.__subtract(intervals, failures)
+                else:
+                    intervals = self.__merge((begin, end) for (begin, end, state) in trace
+                                             if end > begin and state in states)
+                starts = list()
+                ends = list()
+                cumulated = list()
+                total = 0
+                for (begin, end) in intervals:
+                    starts.append(begin)
+                    ends.append(end)
+                    cumulated.append(total)
+                    total += end - begin
+                busy.append((starts, ends, cumulated))
+            self.__busy[key] = busy
+        return self.__busy[key]
+
+    def __busy_before(self, intervals, t):
+        """Return the busy time before t"""
+        (starts, ends, cumulated) = intervals
+        i = bisect_right(starts, t)
+        if i == 0:
+            return 0
+        return cumulated[i - 1] + min(t, ends[i - 1]) - starts[i - 1]
+
+    def busy_time(self, actuator, start, end, states=None):
+        """Return the time actuator (a module fullname) has been busy
+        between start and end. The busy times of its servers are added up,
+        so that the busy time of an actuator with n servers can be up to n
+        times the length of the time range.
+
+        Arguments:
+            actuator -- the actuator fullname
+            start -- the beginning of the time range
+            end -- the end of the time range
+            states -- if specified, only the trace records whose state is in
+                      states are taken into account (e.g. ['setup']),
+                      otherwise every record but the failures is, and the
+                      failure periods are not counted as busy (default =
+                      None)
+        """
+        if states is not None:
+            states = frozenset(states)
+        return sum(self.__busy_before(intervals, end) - self.__busy_before(intervals, start)
+                   for intervals in self.__busy_intervals(actuator, states))
+
+    def utilization(self, actuator, start, end, states=None):
+        """Return the fraction of the time range [start, end] during which
+        the servers of actuator (a module fullname) have been busy (see
+        busy_time)."""
+        if end <= start:
+            return 0.
+        servers = self.model.get_module(actuator).server_count()
+        return self.busy_time(actuator, start, end, states) / ((end - start) * servers)
@@ -0,0 +1,81 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import unittest
+
+import util
+util.set_path()
+
+import simpy
+from emulica.core import emulation
+
+
+class TestAgenda(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+        self.env = simpy.Environment()
+        self.agenda = emulation.Agenda(self.env)
+        self.calls = []
+
+    def record(self, arg):
+        self.calls.append((self.env.now, arg))
+
+    def test_Order(self):
+        self.agenda.add(5, self.record, 'b')
+        self.agenda.add(2, self.record, 'a')
+        self.agenda.add(5, self.record, 'c')
+        self.env.run()
+        self.assertEqual(self.calls, [(2, 'a'), (5, 'b'), (5, 'c')])
+
+    def test_Coalesce(self):
+        self.assertTrue(self.agenda.add(3, self.record, 'x', key='obs'))
+        self.assertFalse(self.agenda.add(3, self.record, 'y', key='obs'))
+        self.env.run()
+        self.assertEqual(self.calls, [(3, 'x')])
+
+    def test_Supersede(self):
+        self.agenda.add(3, self.record, 'old', key='obs')
+        self.agenda.add(7, self.record, 'new', key='obs')
+        self.agenda.add(4, self.record, 'other', key='obs2')
+        self.env.run()
+        self.assertEqual(self.calls, [(4, 'other'), (7, 'new')])
+
+    def test_Cancel(self):
+        self.agenda.add(3, self.record, 'x', key='obs')
+        self.assertTrue(self.agenda.is_pending('obs'))
+        self.agenda.cancel('obs')
+        self.assertFalse(self.agenda.is_pending('obs'))
+        self.env.run()
+        self.assertEqual(self.calls, [])
+
+    def test_Rescheduling(self):
+        def again(arg):
+            self.record(arg)
+            if arg < 3:
+                self.agenda.add(self.env.now + 1.5, again, arg + 1)
+        self.agenda.add(1, again, 1)
+        self.env.run()
+        self.assertEqual(self.calls, [(1, 1), (2.5, 2), (4, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
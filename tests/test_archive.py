@@ -0,0 +1,124 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+import util
+util.set_path()
+
+import os
+import tempfile
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import emulica.core.emulation as emu
+from emulica.core.archive import ProductArchive
+
+import test_sim1
+
+EMULATE_UNTIL = 100
+
+
+class TestArchive(unittest.TestCase):
+    """Run the model of test_sim1 with a product archive: every product is
+    disposed, and so is retired from model.products into the archive."""
+
+    def setUp(self):
+        print(self.id())
+
+    def test_RunResults(self):
+        model = test_sim1.get_model()
+        model.archive = ProductArchive(chunk_size=3)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(model.products, {})
+        self.assertEqual(model.active_products, {})
+        self.assertEqual(len(model.archive), 10)
+        result = [(r.pid,
+                   r.shape_history,
+                   r.space_history,
+                   r.create_time,
+                   r.dispose_time) for r in model.archive]
+        self.assertEqual(result, test_sim1.EXP_RESULT)
+
+    def test_ActiveProducts(self):
+        model = test_sim1.get_model()
+        model.archive = ProductArchive()
+        model.emulate(until=22)
+        #product 3 is still in holder1 at the end of the run: it is disposed
+        #and archived by the end-of-run finalization
+        self.assertEqual(model.products, {})
+        self.assertEqual(model.archive.get(2).dispose_time, 14)
+        self.assertEqual(model.archive.get(3).dispose_time, 22)
+        self.assertRaises(KeyError, model.archive.get, 4)
+
+    def test_PidUsed(self):
+        model = emu.Model()
+        model.clear()
+        model.archive = ProductArchive()
+        p = emu.Product(model, 5)
+        p.dispose()
+        self.assertIn(5, model.archive)
+        self.assertTrue(model.pid_used(5))
+        self.assertRaises(emu.EmulicaError, emu.Product, model, 5)
+
+    def test_Genealogy(self):
+        model = emu.Model()
+        model.clear()
+        model.archive = ProductArchive()
+        (body, wheel, rim) = [emu.Product(model) for i in range(3)]
+        wheel.assemble(rim, 'assy', 'rim')
+        body.assemble(wheel, 'assy', 'wheel')
+        body.dispose()
+        #archived products are removed from the genealogy
+        self.assertEqual(model.genealogy.components(body.pid), [])
+        self.assertEqual(model.genealogy.components(wheel.pid), [])
+        self.assertEqual(model.genealogy.parent(rim.pid), None)
+        self.assertEqual(model.archive.get(body.pid).composition_history,
+                         [(0, 'assy', wheel.pid)])
+
+    def test_Reset(self):
+        model = test_sim1.get_model()
+        model.archive = ProductArchive()
+        model.emulate(until=EMULATE_UNTIL)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(len(model.archive), 10)
+
+    def test_ExistingDatabase(self):
+        (fd, filename) = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            model = test_sim1.get_model()
+            model.archive = ProductArchive(filename)
+            model.emulate(until=22)
+            model.archive.close()
+            #products of the previous run can be read...
+            archive = ProductArchive(filename)
+            self.assertEqual(archive.get(3).dispose_time, 22)
+            #...until the next run overwrites them
+            model = test_sim1.get_model()
+            model.archive = archive
+            model.emulate(until=EMULATE_UNTIL)
+            self.assertEqual(len(archive), 10)
+            self.assertEqual(archive.get(3).dispose_time, 24)
+            archive.close()
+        finally:
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Arrival generators: stationary, piecewise-rate and trace-driven arrivals.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation, emuML
+
+
+def get_model():
+    model = emulation.Model()
+    h = emulation.Holder(model, "holder1")
+    create = emulation.CreateAct(model, "create1", h)
+    emulation.ArrivalGenerator(model, "arrivals", create, rate=0.5)
+    return model
+
+
+def get_result(model):
+    return [(p.product_type, p.create_time) for p in model.products.values()]
+
+
+class TestArrivalGenerator(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Stationary(self):
+        model = get_model()
+        model.emulate(until=400, seed=12)
+        n = len(model.products)
+        #expected 200 arrivals, standard deviation ~14
+        self.assertTrue(140 < n < 260)
+        self.assertEqual(model.modules['arrivals'].arrival_count, n)
+        self.assertEqual(model.modules['create1'].quantity_created, n)
+        result = get_result(model)
+        model.emulate(until=400, seed=12)
+        self.assertEqual(get_result(model), result)
+
+    def test_Mix(self):
+        model = get_model()
+        model.modules['arrivals'].properties['mix'] = {'A': 3, 'B': 1}
+        model.emulate(until=400, seed=3)
+        types = [t for (t, date) in get_result(model)]
+        self.assertEqual(set(types), set(['A', 'B']))
+        self.assertTrue(types.count('A') > 2 * types.count('B'))
+
+    def test_Piecewise(self):
+        model = get_model()
+        arrivals = model.modules['arrivals']
+        arrivals.properties['rates'] = [(0, 1.), (50, 0.)]
+        arrivals.properties['period'] = 100.
+        model.emulate(until=400, seed=5)
+        dates = [date for (t, date) in get_result(model)]
+        self.assertTrue(len(dates) > 100)
+        self.assertTrue(all(date % 100 < 50 for date in dates))
+
+    def test_Trace(self):
+        model = get_model()
+        arrivals = model.modules['arrivals']
+        arrivals.properties['trace'] = [1., (2.5, 'X'), 7.]
+        arrivals.properties['block'] = 2
+        model.emulate(until=400)
+        self.assertEqual(get_result(model), [('defaulType', 1.),
+                                             ('X', 2.5),
+                                             ('defaulType', 7.)])
+
+    def test_Marshall(self):
+        model = get_model()
+        model.modules['arrivals'].properties['rates'] = [(0, 1.), (50, 0.)]
+        model.modules['arrivals'].properties['mix'] = {'A': 3, 'B': 1}
+        parser = emuML.EmulationParser(emuML.save(model))
+        parser.parse()
+        arrivals = parser.model.modules['arrivals']
+        self.assertTrue(isinstance(arrivals, emulation.ArrivalGenerator))
+        self.assertEqual(arrivals.properties['create'].name, 'create1')
+        self.assertEqual(arrivals.properties['rates'], [(0, 1.), (50, 0.)])
+        self.assertEqual(arrivals.properties['mix'], {'A': 3, 'B': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
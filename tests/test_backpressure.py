@@ -0,0 +1,158 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Reports are not built for modules that have no observer, and report sockets
+may be bounded, with a policy for reports that arrive when they are full.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation
+
+
+def get_model():
+    model = emulation.Model()
+    h = emulation.Holder(model, 'h')
+    emulation.CreateAct(model, 'create', h)
+    return model
+
+
+class ControlCreate:
+    def run(self, model, n):
+        rq = model.get_module('create').request_socket
+        for i in range(n):
+            yield rq.put(emulation.Request('create', 'create'))
+            yield model.get_sim().timeout(1)
+
+
+class ControlObserve:
+    def run(self, model, capacity, overflow, result):
+        socket = model.get_module('create').create_report_socket(capacity=capacity,
+                                                                 overflow=overflow)
+        result.append(socket)
+        #wait until every report has been sent
+        yield model.get_sim().timeout(10)
+        while len(socket.items):
+            rp = yield socket.get()
+            result.append(rp.when)
+
+
+class TestBackpressure(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_NoObserver(self):
+        model = get_model()
+        model.register_control(ControlCreate, pem_args=(model, 3))
+        model.emulate(until=5)
+        create = model.get_module('create')
+        self.assertFalse(create.is_observed())
+        self.assertEqual(len(create.report_socket.items), 0)
+        self.assertEqual(len(model.get_module('h').get_products()), 3)
+
+    def test_Observed(self):
+        model = get_model()
+        result = list()
+        model.register_control(ControlCreate, pem_args=(model, 3))
+        model.register_control(ControlObserve, pem_args=(model, float('inf'), None, result))
+        model.emulate(until=20)
+        self.assertTrue(model.get_module('create').is_observed())
+        self.assertEqual(result[1:], [0, 1, 2])
+        #results do not depend on the presence of an observer
+        self.assertEqual(len(model.get_module('h').get_products()), 3)
+
+    def test_DropOldest(self):
+        model = get_model()
+        result = list()
+        model.register_control(ControlCreate, pem_args=(model, 5))
+        model.register_control(ControlObserve, pem_args=(model, 2, emulation.ReportSocket.DROP_OLDEST, result))
+        model.emulate(until=20)
+        self.assertEqual(result[1:], [3, 4])
+        self.assertEqual(result[0].dropped, 3)
+
+    def test_DropNewest(self):
+        model = get_model()
+        result = list()
+        model.register_control(ControlCreate, pem_args=(model, 5))
+        model.register_control(ControlObserve, pem_args=(model, 2, emulation.ReportSocket.DROP_NEWEST, result))
+        model.emulate(until=20)
+        self.assertEqual(result[1:], [0, 1])
+        self.assertEqual(result[0].dropped, 3)
+
+    def test_BlockBroadcast(self):
+        model = emulation.Model()
+        emulation.EmptyModule(model, 'source')
+        sent = list()
+        received = list()
+
+        def emit(model):
+            source = model.get_module('source')
+            for i in range(3):
+                yield from source.publish_report(emulation.Report('source', 'tick', date=i))
+                sent.append(model.current_time())
+
+        def slow(model):
+            socket = model.get_module('source').create_report_socket(multiple_observation=True,
+                                                                     capacity=1)
+            while True:
+                yield model.get_sim().timeout(10)
+                rp = yield socket.get()
+                received.append(rp.when)
+
+        def fast(model):
+            socket = model.get_module('source').create_report_socket(multiple_observation=True)
+            while True:
+                yield socket.get()
+        model.register_control_function(slow)
+        model.register_control_function(fast)
+        model.register_control_function(emit)
+        model.emulate(until=50)
+        #the full blocking socket holds the sender back until it is read
+        self.assertEqual(sent, [0, 10, 20])
+        self.assertEqual(received, [0, 1, 2])
+
+    def test_Deliver(self):
+        model = emulation.Model()
+        model.clear()
+        socket = model.new_report_socket(2, emulation.ReportSocket.DROP_OLDEST)
+        for item in 'abcd':
+            self.assertEqual(socket.deliver(item), None)
+        self.assertEqual(socket.items, ['c', 'd'])
+        self.assertEqual(socket.dropped, 2)
+        socket = model.new_report_socket(2)
+        socket.deliver('a')
+        socket.deliver('b')
+        put = socket.deliver('c')
+        self.assertFalse(put.triggered)
+        self.assertEqual(socket.dropped, 0)
+
+    def test_UnknownPolicy(self):
+        model = emulation.Model()
+        model.clear()
+        self.assertRaises(ValueError, model.new_report_socket, 2, 'drop-all')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+The reports of every module of a model are published on the model report
+bus.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation, controler
+import test_sim1
+
+
+class ControlBus:
+    def run(self, model, result, what=None):
+        socket = model.report_bus.create_client(what=what)
+        while True:
+            rp = yield socket.get()
+            result.append((rp.who, rp.what, rp.when))
+
+
+class TestReportBus(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_ReportSource(self):
+        model = test_sim1.get_model()
+        reports = list()
+        #the create actuator is already observed by a single client
+        model.register_control(controler.ReportSource, pem_args=(model, reports.append))
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        result = [(pid,
+                   p.shape_history,
+                   p.space_history,
+                   p.create_time,
+                   p.dispose_time) for (pid, p) in model.products.items()]
+        self.assertEqual(result, test_sim1.EXP_RESULT)
+        self.assertEqual([(rp.who, rp.what, rp.when) for rp in reports if rp.who == 'create1'],
+                         [('create1', 'create-done', 10 * i) for i in range(10)])
+        self.assertEqual([(rp.who, rp.when) for rp in reports if rp.what == 'dispose-done'],
+                         [('dispose1', 10 * i + 4) for i in range(10)])
+        self.assertEqual(len(reports), 30)
+
+    def test_Filter(self):
+        model = test_sim1.get_model()
+        result = list()
+        model.register_control(ControlBus, pem_args=(model, result, 'ev1'))
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        self.assertEqual(result, [('observer1', 'ev1', 10 * i) for i in range(10)])
+
+    def test_NoClient(self):
+        model = test_sim1.get_model()
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        self.assertEqual(model.report_bus.clients, [])
+        self.assertFalse(model.modules['holder1'].is_observed())
+        self.assertTrue(model.modules['create1'].is_observed())
+
+
+if __name__ == '__main__':
+    unittest.main()
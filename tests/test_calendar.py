@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Availability calendars: breaks and exceptions are taken into account by
+interval arithmetic, so that a job that spans several breaks is held once.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import *
+from emulica.core.properties import Calendar, Registry
+from emulica.core import emuML
+
+EMULATE_UNTIL = 1000
+
+
+class ControlMachine:
+    def run(self, model, start):
+        create = model.modules["create"]
+        yield create.request_socket.put(Request("create", "create"))
+        yield model.get_sim().timeout(start)
+        machine = model.modules["machine"]
+        yield machine.request_socket.put(Request("machine", "make", params={'program': 'p'}))
+
+
+def get_model(start=0):
+    model = Model()
+    h = Holder(model, "h")
+    CreateAct(model, "create", h)
+    machine = ShapeAct(model, "machine", h)
+    machine.add_program('p', 50)
+    calendar = machine.properties['calendar']
+    calendar.period = 100
+    calendar.add_break(20, 30)
+    calendar.add_break(50, 60)
+    model.register_control(ControlMachine, pem_args=(model, start))
+    return model
+
+
+class TestCalendar(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+        self.model = Model()
+        self.calendar = Calendar(Registry(Product(self.model), self.model.rng), 'calendar', 100)
+        self.calendar.add_break(20, 30)
+        self.calendar.add_break(50, 60)
+
+    def test_Breaks(self):
+        self.calendar.add_break(25, 40)
+        self.assertEqual(self.calendar.breaks(), [(20, 40), (50, 60)])
+        self.assertRaises(ValueError, self.calendar.add_break, 90, 110)
+
+    def test_NextDown(self):
+        self.assertEqual(self.calendar.next_down(0), (20, 30))
+        self.assertEqual(self.calendar.next_down(25), (20, 30))
+        self.assertEqual(self.calendar.next_down(30), (50, 60))
+        self.assertEqual(self.calendar.next_down(70), (120, 130))
+        self.calendar.add_exception(55, 75)
+        self.assertEqual(self.calendar.next_down(40), (50, 75))
+        self.assertFalse(self.calendar.is_available(70))
+
+    def test_Finish(self):
+        self.assertEqual(self.calendar.finish(0, 10), 10)
+        self.assertEqual(self.calendar.finish(0, 50), 70)
+        self.assertEqual(self.calendar.finish(25, 5), 35)
+        self.assertEqual(self.calendar.finish(0, 800), 1000)
+        self.assertEqual(self.calendar.finish(10, 8000), 10010)
+
+    def test_FinishException(self):
+        self.calendar.add_exception(520, 580)
+        self.assertEqual(self.calendar.finish(0, 800), 1050)
+        self.assertEqual(self.calendar.available_time(0, 1050), 800)
+
+    def test_AvailableTime(self):
+        self.assertEqual(self.calendar.available_time(0, 70), 50)
+        self.assertEqual(self.calendar.available_time(25, 35), 5)
+        self.assertEqual(self.calendar.available_time(10, 10010), 8000)
+
+    def test_Unavailable(self):
+        calendar = Calendar(Registry(Product(self.model), self.model.rng), 'calendar', 10)
+        calendar.add_break(0, 10)
+        self.assertEqual(calendar.finish(0, 1), float('inf'))
+
+    def test_SpanBreaks(self):
+        model = get_model()
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(model.products[1].shape_history, [(0, 70, 'machine', 'p')])
+
+    def test_StartInBreak(self):
+        model = get_model(start=25)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(model.products[1].shape_history, [(25, 90, 'machine', 'p')])
+
+    def test_Failure(self):
+        model = get_model()
+        fail = Failure(model, "fail", 10, 10, [model.modules['machine']])
+        fail.properties['repeat'] = False
+        fail.properties['degradation'] = 0.5
+        model.emulate(until=EMULATE_UNTIL)
+        #10 at full speed, 5 during the degradation (10 -> 20), then 35
+        self.assertEqual(model.products[1].shape_history, [(0, 75, 'machine', 'p')])
+
+    def test_Marshall(self):
+        model = get_model()
+        model.modules['machine'].properties['calendar'].add_exception(500, 600)
+        parser = emuML.EmulationParser(emuML.save(model))
+        parser.parse()
+        calendar = parser.model.modules['machine'].properties['calendar']
+        self.assertEqual(calendar.period, 100)
+        self.assertEqual(calendar.breaks(), [(20, 30), (50, 60)])
+        self.assertEqual(calendar.exceptions(), [(500, 600)])
+
+
+if __name__ == '__main__':
+    unittest.main()
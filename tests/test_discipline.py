@@ -0,0 +1,145 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+"""
+Products are created in a holder with a queue discipline, and then disposed
+one at a time: the disposal order must follow the discipline.
+"""
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import unittest
+
+import util
+util.set_path()
+
+import emulica.core.emulation as emu
+
+PRIORITIES = [2, 5, 1, 5, 3]
+
+EMULATE_UNTIL = 100
+
+
+class ControlCreate:
+    def run(self, model):
+        create = model.modules["create"]
+        for p in PRIORITIES:
+            rq = emu.Request("create", "create",
+                             params={'physical-properties': {'priority': p, 'due_date': 10 - p}})
+            yield create.request_socket.put(rq)
+
+
+class ControlDispose:
+    def run(self, model):
+        dispose = model.modules["dispose"]
+        yield model.get_sim().timeout(10)
+        for i in range(len(PRIORITIES)):
+            yield dispose.request_socket.put(emu.Request("dispose", "dispose"))
+            yield model.get_sim().timeout(1)
+
+
+def get_model(discipline):
+    model = emu.Model()
+    h = emu.Holder(model, "holder", discipline=discipline)
+    emu.CreateAct(model, "create", h)
+    emu.DisposeAct(model, "dispose", h)
+    model.register_control(ControlCreate)
+    model.register_control(ControlDispose)
+    return model
+
+
+def disposal_order(model):
+    products = sorted(model.products.values(), key=lambda p: p.dispose_time)
+    return [p.pid for p in products]
+
+
+class TestDiscipline(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Fifo(self):
+        model = get_model('fifo')
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(disposal_order(model), [1, 2, 3, 4, 5])
+
+    def test_Lifo(self):
+        model = get_model('lifo')
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(disposal_order(model), [5, 4, 3, 2, 1])
+
+    def test_Priority(self):
+        model = get_model('priority')
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(disposal_order(model), [2, 4, 5, 1, 3])
+
+    def test_DueDate(self):
+        model = get_model('due_date')
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(disposal_order(model), [2, 4, 5, 1, 3])
+
+    def test_ProductList(self):
+        model = emu.Model()
+        h = emu.Holder(model, "holder", discipline='spt')
+        state = h.internal
+        for t in [4, 2, 3]:
+            p = emu.Product(model)
+            p['processing_time'] = t
+            state.append(p)
+        self.assertEqual([p['processing_time'] for p in state.product_list()], [2, 3, 4])
+        self.assertEqual(state.get_first()['processing_time'], 2)
+        self.assertEqual(state.pop()['processing_time'], 2)
+        self.assertEqual([p['processing_time'] for p in state.product_list()], [3, 4])
+
+    def test_FirstProducts(self):
+        model = emu.Model()
+        h = emu.Holder(model, "holder", discipline='priority')
+        priorities = [3, 9, 1, 7, 5, 8, 2, 6, 4]
+        for prio in priorities:
+            p = emu.Product(model)
+            p['priority'] = prio
+            h.internal.append(p)
+        first = h.get_first_products(4)
+        self.assertEqual([p['priority'] for p in first], [9, 8, 7, 6])
+        skip = [p.pid for p in first[:2]]
+        self.assertEqual([p['priority'] for p in h.get_first_products(3, skip)], [7, 6, 5])
+        self.assertEqual(len(h.get_first_products(20)), len(priorities))
+
+    def test_NonNumericPriority(self):
+        model = emu.Model()
+        h = emu.Holder(model, "holder", discipline='priority')
+        for prio in ['b', 'c', 'a']:
+            p = emu.Product(model)
+            p['priority'] = prio
+            h.internal.append(p)
+        self.assertEqual([p['priority'] for p in h.get_products()], ['c', 'b', 'a'])
+        self.assertEqual(h.internal.pop()['priority'], 'c')
+
+    def test_SetDiscipline(self):
+        model = get_model('fifo')
+        model.modules['holder']['discipline'] = 'lifo'
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(disposal_order(model), [5, 4, 3, 2, 1])
+
+    def test_UnknownDiscipline(self):
+        self.assertRaises(emu.EmulicaError, emu.Holder, emu.Model(), "holder", discipline='random')
+
+
+if __name__ == '__main__':
+    unittest.main()
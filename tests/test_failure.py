@@ -0,0 +1,130 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Failures that occur while an actuator is working: a product is created, and
+transformed by a machine (program time 10) that fails at t=5.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import *
+
+EMULATE_UNTIL = 20000
+
+
+class ControlMachine:
+    def run(self, model):
+        create = model.modules["create"]
+        yield create.request_socket.put(Request("create", "create"))
+        machine = model.modules["machine"]
+        yield machine.request_socket.put(Request("machine", "make", params={'program': 'p'}))
+
+
+def get_model(mttr, degradation=0.):
+    model = Model()
+    h = Holder(model, "h")
+    CreateAct(model, "create", h)
+    machine = ShapeAct(model, "machine", h)
+    machine.add_program('p', 10)
+    fail = Failure(model, "fail", 5, mttr, [machine])
+    fail.properties['degradation'] = degradation
+    fail.properties['repeat'] = False
+    model.register_control(ControlMachine)
+    return model
+
+
+class ControlReports:
+    def run(self, model, result):
+        report = model.modules["fail"].create_report_socket()
+        while True:
+            rp = yield report.get()
+            result.append((rp.what, rp.when))
+
+
+class TestFailure(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_CompleteFailure(self):
+        model = get_model(10000)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(model.products[1].shape_history, [(0, 10010, 'machine', 'p')])
+        self.assertEqual(model.modules['machine'].trace,
+                         [(0, 0, 'setup'), (5, 10005, 'failure'), (0, 10010, 'p')])
+
+    def test_PartialFailure(self):
+        model = get_model(10, 0.5)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(model.products[1].shape_history, [(0, 15, 'machine', 'p')])
+
+    def test_SimultaneousFailures(self):
+        model = get_model(3, 0.5)
+        fail2 = Failure(model, "fail2", 5, 3, [model.modules['machine']])
+        fail2.properties['degradation'] = 0.5
+        fail2.properties['repeat'] = False
+        model.emulate(until=EMULATE_UNTIL)
+        #both failures begin at t=5: the machine is stopped until t=8
+        self.assertEqual(model.modules['machine'].trace,
+                         [(0, 0, 'setup'), (5, 8, 'failure'), (5, 8, 'failure'), (0, 13, 'p')])
+        self.assertEqual(model.products[1].shape_history, [(0, 13, 'machine', 'p')])
+
+    def test_NoPolling(self):
+        model = get_model(10000)
+        model.clear()
+        steps = 0
+        while model.sim.peek() < EMULATE_UNTIL:
+            model.sim.step()
+            steps += 1
+        self.assertLess(steps, 100)
+
+    def test_RepeatedReports(self):
+        model = get_model(2)
+        model.modules['fail'].properties['repeat'] = True
+        result = []
+        model.register_control(ControlReports, pem_args=(model, result))
+        model.emulate(until=20)
+        self.assertEqual(result, [('failure-begin', 5), ('failure-end', 7),
+                                  ('failure-begin', 12), ('failure-end', 14),
+                                  ('failure-begin', 19)])
+        #product needs 10 units of work: 5 before, 5 after the first failure
+        self.assertEqual(model.products[1].shape_history, [(0, 12, 'machine', 'p')])
+
+    def test_RandomTimes(self):
+        model = get_model("rng.uniform(1, 2)")
+        fail = model.modules['fail']
+        fail.properties['mtbf'] = "rng.uniform(3, 4)"
+        fail.properties['repeat'] = True
+        model.emulate(until=1000, seed=42)
+        failures = [(b, e) for (b, e, s) in model.modules['machine'].trace if s == 'failure']
+        self.assertGreater(len(failures), 150)
+        for (b, e) in failures:
+            self.assertTrue(1 <= e - b <= 2)
+        times = fail.properties.evaluate_block('mtbf', 100)
+        self.assertEqual(len(times), 100)
+        self.assertTrue(all(3 <= t <= 4 for t in times))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Control rules can be written as handlers, called back with the reports of a
+module, instead of control processes.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation
+import test_sim1
+
+
+def dispose_rule(report, model):
+    """When observer1 reports, dispose the product 4 time units later"""
+    model.insert_request(emulation.Request('dispose1', 'dispose',
+                                           date=model.current_time() + 4))
+
+
+def get_model():
+    model = emulation.Model()
+    h = emulation.Holder(model, 'holder1')
+    emulation.PushObserver(model, 'observer1', 'ev1', observe_type=False, holder=h)
+    emulation.CreateAct(model, 'create1', h)
+    emulation.DisposeAct(model, 'dispose1', h)
+    model.register_control(test_sim1.ControlCreate)
+    model.register_handler('observer1', dispose_rule)
+    return model
+
+
+class TestHandler(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_RunResults(self):
+        model = get_model()
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        result = [(pid,
+                   p.shape_history,
+                   p.space_history,
+                   p.create_time,
+                   p.dispose_time) for (pid, p) in model.products.items()]
+        self.assertEqual(result, test_sim1.EXP_RESULT)
+
+    def test_Filter(self):
+        model = get_model()
+        result = list()
+        model.register_handler('dispose1', lambda report, result: result.append(report.when),
+                               args=(result,))
+        model.register_handler('create1', lambda report, result: result.append(report.what),
+                               what='busy', args=(result,))
+        model.register_handler('observer1', lambda report, result: result.append(report.what),
+                               accept=lambda report: report.when > 80, args=(result,))
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        self.assertEqual(result, [10 * i + 4 for i in range(9)] + ['ev1', 94])
+
+    def test_Rerun(self):
+        model = get_model()
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        model.emulate(until=test_sim1.EMULATE_UNTIL)
+        self.assertEqual(len(model.report_bus.bindings('observer1')), 1)
+        self.assertEqual([p.dispose_time for p in model.products.values()],
+                         [10 * i + 4 for i in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
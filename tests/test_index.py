@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Create -> holder -> space -> holder (in a submodel), with queries on the
+product index during the run.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import *
+
+import test_sim2
+
+EMULATE_UNTIL = 41
+
+EXP_RESULT = [(35, [1, 2, 3, 4], [], None, 4, 4),
+              (40.5, [1, 2, 3, 4], [], 'space1', 5, 4)]
+
+
+class ControlInspect:
+    def run(self, model, result):
+        index = model.product_index
+        for date in [35, 40.5]:
+            yield model.get_sim().timeout(date - model.current_time())
+            result.append((date,
+                           [p.pid for p in index.products_at('cell.h2')],
+                           index.products_at('h1'),
+                           index.location(5),
+                           index.wip(),
+                           index.wip('cell')))
+
+
+def get_model(result):
+    model = Model()
+    cell = Model(model=model, name='cell', path='cell.emu')
+    h1 = Holder(model, "h1")
+    h2 = Holder(cell, "h2")
+    obs1 = PushObserver(model, "observer1", "ev1", holder=h1)
+    c = CreateAct(model, "create1", h1)
+    sp = SpaceAct(model, "space1")
+    sp.add_program('p1', 2, {'source': h1, 'destination': h2})
+    test_sim2.initialize_control(model)
+    model.register_control(ControlInspect, pem_args=(model, result))
+    return model
+
+
+class TestIndex(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_RunResults(self):
+        result = []
+        model = get_model(result)
+        model.set_history_level('none')
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(result, EXP_RESULT)
+        self.assertEqual(model.product_index.count('defaulType'), 0)
+        self.assertEqual(model.product_index.wip(), 0)
+
+    def test_TypeCount(self):
+        model = Model()
+        model.clear()
+        for product_type in ['a', 'b', 'a']:
+            Product(model, product_type=product_type)
+        self.assertEqual(model.product_index.count('a'), 2)
+        model.products[1].dispose()
+        self.assertEqual(model.product_index.count('a'), 1)
+        self.assertEqual(model.product_index.count('c'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
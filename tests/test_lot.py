@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+"""
+Lots of 10 and 5 units are created, moved (time charged per lot) and then
+processed on a machine (time charged per unit), and finally disposed.
+"""
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import unittest
+
+import util
+util.set_path()
+
+import emulica.core.emulation as emu
+
+EXP_RESULT = [(1, 10, [(3, 23, 'machine', 'p')], [(0, 'source'), (0, 'trans'), (3, 'machine_space')], 0, 23),
+              (2, 5, [(26, 36, 'machine', 'p')], [(23, 'source'), (23, 'trans'), (26, 'machine_space')], 23, 36)]
+
+EMULATE_UNTIL = 100
+
+
+class ControlLine:
+    def run(self, model):
+        create = model.modules["create"]
+        trans = model.modules["trans"]
+        machine = model.modules["machine"]
+        dispose = model.modules["dispose"]
+        rp_trans = trans.create_report_socket()
+        rp_machine = machine.create_report_socket()
+        for q in [10, 5]:
+            yield create.request_socket.put(emu.Request("create", "create", params={'quantity': q}))
+            yield trans.request_socket.put(emu.Request("trans", "move", params={'program': 'load'}))
+            yield from emu.wait_idle(rp_trans)
+            yield machine.request_socket.put(emu.Request("machine", "make", params={'program': 'p'}))
+            yield from emu.wait_idle(rp_machine)
+            yield dispose.request_socket.put(emu.Request("dispose", "dispose"))
+
+
+def get_model():
+    model = emu.Model()
+    source = emu.Holder(model, "source")
+    space = emu.Holder(model, "machine_space")
+    emu.CreateAct(model, "create", source)
+    trans = emu.SpaceAct(model, "trans")
+    trans.add_program('load', 3, {'source': source, 'destination': space})
+    machine = emu.ShapeAct(model, "machine", space)
+    machine.add_program('p', 2, {'per_unit': True})
+    emu.DisposeAct(model, "dispose", space)
+    model.register_control(ControlLine)
+    return model
+
+
+class TestLot(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_RunResults(self):
+        model = get_model()
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(pid,
+                   p.quantity,
+                   p.shape_history,
+                   p.space_history,
+                   p.create_time,
+                   p.dispose_time) for (pid, p) in model.products.items()]
+        self.assertEqual(result, EXP_RESULT)
+        self.assertEqual(model.modules['create'].quantity_created, 15)
+
+    def test_Split(self):
+        model = emu.Model()
+        lot = emu.Product(model, product_type='bolt', quantity=10)
+        lot['mass'] = 3
+        part = lot.split(4)
+        self.assertEqual(lot.quantity, 6)
+        self.assertEqual(part.quantity, 4)
+        self.assertEqual(part.product_type, 'bolt')
+        self.assertEqual(part['mass'], 3)
+        self.assertNotEqual(part.pid, lot.pid)
+        self.assertRaises(emu.EmulicaError, lot.split, 6)
+        self.assertRaises(emu.EmulicaError, lot.split, 0)
+
+    def test_Merge(self):
+        model = emu.Model()
+        lot = emu.Product(model, product_type='bolt', quantity=10)
+        other = emu.Product(model, product_type='bolt', quantity=5)
+        lot.merge(other)
+        self.assertEqual(lot.quantity, 15)
+        self.assertFalse(other.is_active())
+        nut = emu.Product(model, product_type='nut', quantity=5)
+        self.assertRaises(emu.EmulicaError, lot.merge, nut)
+
+    def test_AssemblyPerUnit(self):
+        model = emu.Model()
+        space = emu.Holder(model, "space")
+        parts = emu.Holder(model, "parts")
+        out = emu.Holder(model, "out")
+        emu.CreateAct(model, "create_lot", space)
+        emu.CreateAct(model, "create_part", parts)
+        assy = emu.AssembleAct(model, "assy", assy_holder=space)
+        assy.add_program('p', 2, {'source': parts, 'per_unit': True})
+        unassy = emu.DisassembleAct(model, "unassy", unassy_holder=space)
+        unassy.add_program('p', 1, {'destination': out, 'per_unit': True})
+
+        def control(model):
+            report = model.modules["unassy"].create_report_socket(what='idle')
+            model.insert_request(emu.Request("create_lot", "create", params={'quantity': 4}))
+            model.insert_request(emu.Request("create_part", "create"))
+            yield model.get_sim().timeout(0)
+            yield assy.request_socket.put(emu.Request("assy", "assy", params={'program': 'p'}))
+            yield unassy.request_socket.put(emu.Request("unassy", "unassy", params={'program': 'p'}))
+            yield report.get()
+        model.register_control_function(control)
+        model.emulate(until=EMULATE_UNTIL)
+        #the time of both programs is charged for the 4 units of the lot
+        #(unassy waits for the holder from t=0, and disassembles from t=8)
+        self.assertEqual(assy.trace[-1][:2], (0, 8))
+        self.assertEqual(unassy.trace[-1][:2], (0, 12))
+
+    def test_SplitComponents(self):
+        model = emu.Model()
+        lot = emu.Product(model, product_type='box', quantity=10)
+        screws = emu.Product(model, product_type='screw', quantity=20)
+        lot.assemble(screws, 'assy', 'screws')
+        part = lot.split(4)
+        self.assertEqual(screws.quantity, 12)
+        self.assertEqual(part.components['screws'].quantity, 8)
+        self.assertEqual(part.components['screws'].product_type, 'screw')
+        self.assertEqual(part.all_components(), [part.components['screws']])
+        self.assertEqual(model.genealogy.parent(part.components['screws'].pid), part.pid)
+        #a single component cannot be shared between 6 and 3 units
+        lid = emu.Product(model, product_type='lid')
+        lot.assemble(lid, 'assy', 'lid')
+        self.assertRaises(emu.EmulicaError, lot.split, 3)
+        self.assertEqual(lot.quantity, 6)
+        self.assertEqual(screws.quantity, 12)
+
+    def test_MergeComponents(self):
+        model = emu.Model()
+        lot = emu.Product(model, product_type='box', quantity=6)
+        screws = emu.Product(model, product_type='screw', quantity=12)
+        lot.assemble(screws, 'assy', 'screws')
+        part = lot.split(2)
+        lot.merge(part)
+        self.assertEqual(lot.quantity, 6)
+        self.assertEqual(screws.quantity, 12)
+        self.assertFalse(part.is_active())
+        self.assertEqual(lot.all_components(), [screws])
+        other = emu.Product(model, product_type='box', quantity=2)
+        self.assertRaises(emu.EmulicaError, lot.merge, other)
+        self.assertEqual(lot.quantity, 6)
+
+    def test_MergeLocated(self):
+        model = get_model()
+        result = list()
+
+        def merge(model):
+            yield model.get_sim().timeout(10)
+            #the first lot is being processed by machine, in machine_space
+            other = model.modules['machine_space'].get_products()[0]
+            lot = emu.Product(model, product_type=other.product_type, quantity=10)
+            self.assertRaises(emu.EmulicaError, lot.merge, other)
+            result.append((other.is_active(), other.quantity, lot.quantity))
+        model.register_control_function(merge)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(result, [(True, 10, 10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
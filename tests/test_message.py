@@ -0,0 +1,100 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Requests and reports are immutable, slotted messages.
+"""
+
+import unittest
+import pickle
+import copy
+import sys
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import Request, Report, Message
+from emulica.core import emuML
+
+
+class TestMessage(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Immutable(self):
+        rp = Report('machine', 'busy', date=3, params={'program': 'p1'})
+        self.assertRaises(AttributeError, setattr, rp, 'when', 4)
+        self.assertRaises(AttributeError, setattr, rp, 'foo', 4)
+        with self.assertRaises(TypeError):
+            rp.how['program'] = 'p2'
+        self.assertFalse(hasattr(rp, '__dict__'))
+
+    def test_Fields(self):
+        rq = Request('machine', 'setup', date=2, params={'program': 'p1'})
+        self.assertEqual(rq.who, 'machine')
+        self.assertEqual(rq.where, 'machine')
+        self.assertEqual(rq.how['program'], 'p1')
+        self.assertTrue('program' in rq.how.keys())
+        self.assertEqual(rq.why, '')
+        #who and what are interned
+        self.assertTrue(rq.what is sys.intern('se' + 'tup'))
+        #messages without parameters share the same empty how
+        self.assertTrue(Request('a', 'b').how is Report('c', 'd').how is Message.no_params)
+
+    def test_Replace(self):
+        rp = Report('obs', 'ev', location='holder', date=1, params={'present': True})
+        absent = rp.replace(how=dict(rp.how, present=False), when=2)
+        self.assertEqual(rp.how['present'], True)
+        self.assertEqual(absent.how['present'], False)
+        self.assertEqual((absent.who, absent.where, absent.when), ('obs', 'holder', 2))
+
+    def test_Equality(self):
+        self.assertEqual(Report('a', 'b', date=1, params={'x': 1}),
+                         Report('a', 'b', date=1, params={'x': 1}))
+        self.assertNotEqual(Report('a', 'b', date=1), Report('a', 'b', date=2))
+        self.assertNotEqual(Report('a', 'b'), 'a')
+        self.assertEqual(Request('a', 'b', params={'x': 1}), Request('a', 'b', params={'x': 1}))
+        self.assertNotEqual(Request('a', 'b'), Request('a', 'c'))
+        self.assertFalse(Request('a', 'b') == None)
+        self.assertNotEqual(Request('a', 'b'), None)
+
+    def test_ParamsCopied(self):
+        params = {'program': 'p1'}
+        rq = Request('a', 'b', params=params)
+        params['program'] = 'p2'
+        self.assertEqual(rq.how['program'], 'p1')
+
+    def test_Pickle(self):
+        rp = Report('a', 'b', date=1, params={'x': 1})
+        self.assertEqual(pickle.loads(pickle.dumps(rp)), rp)
+        self.assertEqual(copy.deepcopy(rp), rp)
+        rq = Request('a', 'b', date=1)
+        self.assertEqual(pickle.loads(pickle.dumps(rq)).when, 1)
+
+    def test_EmuML(self):
+        rp = Report('a', 'b', location='c', date=1.5, comment='d', params={'x': 1})
+        self.assertEqual(emuML.parse_report(emuML.write_report(rp)), rp)
+        rq = emuML.parse_request(emuML.write_request(Request('a', 'b', date=2., params={'x': 'y'})))
+        self.assertEqual((rq.who, rq.what, rq.when, dict(rq.how)), ('a', 'b', 2., {'x': 'y'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
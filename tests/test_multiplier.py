@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Reports of a module observed by several clients are broadcast in one step,
+without copies.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation
+
+
+class ControlEmit:
+    def run(self, model, n):
+        source = model.modules['source']
+        for i in range(n):
+            yield model.get_sim().timeout(1)
+            yield from source.publish_report(emulation.Report('source', 'tick', date=i))
+
+
+class ControlReceive:
+    def run(self, model, result):
+        socket = model.modules['source'].create_report_socket(multiple_observation=True)
+        while True:
+            rp = yield socket.get()
+            result.append((model.current_time(), rp))
+
+
+class TestEventMultiplier(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Broadcast(self):
+        model = emulation.Model()
+        emulation.EmptyModule(model, 'source')
+        results = [list() for i in range(3)]
+        for result in results:
+            model.register_control(ControlReceive, pem_args=(model, result))
+        model.register_control(ControlEmit, pem_args=(model, 5))
+        model.emulate(until=10)
+        for result in results:
+            self.assertEqual([(t, rp.when) for (t, rp) in result],
+                             [(i + 1, i) for i in range(5)])
+        #every client gets the same report object
+        for (a, b, c) in zip(*results):
+            self.assertTrue(a[1] is b[1] is c[1])
+
+    def test_Deliver(self):
+        model = emulation.Model()
+        model.clear()
+        socket = model.new_report_socket()
+        got = socket.get()
+        self.assertFalse(got.triggered)
+        self.assertEqual(socket.deliver('a'), None)
+        self.assertTrue(got.triggered)
+        self.assertEqual(got.value, 'a')
+
+
+if __name__ == '__main__':
+    unittest.main()
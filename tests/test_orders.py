@@ -0,0 +1,111 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Streaming an order book into create requests (see emulica.core.orders).
+"""
+
+import unittest
+import io
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation
+from emulica.core.orders import OrderFeed, column_rows
+
+ORDERS = """time,productType,productID,length
+0,A,,1.5
+0,B,,2
+2,A,100,
+3,B,,4
+3,A,,5
+7,C,,
+7,A,,6
+7,B,,7
+8,A,,
+12,B,,8
+"""
+
+EXP_RESULT = [(1, 'A', 0, {'length': 1.5}),
+              (2, 'B', 0, {'length': 2}),
+              (100, 'A', 2, {}),
+              (3, 'B', 3, {'length': 4}),
+              (4, 'A', 3, {'length': 5}),
+              (5, 'C', 7, {}),
+              (6, 'A', 7, {'length': 6}),
+              (7, 'B', 7, {'length': 7}),
+              (8, 'A', 8, {}),
+              (9, 'B', 12, {'length': 8})]
+
+
+class ControlProbe:
+    def run(self, model, result):
+        while True:
+            result.append(len(model.request_calendar))
+            yield model.get_sim().timeout(1)
+
+
+def get_model():
+    model = emulation.Model()
+    h = emulation.Holder(model, "holder1")
+    emulation.CreateAct(model, "create1", h)
+    return model
+
+
+def get_result(model):
+    return [(pid, p.product_type, p.create_time, dict(p.properties.items()))
+            for (pid, p) in model.products.items()]
+
+
+class TestOrderFeed(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Csv(self):
+        model = get_model()
+        feed = OrderFeed(io.StringIO(ORDERS), 'create1', chunk_size=3)
+        feed.register(model)
+        pending = list()
+        model.register_control(ControlProbe, pem_args=(model, pending))
+        model.emulate(until=20)
+        self.assertEqual(get_result(model), EXP_RESULT)
+        self.assertEqual(feed.count, 10)
+        #at most one chunk is waiting in the calendar
+        self.assertTrue(max(pending) <= 3)
+
+    def test_Columns(self):
+        table = {'release': [0., 1., 1.],
+                 'type': ['A', 'B', 'A'],
+                 'who': ['create1', 'create1', 'create1'],
+                 'length': [1, 2, 3]}
+        model = get_model()
+        feed = OrderFeed(column_rows(table), chunk_size=2,
+                         columns={'time': 'release', 'productType': 'type', 'actor': 'who'})
+        feed.register(model)
+        model.emulate(until=20)
+        self.assertEqual(get_result(model), [(1, 'A', 0, {'length': 1}),
+                                             (2, 'B', 1, {'length': 2}),
+                                             (3, 'A', 1, {'length': 3})])
+
+
+if __name__ == '__main__':
+    unittest.main()
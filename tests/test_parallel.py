@@ -0,0 +1,180 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Multi-server and batch actuators: four products are created at once, and
+requests are sent to a shape (or space) actuator that has two servers.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import *
+
+EXP_SHAPE = [(1, [(0, 5, 'shape1', 'p1')], 2),
+             (2, [(0, 5, 'shape1', 'p1')], 2),
+             (3, [], 1),
+             (4, [], 1)]
+EXP_SHAPE_TRACE = [[(0, 0, 'setup'), (0, 5, 'p1')],
+                   [(0, 0, 'setup'), (0, 5, 'p1')]]
+EXP_BATCH = [(1, [(0, 5, 'shape1', 'p1')], 2),
+             (2, [(0, 5, 'shape1', 'p1')], 2),
+             (3, [(0, 5, 'shape1', 'p1')], 2),
+             (4, [], 1)]
+EXP_SPACE = [(1, [(0, 'h1'), (0, 'space1'), (3, 'h2')]),
+             (2, [(0, 'h1'), (0, 'space1'), (3, 'h2')]),
+             (3, [(0, 'h1'), (3, 'space1'), (6, 'h2')]),
+             (4, [(0, 'h1'), (3, 'space1'), (6, 'h2')])]
+
+EMULATE_UNTIL = 20
+
+
+class ControlParallel:
+    def run(self, model, actuator, action, program, n):
+        create = model.modules["create1"]
+        report = create.create_report_socket()
+        for i in range(4):
+            yield create.request_socket.put(Request("create1", "create"))
+            yield report.get()
+        act = model.modules[actuator]
+        for i in range(n):
+            yield act.request_socket.put(Request(actuator, action, params={'program': program}))
+
+
+def get_model(actuator, action, program, n):
+    model = Model()
+    h1 = Holder(model, "h1")
+    h2 = Holder(model, "h2")
+    create = CreateAct(model, "create1", h1)
+    create.properties['product_prop']['mass'] = 1
+    shape = ShapeAct(model, "shape1", h1)
+    shape.properties['servers'] = 2
+    shape.add_program('p1', 5, {'change': {'mass': 2}})
+    space = SpaceAct(model, "space1")
+    space.properties['servers'] = 2
+    space.add_program('p1', 3, {'source': h1, 'destination': h2})
+    model.register_control(ControlParallel, pem_args=(model, actuator, action, program, n))
+    return model
+
+
+class TestParallel(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Shape(self):
+        model = get_model('shape1', 'make', 'p1', 2)
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(pid, p.shape_history, p['mass']) for (pid, p) in model.products.items()]
+        self.assertEqual(result, EXP_SHAPE)
+        shape = model.modules['shape1']
+        self.assertEqual(shape.slot_traces, EXP_SHAPE_TRACE)
+        self.assertEqual(len(shape.trace), 4)
+        self.assertEqual(shape.program, 'p1')
+
+    def test_Batch(self):
+        model = get_model('shape1', 'make', 'p1', 1)
+        model.modules['shape1'].properties['batch'] = 3
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(pid, p.shape_history, p['mass']) for (pid, p) in model.products.items()]
+        self.assertEqual(result, EXP_BATCH)
+        self.assertEqual(model.modules['shape1'].trace, [(0, 0, 'setup'), (0, 5, 'p1')])
+
+    def test_BatchSingleServer(self):
+        model = get_model('shape1', 'make', 'p1', 2)
+        shape = model.modules['shape1']
+        shape.properties['servers'] = 1
+        shape.properties['batch'] = 2
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(pid, p.shape_history, p['mass']) for (pid, p) in model.products.items()]
+        self.assertEqual(result, [(1, [(0, 5, 'shape1', 'p1'), (5, 10, 'shape1', 'p1')], 2),
+                                  (2, [(0, 5, 'shape1', 'p1'), (5, 10, 'shape1', 'p1')], 2),
+                                  (3, [], 1),
+                                  (4, [], 1)])
+
+    def test_RecordEnd(self):
+        model = get_model('shape1', 'make', 'p1', 2)
+        model.emulate(until=3)
+        #the operations in progress of both servers are closed
+        self.assertEqual(model.modules['shape1'].slot_traces,
+                         [[(0, 0, 'setup'), (0, 3, 'p1')],
+                          [(0, 0, 'setup'), (0, 3, 'p1')]])
+
+    def test_ClaimedProduct(self):
+        model = get_model('shape1', 'make', 'p1', 1)
+
+        def move(model):
+            yield model.get_sim().timeout(1)
+            yield model.modules['space1'].request_socket.put(Request('space1', 'move', params={'program': 'p1'}))
+        model.register_control_function(move)
+        model.emulate(until=EMULATE_UNTIL)
+        #the first product of h1 is being transformed: the second one is moved
+        self.assertEqual(model.products[1].space_history, [(0, 'h1')])
+        self.assertEqual(model.products[2].space_history, [(0, 'h1'), (1, 'space1'), (4, 'h2')])
+
+    def test_OutOfOrder(self):
+        model = Model()
+        h1 = Holder(model, "h1")
+        h2 = Holder(model, "h2")
+        CreateAct(model, "create1", h1)
+        shape = ShapeAct(model, "shape1", h1)
+        shape.properties['servers'] = 2
+        shape.add_program('p1', 'product["duration"]')
+        space = SpaceAct(model, "space1")
+        space.add_program('p1', 1, {'source': h1, 'destination': h2})
+
+        def control(model):
+            create = model.modules["create1"]
+            report = create.create_report_socket()
+            for duration in [5, 2, 1]:
+                yield create.request_socket.put(Request("create1", "create"))
+                yield report.get()
+                model.products[len(model.products)]['duration'] = duration
+            shape = model.modules["shape1"]
+            space = model.modules["space1"]
+            idle = shape.create_report_socket(what='idle')
+            for i in range(2):
+                yield shape.request_socket.put(Request("shape1", "make", params={'program': 'p1'}))
+            for i in range(3):
+                yield idle.get()
+                if i == 0:
+                    #the second product is finished: the third one is claimed
+                    yield shape.request_socket.put(Request("shape1", "make", params={'program': 'p1'}))
+                yield space.request_socket.put(Request("space1", "move", params={'program': 'p1'}))
+        model.register_control_function(control)
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(pid, p.shape_history, p.space_history[-1]) for (pid, p) in model.products.items()]
+        self.assertEqual(result, [(1, [(0, 5, 'shape1', 'p1')], (6, 'h2')),
+                                  (2, [(0, 2, 'shape1', 'p1')], (3, 'h2')),
+                                  (3, [(2, 3, 'shape1', 'p1')], (4, 'h2'))])
+        self.assertEqual(h1.finished, set())
+
+    def test_Space(self):
+        model = get_model('space1', 'move', 'p1', 4)
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(pid, p.space_history) for (pid, p) in model.products.items()]
+        self.assertEqual(result, EXP_SPACE)
+        self.assertEqual(len(model.modules['h2'].get_products()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import unittest
+
+import util
+util.set_path()
+
+from emulica.core import emulation
+from emulica.core.archive import ProductArchive
+
+
+class TestProduct(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+        self.model = emulation.Model()
+
+    def test_Properties(self):
+        p = emulation.Product(self.model, product_type='part')
+        self.assertEqual(len(p.properties), 0)
+        p['mass'] = 2
+        p['color'] = 'red'
+        self.assertEqual(p['mass'], 2)
+        self.assertTrue('mass' in p.properties)
+        self.assertFalse('length' in p.properties)
+        self.assertRaises(KeyError, lambda: p['length'])
+        self.assertEqual(p.properties.keys(), ['mass', 'color'])
+        self.assertEqual(p.properties.items(), [('mass', 2), ('color', 'red')])
+        self.assertEqual(p.properties.get('length', 0), 0)
+
+    def test_Schema(self):
+        p1 = emulation.Product(self.model, product_type='part')
+        p2 = emulation.Product(self.model, product_type='part')
+        other = emulation.Product(self.model, product_type='other')
+        p1['mass'] = 2
+        p2['color'] = 'blue'
+        self.assertIs(p1.properties.schema, p2.properties.schema)
+        self.assertIsNot(p1.properties.schema, other.properties.schema)
+        self.assertEqual(p1.properties.keys(), ['mass'])
+        self.assertEqual(p2.properties.keys(), ['color'])
+        del p1.properties['mass']
+        self.assertEqual(p1.properties.keys(), [])
+
+    def test_Evaluation(self):
+        p = emulation.Product(self.model)
+        p['mass'] = 4
+        p.properties.eval_and_set('mass', "product['mass'] / 2", p)
+        self.assertEqual(p['mass'], 2)
+        p.properties.eval_and_set('length', "mass * 3")
+        self.assertEqual(p['length'], 6)
+
+    def test_LazyHistory(self):
+        p = emulation.Product(self.model)
+        self.assertIsNone(p._space_history)
+        self.assertEqual(p.space_history, [])
+        self.assertEqual(p.all_components(), [])
+        self.assertIsNone(p._components)
+
+    def test_HistoryLevels(self):
+        self.model.clear()
+        for (level, expected) in [('full', [0, 1, 2, 3, 4]),
+                                  ('summary', [0, 4]),
+                                  ('sampled', [0, 2, 4]),
+                                  ('none', [])]:
+            self.model.set_history_level(level, period=2)
+            p = emulation.Product(self.model)
+            c = emulation.Product(self.model)
+            p.assemble(c, 'assy')
+            start = self.model.current_time()
+            for i in range(5):
+                self.model.sim.run(until=start + i + 1)
+                p.record_position('s{0}'.format(i))
+            self.assertEqual([d - start - 1 for (d, s) in p.space_history], expected)
+            self.assertEqual([d - start - 1 for (d, s) in c.space_history], expected)
+            self.assertEqual(p.move_count, 0 if level == 'none' else 5)
+        self.assertRaises(emulation.EmulicaError, self.model.set_history_level, 'partial')
+
+    def test_Genealogy(self):
+        self.model.clear()
+        (body, wheel, rim, tyre) = [emulation.Product(self.model) for i in range(4)]
+        wheel.assemble(rim, 'assy', 'rim')
+        wheel.assemble(tyre, 'assy', 'tyre')
+        body.assemble(wheel, 'assy', 'wheel')
+        self.assertEqual(body.all_components(), [wheel, rim, tyre])
+        self.assertEqual(wheel.all_components(), [rim, tyre])
+        self.assertEqual(tyre.root(), body.pid)
+        self.assertEqual(self.model.genealogy.parent(tyre.pid), wheel.pid)
+        self.assertEqual(body.disassemble('wheel.rim'), rim)
+        self.assertEqual(body.all_components(), [wheel, tyre])
+        self.assertEqual(rim.root(), rim.pid)
+        self.assertEqual(body.disassemble('wheel'), wheel)
+        self.assertEqual(body.all_components(), [])
+        self.assertEqual(tyre.root(), wheel.pid)
+
+    def test_ArchivedComponents(self):
+        self.model.clear()
+        self.model.archive = ProductArchive()
+        (body, wheel, rim, tyre, engine) = [emulation.Product(self.model) for i in range(5)]
+        wheel.assemble(rim, 'assy', 'rim')
+        body.assemble(wheel, 'assy', 'wheel')
+        body.assemble(engine, 'assy', 'engine')
+        wheel.assemble(tyre, 'assy', 'tyre')
+        #a component disposed on its own is left out
+        engine.dispose()
+        self.assertEqual(body.all_components(), [wheel, rim, tyre])
+        #archived products are resolved from their component tree
+        body.dispose()
+        self.assertEqual(body.all_components(), [wheel, rim, tyre, engine])
+        self.assertEqual(wheel.all_components(), [rim, tyre])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Pull control policies: Kanban loop, CONWIP and base-stock.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core import emulation
+from emulica.core.pull import KanbanLoop, Conwip, BaseStock
+
+
+def get_line():
+    """A line: create -> queue -> machine (5 time units) -> out -> dispose.
+    Products are moved as soon as they are created, and disposed as soon as
+    they are moved."""
+    model = emulation.Model()
+    queue = emulation.Holder(model, 'queue')
+    out = emulation.Holder(model, 'out')
+    emulation.CreateAct(model, 'create', queue)
+    machine = emulation.SpaceAct(model, 'machine')
+    machine.add_program('p', 5, {'source': queue, 'destination': out})
+    emulation.DisposeAct(model, 'dispose', out)
+
+    def move(report, model):
+        model.insert_request(emulation.Request('machine', 'move', params={'program': 'p'}))
+
+    def dispose(report, model):
+        model.insert_request(emulation.Request('dispose', 'dispose'))
+    model.register_handler('create', move, what='create-done')
+    model.register_handler('machine', dispose, what='idle')
+    return model
+
+
+def get_stock():
+    """A stock, filled by create, and emptied by a customer every 10 time
+    units (starting at t=10) through dispose."""
+    model = emulation.Model()
+    stock = emulation.Holder(model, 'stock')
+    emulation.CreateAct(model, 'create', stock)
+    emulation.CreateAct(model, 'extra', stock)
+    emulation.DisposeAct(model, 'dispose', stock)
+
+    def customer(model):
+        while True:
+            yield model.get_sim().timeout(10)
+            model.insert_request(emulation.Request('dispose', 'dispose'))
+    model.register_control_function(customer)
+    return model
+
+
+class ControlExtra:
+    def run(self, model):
+        yield model.get_sim().timeout(5)
+        model.insert_request(emulation.Request('extra', 'create'))
+
+
+class TestPull(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_Conwip(self):
+        model = get_line()
+        policy = Conwip('create', 'dispose', cards=3, product_type='A')
+        policy.register(model)
+        wip = list()
+        model.register_handler('create', lambda report, model: wip.append(policy.wip()))
+        model.emulate(until=51)
+        #one product every 5 time units, starting at t=5
+        self.assertEqual(policy.completed, 10)
+        self.assertEqual(policy.released, 13)
+        self.assertEqual(policy.wip(), 3)
+        self.assertEqual(max(wip), 3)
+        self.assertEqual(set(p.product_type for p in model.products.values()), set(['A']))
+        self.assertEqual(model.modules['queue'].monitor.event_values[-1], 2)
+
+    def test_Rerun(self):
+        model = get_line()
+        policy = Conwip('create', 'dispose', cards=2)
+        policy.register(model)
+        model.emulate(until=51)
+        model.emulate(until=51)
+        self.assertEqual(policy.completed, 10)
+        self.assertEqual(policy.released, 12)
+
+    def test_Kanban(self):
+        model = get_stock()
+        policy = KanbanLoop('create', 'stock', cards=3)
+        policy.register(model)
+        model.register_control(ControlExtra)
+        model.emulate(until=45)
+        #4 withdrawals (t=10, 20, 30, 40): the first three free a card, the
+        #extra product (withdrawn at t=40) does not hold a card
+        self.assertEqual(policy.withdrawn, 3)
+        self.assertEqual(policy.released, 6)
+        self.assertEqual(policy.free_cards(), 0)
+        self.assertEqual(len(model.modules['stock'].get_products()), 3)
+
+    def test_KanbanInitialStock(self):
+        model = get_stock()
+
+        def initial(model):
+            for i in range(3):
+                model.insert_request(emulation.Request('extra', 'create'))
+            yield model.get_sim().timeout(0)
+        model.register_control_function(initial)
+        policy = KanbanLoop('create', 'stock', cards=2)
+        policy.register(model)
+        model.emulate(until=35)
+        #products 1 and 2 hold the cards, products 3 to 5 do not: the
+        #withdrawal of product 3 (t=20) releases no order
+        withdrawn = [(p.pid, p.dispose_time) for p in model.products.values() if p.dispose_time < 35]
+        self.assertEqual(withdrawn, [(1, 10), (3, 20), (2, 30)])
+        self.assertEqual(policy.withdrawn, 2)
+        self.assertEqual(policy.released, 4)
+        self.assertEqual(policy.free_cards(), 0)
+        self.assertEqual(len(model.modules['stock'].get_products()), 4)
+
+    def test_BaseStock(self):
+        model = get_stock()
+        policy = BaseStock('create', 'stock', level=3)
+        policy.register(model)
+        model.register_control(ControlExtra)
+        model.emulate(until=45)
+        #the extra product covers the first withdrawal
+        self.assertEqual(policy.released, 6)
+        self.assertEqual(policy.on_hand, 3)
+        self.assertEqual(policy.position(), 3)
+        self.assertEqual(len(model.modules['stock'].get_products()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Queries on the results of the model of test_sim2 (create -> holder -> space
+-> holder).
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.query import HistoryQuery
+from emulica.core.archive import ProductArchive
+
+import test_sim2
+import test_parallel
+import test_failure
+
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def check(self, query):
+        self.assertEqual(query.position(3, 21), 'space1')
+        self.assertEqual(query.position(3, 22), 'h2')
+        self.assertEqual(query.position(3, 19), None)
+        self.assertEqual(query.position(5, 41), None)
+        self.assertEqual(query.contents('h2', 25), [1, 2, 3])
+        self.assertEqual(query.contents('h2', 12), [1, 2])
+        self.assertEqual(query.contents('h2', 41), [])
+        self.assertEqual(query.contents('h1', 10), [])
+        self.assertEqual(query.contents('space1', 40.5), [5])
+        self.assertEqual(query.count('h2', 25), 3)
+        self.assertEqual(query.busy_time('space1', 0, 41), 9)
+        self.assertEqual(query.utilization('space1', 0, 40), 0.2)
+        self.assertEqual(query.utilization('space1', 11, 21), 0.2)
+        self.assertEqual(query.utilization('space1', 0, 40, states=['setup']), 0)
+
+    def test_Query(self):
+        model = test_sim2.get_model()
+        model.emulate(until=test_sim2.EMULATE_UNTIL)
+        self.check(HistoryQuery(model))
+        self.check(HistoryQuery(model, checkpoint=2))
+
+    def test_ArchivedProducts(self):
+        model = test_sim2.get_model()
+        model.archive = ProductArchive()
+        model.emulate(until=test_sim2.EMULATE_UNTIL)
+        self.check(HistoryQuery(model, checkpoint=1))
+
+    def test_Servers(self):
+        model = test_parallel.get_model('shape1', 'make', 'p1', 2)
+        model.emulate(until=test_parallel.EMULATE_UNTIL)
+        query = HistoryQuery(model)
+        #both servers are busy from 0 to 5
+        self.assertEqual(query.busy_time('shape1', 0, 10), 10)
+        self.assertEqual(query.utilization('shape1', 0, 5), 1.)
+        self.assertEqual(query.utilization('shape1', 0, 10), 0.5)
+
+    def test_Failure(self):
+        model = test_failure.get_model(10)
+        model.emulate(until=test_failure.EMULATE_UNTIL)
+        query = HistoryQuery(model)
+        #the machine operates from 0 to 20, and is failed from 5 to 15
+        self.assertEqual(query.busy_time('machine', 0, 20), 10)
+        self.assertEqual(query.busy_time('machine', 10, 20), 5)
+        self.assertEqual(query.utilization('machine', 0, 20), 0.5)
+        self.assertEqual(query.busy_time('machine', 0, 20, states=['failure']), 10)
+        self.assertEqual(query.busy_time('machine', 0, 20, states=['p']), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Future-dated requests are held by the model request calendar, and delivered
+at their date: they do not block the receiving module.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import *
+
+EMULATE_UNTIL = 100
+
+
+class ControlDated:
+    def run(self, model):
+        create = model.modules["create"]
+        yield create.request_socket.put(Request("create", "create", date=10,
+                                                params={'productType': 'late'}))
+        yield create.request_socket.put(Request("create", "create",
+                                                params={'productType': 'now'}))
+        yield model.get_sim().timeout(5)
+        model.insert_request(Request("create", "create", date=7,
+                                     params={'productType': 'inserted'}))
+
+
+class ControlBulk:
+    def run(self, model, n):
+        requests = [Request("create", "create", date=float(i % 50))
+                    for i in range(n)]
+        model.schedule_requests(requests)
+        yield model.get_sim().timeout(0)
+
+
+def get_model(control=None, *args):
+    model = Model()
+    h = Holder(model, "h")
+    CreateAct(model, "create", h)
+    if control:
+        model.register_control(control, pem_args=(model,) + args)
+    return model
+
+
+class TestRequestCalendar(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def test_NotBlocking(self):
+        model = get_model(ControlDated)
+        model.emulate(until=EMULATE_UNTIL)
+        result = [(p.product_type, p.create_time) for p in model.products.values()]
+        self.assertEqual(result, [('now', 0), ('inserted', 7), ('late', 10)])
+        self.assertEqual(len(model.request_calendar), 0)
+
+    def test_Bulk(self):
+        n = 500
+        model = get_model(ControlBulk, n)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(len(model.products), n)
+        times = [p.create_time for p in model.products.values()]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(times.count(49.), n // 50)
+
+    def test_Agenda(self):
+        model = get_model()
+        model.clear()
+        model.schedule_requests([Request("create", "create", date=d) for d in [5, 3, 4]])
+        self.assertEqual(len(model.request_calendar), 3)
+        #only the earliest request is scheduled in the agenda
+        self.assertEqual(len(model.agenda), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -244,13 +244,13 @@ class TestSim20(unittest.TestCase):
         for p in [p for p in model.products.values() if p.product_type == 'carrier']:
             c.append(display_components(p))
         self.assertListEqual(out1, [
-            "P1(#2)->P2(#6)->P1(#3)",
-            "P1(#5)->P2(#12)->P1(#7)",
-            "P1(#11)->P2(#17)->P1(#13)"])
+            "P1(#2)->P2(#7)->P1(#3)",
+            "P1(#5)->P2(#13)->P1(#6)",
+            "P1(#10)->P2(#17)->P1(#12)"])
         self.assertListEqual(out2, [
-            "P2(#8)->P1(#4)->P2(#10)",
-            "P2(#14)->P1(#9)->P2(#16)",
-            "P2(#18)->P1(#15)->P2(#19)"])
+            "P2(#9)->P1(#4)->P2(#11)",
+            "P2(#15)->P1(#8)->P2(#16)",
+            "P2(#18)->P1(#14)->P2(#19)"])
         self.assertListEqual(c, ["carrier(#1)","carrier(#20)"])
 
 
@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- Mode: Python; coding: utf-8; indent-tabs-mode: nil; tab-width: 4 -*-
+### BEGIN LICENSE
+# Copyright (C) 2013 Rémi Pannequin, Centre de Recherche en Automatique de Nancy remi.pannequin@univ-lorraine.fr
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3, as published
+# by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranties of
+# MERCHANTABILITY, SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR
+# PURPOSE.  See the GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+### END LICENSE
+"""
+Filtered report subscriptions: reports that are filtered out are never put
+in the subscriber socket.
+"""
+
+import unittest
+
+import logging
+from emulica.core import set_up_logging
+set_up_logging(logging.ERROR)
+
+import util
+util.set_path()
+
+from emulica.core.emulation import *
+
+EMULATE_UNTIL = 100
+
+
+class ControlMachine:
+    def run(self, model):
+        create = model.modules["create"]
+        machine = model.modules["machine"]
+        for program in ['p1', 'p1', 'p2']:
+            yield create.request_socket.put(Request("create", "create"))
+            yield machine.request_socket.put(Request("machine", "make", params={'program': program}))
+
+
+def get_model():
+    model = Model()
+    h = Holder(model, "h")
+    CreateAct(model, "create", h)
+    machine = ShapeAct(model, "machine", h)
+    machine.add_program('p1', 10)
+    machine.add_program('p2', 10)
+    machine.properties['setup'].add('p1', 'p2', 2)
+    model.register_control(ControlMachine)
+    return model
+
+
+class TestSubscription(unittest.TestCase):
+
+    def setUp(self):
+        print(self.id())
+
+    def subscribe(self, model, **kwargs):
+        result = list()
+
+        def subscriber(model):
+            socket = model.modules["machine"].create_report_socket(multiple_observation=True, **kwargs)
+            while True:
+                rp = yield socket.get()
+                result.append(rp.what)
+        model.register_control_function(subscriber)
+        return result
+
+    def test_Filters(self):
+        model = get_model()
+        everything = self.subscribe(model)
+        idle = self.subscribe(model, what='idle')
+        both = self.subscribe(model, what=['busy', 'idle'])
+        busy = self.subscribe(model, accept=lambda rp: rp.what != 'idle')
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertTrue('idle' in everything and 'busy' in everything)
+        self.assertEqual(idle, [what for what in everything if what == 'idle'])
+        self.assertEqual(both, everything)
+        self.assertEqual(busy, [what for what in everything if what != 'idle'])
+        self.assertTrue(len(idle) < len(everything))
+
+    def test_FilteredThenPlain(self):
+        model = get_model()
+        everything = self.subscribe(model)
+        idle = self.subscribe(model, what='idle')
+        plain = list()
+
+        def subscriber(model):
+            socket = model.modules["machine"].create_report_socket()
+            while True:
+                rp = yield socket.get()
+                plain.append(rp.what)
+        model.register_control_function(subscriber)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertTrue(len(idle) > 0)
+        self.assertEqual(plain, everything)
+
+    def test_NoWakeUp(self):
+        model = get_model()
+        wake_ups = list()
+
+        def subscriber(model):
+            socket = model.modules["machine"].create_report_socket(what='no-such-report')
+            while True:
+                yield socket.get()
+                wake_ups.append(model.current_time())
+        model.register_control_function(subscriber)
+        model.emulate(until=EMULATE_UNTIL)
+        self.assertEqual(wake_ups, [])
+
+
+if __name__ == '__main__':
+    unittest.main()